@@ -0,0 +1,68 @@
+"""
+Micro-benchmark da limpeza de texto: implementação original (cadeia de re.sub)
+versus src/text_cleaning.clean_text_robust, sobre o texto bruto dos PDFs em data/pdfs.
+
+Uso: uv run python benchmarks/bench_cleaning.py [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pypdf import PdfReader
+from src.text_cleaning import clean_text_robust, clean_snippet, clean_text_reference
+
+DATA_PATH = "./data/pdfs"
+
+def load_raw_texts(data_path: str = DATA_PATH) -> list:
+    """Extrai o texto bruto (sem limpeza) de cada PDF, como a ingestão recebe."""
+    texts = []
+    for root, _, files in os.walk(data_path):
+        for file in sorted(files):
+            if not file.endswith(".pdf"):
+                continue
+            try:
+                reader = PdfReader(os.path.join(root, file))
+                texts.append("".join(f"{page.extract_text() or ''}\n" for page in reader.pages))
+            except Exception as e:
+                print(f"⚠️  {file} ignorado: {e}")
+    return texts
+
+def measure(func, texts: list, repeat: int) -> float:
+    """Melhor tempo (s) de 'repeat' passadas sobre todos os textos."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = load_raw_texts()
+    if not texts:
+        print("⚠️  Nenhum PDF encontrado em 'data/pdfs/'.")
+        return
+
+    mismatches = sum(clean_text_robust(t) != clean_text_reference(t) for t in texts)
+    megabytes = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    print(f"📚 {len(texts)} PDFs, {megabytes:.2f} MB de texto bruto. Divergências de saída: {mismatches}")
+
+    before = measure(clean_text_reference, texts, args.repeat)
+    after = measure(clean_text_robust, texts, args.repeat)
+    snippet = measure(clean_snippet, [clean_text_robust(t) for t in texts], args.repeat)
+
+    print(f"{'implementação':<28}{'tempo (s)':>12}{'MB/s':>10}")
+    print(f"{'re.sub em cadeia (antes)':<28}{before:>12.4f}{megabytes / before:>10.1f}")
+    print(f"{'text_cleaning (depois)':<28}{after:>12.4f}{megabytes / after:>10.1f}")
+    print(f"{'clean_snippet (servidor)':<28}{snippet:>12.4f}{megabytes / snippet:>10.1f}")
+    print(f"⚡ Speedup: {before / after:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Tamanho do prompt do extrator sobre os PDFs de data/pdfs: corte antigo
+(primeiros 25000 caracteres) vs. condensação por embeddings (src/condense.py).
+
+Reporta tokens estimados por artigo, a fração do artigo (sem a bibliografia)
+que cada texto alcança e o tempo da condensação. Os tokens de entrada são o
+que o Gemini cobra, e a latência do LLM cresce com eles.
+
+Uso: uv run python benchmarks/bench_condense.py [--budget 3000] [--output out/bench_condense.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.utils import read_pdf
+from src.ingest import get_files_from_data
+from src.condense import condense_text, local_embed, estimate_tokens, body_length, CONDENSE_TOKEN_BUDGET
+
+MAX_INPUT_CHARS = 25000  # corte antigo de src/agent.py
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt do extrator: corte simples vs. condensação.")
+    parser.add_argument("--budget", type=int, default=CONDENSE_TOKEN_BUDGET, help="Orçamento em tokens")
+    parser.add_argument("--output", help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    docs = get_files_from_data()
+    if not docs:
+        print("⚠️  Nenhum PDF em 'data/pdfs/'.")
+        return
+    local_embed(["warm up"])  # carga do modelo fora da medição
+
+    rows = []
+    for doc in docs:
+        text = read_pdf(doc["path"]).strip()
+        body = body_length(text)
+        start = time.perf_counter()
+        result = condense_text(text, args.budget, embed=local_embed)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        reach = 1.0
+        if result["condensed"]:
+            reach = (result["selected"][-1] + 1) / result["chunks"]
+        rows.append({
+            "file": doc["filename"],
+            "truncated_tokens": estimate_tokens(text[:MAX_INPUT_CHARS]),
+            "condensed_tokens": result["tokens_out"],
+            "truncated_reach": round(min(1.0, MAX_INPUT_CHARS / max(body, 1)), 3),
+            "condensed_reach": round(reach, 3),
+            "condense_ms": round(elapsed_ms, 1),
+        })
+
+    print(f"\n{'arquivo':<40}{'corte':>8}{'condens.':>10}{'alcance corte':>15}{'alcance cond.':>15}{'ms':>8}")
+    for row in rows:
+        print(f"{row['file'][:39]:<40}{row['truncated_tokens']:>8}{row['condensed_tokens']:>10}"
+              f"{row['truncated_reach']:>14.0%}{row['condensed_reach']:>15.0%}{row['condense_ms']:>8.1f}")
+    before = sum(row["truncated_tokens"] for row in rows)
+    after = sum(row["condensed_tokens"] for row in rows)
+    print(f"⚡ Tokens de entrada do extrator: {before} -> {after} ({1 - after / max(before, 1):.0%} a menos); "
+          f"artigos com a conclusão fora do prompt: "
+          f"{sum(row['truncated_reach'] < 1 for row in rows)} -> {sum(row['condensed_reach'] < 0.9 for row in rows)}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"budget": args.budget, "files": rows, "tokens_before": before, "tokens_after": after},
+                      f, indent=2)
+        print(f"💾 Relatório salvo em {args.output}")
+
+if __name__ == "__main__":
+    main()
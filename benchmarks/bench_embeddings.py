@@ -0,0 +1,120 @@
+"""
+Backends de embeddings (src/embeddings.py) sobre os chunks reais de data/pdfs:
+throughput de indexação (chunks/s, em lotes como na ingestão), latência de uma
+consulta isolada (como no servidor) e paridade de cosseno contra o backend de
+referência (o primeiro da lista, 'torch' por padrão).
+
+Uso: uv run python benchmarks/bench_embeddings.py [--backends torch,onnx,onnx-int8]
+     [--max-chunks 512] [--min-cosine 0.98] [--output out/bench_embeddings.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.embeddings import get_embedding_function, cosine_parity, EMBEDDING_BACKENDS, PARITY_MIN_COSINE
+from src.ingest import get_files_from_data, iter_document_chunks, EMBED_BATCH_SIZE
+from bench_server import percentile, QUERIES
+
+def load_chunks(max_chunks: int) -> list:
+    """Chunks de data/pdfs, como a ingestão os gera, distribuídos entre os PDFs."""
+    docs = get_files_from_data()
+    per_doc = max(1, max_chunks // max(1, len(docs)))
+    chunks = []
+    for doc in docs:
+        for i, (chunk, _, _) in enumerate(iter_document_chunks(doc)):
+            if i >= per_doc:
+                break
+            chunks.append(chunk)
+    return chunks[:max_chunks]
+
+def run_backend(backend: str, chunks: list, queries: list, repeat: int) -> dict:
+    start = time.perf_counter()
+    embed = get_embedding_function(backend)
+    embed(queries[:1])  # carrega pesos / sessão fora da medição
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunk_vectors = []
+    for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+        chunk_vectors.extend(embed(chunks[i:i + EMBED_BATCH_SIZE]))
+    batch_s = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            embed([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "load_s": round(load_s, 2),
+        "chunks_per_s": round(len(chunks) / batch_s, 1) if batch_s else 0.0,
+        "query_p50_ms": round(percentile(latencies, 50), 2),
+        "query_p95_ms": round(percentile(latencies, 95), 2),
+        "chunk_vectors": chunk_vectors,
+        "query_vectors": embed(queries),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput e paridade dos backends de embeddings.")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS),
+                        help="Lista separada por vírgulas; o primeiro é a referência da paridade")
+    parser.add_argument("--max-chunks", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições das consultas isoladas")
+    parser.add_argument("--min-cosine", type=float, default=PARITY_MIN_COSINE,
+                        help="Falha (código 1) se algum backend ficar abaixo deste cosseno mínimo")
+    parser.add_argument("--output", help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    chunks = load_chunks(args.max_chunks)
+    if not chunks:
+        print("⚠️  Nenhum chunk extraído de 'data/pdfs/'.")
+        return
+    print(f"📚 {len(chunks)} chunks, {len(QUERIES)} consultas; referência: {backends[0]}")
+
+    results = {}
+    for backend in backends:
+        print(f"⏱️  {backend}...")
+        results[backend] = run_backend(backend, chunks, QUERIES, args.repeat)
+
+    reference = results[backends[0]]
+    report = {"chunks": len(chunks), "reference": backends[0], "backends": {}}
+    for backend, result in results.items():
+        report["backends"][backend] = {
+            **{k: v for k, v in result.items() if not k.endswith("_vectors")},
+            "parity_chunks": cosine_parity(reference["chunk_vectors"], result["chunk_vectors"]),
+            "parity_queries": cosine_parity(reference["query_vectors"], result["query_vectors"]),
+        }
+
+    base_rate = report["backends"][backends[0]]["chunks_per_s"] or 1e-9
+    print(f"\n{'backend':<12}{'carga (s)':>10}{'chunks/s':>10}{'speedup':>9}{'consulta p50':>14}"
+          f"{'cos mín':>9}{'cos médio':>11}")
+    failed = []
+    for backend, row in report["backends"].items():
+        parity = row["parity_chunks"]
+        worst = min(parity["min"], row["parity_queries"]["min"])
+        if worst < args.min_cosine:
+            failed.append(backend)
+        print(f"{backend:<12}{row['load_s']:>10.2f}{row['chunks_per_s']:>10.1f}"
+              f"{row['chunks_per_s'] / base_rate:>8.2f}x{row['query_p50_ms']:>11.2f} ms"
+              f"{worst:>9.4f}{parity['mean']:>11.5f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Relatório salvo em {args.output}")
+
+    if failed:
+        print(f"❌ Paridade abaixo de {args.min_cosine}: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ Todos os backends com cosseno ≥ {args.min_cosine} contra '{backends[0]}'.")
+
+if __name__ == "__main__":
+    main()
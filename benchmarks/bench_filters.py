@@ -0,0 +1,84 @@
+"""
+Latência da busca filtrada por área: coleção inteira sem filtro, coleção inteira
+com 'where' e partição da área (ingest.py --partition-by-area).
+
+Roda em processo, sobre a mesma fixture de bench_server.py (db/bench_fixture),
+com os embeddings das consultas já em cache e o cache de resultados limpo antes
+de cada chamada: mede só a busca no ChromaDB.
+
+Uso: uv run python benchmarks/bench_filters.py [--repeat 20] [--n-results 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from bench_server import build_fixture, bench_env, percentile, QUERIES
+
+def measure(server, queries: list, areas: list, n_results: int, repeat: int, filtered: bool,
+            use_partitions: bool) -> dict:
+    """Latências (ms) de query_collection para cada consulta x área."""
+    saved = server.partitions
+    server.partitions = saved if use_partitions else {}
+    latencies, matched, total = [], 0, 0
+    try:
+        for _ in range(repeat):
+            for query in queries:
+                for area in areas:
+                    where = server.build_where(area=area) if filtered else None
+                    server.result_cache.clear()
+                    start = time.perf_counter()
+                    result = server.query_collection(query, n_results=n_results, where=where)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    metas = result['metadatas'][0] if result['metadatas'] else []
+                    matched += sum(meta.get('area') == area for meta in metas)
+                    total += len(metas)
+    finally:
+        server.partitions = saved
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "area_precision": matched / total if total else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca filtrada por área vs. coleção inteira.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--n-results", type=int, default=5)
+    args = parser.parse_args()
+
+    build_fixture(("--partition-by-area",))
+    os.environ.update(bench_env())
+    os.chdir(ROOT)
+    import src.mcp_server as server
+    server.warm_up()  # fora do uvicorn não há lifespan: abre o índice e carrega o modelo aqui
+
+    if server.collection is None:
+        print("⚠️  Fixture sem coleção. Verifique 'data/pdfs/'.")
+        return
+    areas = sorted(server.partitions)
+    if not areas:
+        print("⚠️  Fixture sem partições por área.")
+        return
+    server.embed_queries(QUERIES)  # aquece o modelo e o cache de embeddings
+
+    rows = [
+        ("sem filtro", measure(server, QUERIES, areas, args.n_results, args.repeat, False, False)),
+        ("where area (coleção)", measure(server, QUERIES, areas, args.n_results, args.repeat, True, False)),
+        ("partição da área", measure(server, QUERIES, areas, args.n_results, args.repeat, True, True)),
+    ]
+    sizes = ", ".join(f"{area}: {server.partitions[area].count()}" for area in areas)
+    print(f"\n🧩 {server.collection.count()} chunks ({sizes}); "
+          f"{len(QUERIES)} consultas x {len(areas)} áreas x {args.repeat} repetições")
+    print(f"{'caminho':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'% na área':>12}")
+    for name, row in rows:
+        print(f"{name:<24}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['area_precision'] * 100:>11.0f}%")
+    unfiltered, where, partition = (row["p50_ms"] for _, row in rows)
+    print(f"⚡ p50 da partição: {where / max(partition, 1e-9):.2f}x mais rápido que o 'where' na coleção inteira, "
+          f"{partition / max(unfiltered, 1e-9):.2f}x o tempo da busca sem filtro.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Teste de carga do servidor MCP (SSE): sobe src.mcp_server:app localmente sobre uma
+coleção de fixture construída a partir de data/pdfs e dispara N clientes MCP
+concorrentes chamando search_articles e get_article_content.
+
+Reporta latência p50/p95/p99 por ferramenta, throughput e RSS do servidor.
+Roda offline (HF_HUB_OFFLINE=1): o modelo de embeddings precisa estar no cache
+local, o que já acontece depois do primeiro 'make index'.
+
+Uso: uv run python benchmarks/bench_server.py [--clients 8] [--requests 25]
+     [--unique] [--output out/bench_server.json] [--max-p95-ms 500]
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+import urllib.request
+from datetime import timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+FIXTURE_DB_PATH = os.path.join(ROOT, "db", "bench_fixture", "chroma_data")
+FIXTURE_MANIFEST = os.path.join(os.path.dirname(FIXTURE_DB_PATH), "ingest_manifest.json")
+STARTUP_TIMEOUT = 180  # segundos (carregar o modelo pode demorar)
+CALL_TIMEOUT = 60
+
+# Consultas cobrindo as três áreas da base de conhecimento
+QUERIES = [
+    "attention mechanism in neural networks",
+    "transformer encoder decoder architecture",
+    "distributed data processing with map and reduce",
+    "user interface design evaluation",
+    "lithium ion battery cathode materials",
+    "graphene electronic properties",
+    "click chemistry azide alkyne cycloaddition",
+    "major depressive disorder treatment",
+    "anterior cruciate ligament reconstruction outcomes",
+    "genetic variants associated with disease",
+]
+
+def bench_env() -> dict:
+    """Ambiente dos subprocessos: fixture isolada e nada de rede."""
+    env = dict(os.environ)
+    env["CHROMA_DB_PATH"] = FIXTURE_DB_PATH
+    env.setdefault("HF_HUB_OFFLINE", "1")
+    env.setdefault("ANONYMIZED_TELEMETRY", "False")
+    return env
+
+def build_fixture(ingest_args: tuple = ()) -> list:
+    """Indexa data/pdfs na coleção de fixture (incremental) e devolve os ids dos chunks."""
+    print(f"📚 Preparando fixture em {FIXTURE_DB_PATH}...")
+    subprocess.run([sys.executable, os.path.join(ROOT, "src", "ingest.py"), *ingest_args],
+                   cwd=ROOT, env=bench_env(), check=True, stdout=subprocess.DEVNULL)
+    with open(FIXTURE_MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [cid for entry in manifest["files"].values() for cid in entry["chunk_ids"]]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port: int, verbose: bool = False) -> subprocess.Popen:
+    """Sobe o uvicorn e espera o /readyz responder 200 (modelo aquecido, índice aberto)."""
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.mcp_server:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=bench_env(), stdout=output, stderr=output,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor encerrou na inicialização (código {process.returncode}). "
+                               "Rode com --verbose para ver o log.")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1).read()
+            return process
+        except OSError:  # recusa a conexão ou 503 (HTTPError) enquanto aquece
+            time.sleep(0.25)
+    process.terminate()
+    raise TimeoutError(f"Servidor não respondeu em {STARTUP_TIMEOUT}s")
+
+def read_rss_mb(pid: int) -> float:
+    """RSS atual do processo em MB (via /proc; 'ps' como alternativa)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True)
+        return int(out.stdout.strip()) / 1024
+    except (OSError, ValueError):
+        return 0.0
+
+class RSSSampler(threading.Thread):
+    """Amostra o RSS do servidor durante a carga e guarda o pico."""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_mb = max(self.peak_mb, read_rss_mb(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def percentile(values: list, q: float) -> float:
+    """Percentil por interpolação linear (valores em ms)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def make_call(rng: random.Random, chunk_ids: list, index: int, unique: bool, content_ratio: float,
+              mode: str = "vector"):
+    """Sorteia a próxima chamada. Com 'unique', cada busca é inédita (fura os caches)."""
+    if chunk_ids and rng.random() < content_ratio:
+        return "get_article_content", {"id": rng.choice(chunk_ids)}
+    query = rng.choice(QUERIES)
+    if unique:
+        query = f"{query} {index}"
+    return "search_articles", {"query": query, "mode": mode}
+
+async def run_client(url: str, client_id: int, args, chunk_ids: list, samples: list, errors: list):
+    """Um cliente simulado: sessão SSE própria, chamadas sequenciais."""
+    rng = random.Random(args.seed + client_id)
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for i in range(args.requests):
+                name, arguments = make_call(rng, chunk_ids, client_id * args.requests + i,
+                                            args.unique, args.content_ratio, args.mode)
+                start = time.perf_counter()
+                try:
+                    result = await session.call_tool(name, arguments=arguments,
+                                                     read_timeout_seconds=timedelta(seconds=CALL_TIMEOUT))
+                    if result.isError:
+                        errors.append(name)
+                    else:
+                        samples.append((name, (time.perf_counter() - start) * 1000))
+                except Exception as e:
+                    errors.append(f"{name}: {e!r}")
+
+async def run_load(url: str, args, chunk_ids: list):
+    samples, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(url, c, args, chunk_ids, samples, errors)
+                           for c in range(args.clients)))
+    return samples, errors, time.perf_counter() - start
+
+def summarize(samples: list) -> dict:
+    latencies = [ms for _, ms in samples]
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor MCP.")
+    parser.add_argument("--clients", type=int, default=8, help="Clientes MCP concorrentes")
+    parser.add_argument("--requests", type=int, default=25, help="Chamadas por cliente")
+    parser.add_argument("--warmup", type=int, default=5, help="Chamadas de aquecimento (fora da medição)")
+    parser.add_argument("--content-ratio", type=float, default=0.3,
+                        help="Fração das chamadas que são get_article_content")
+    parser.add_argument("--unique", action="store_true", help="Buscas inéditas (mede sem os caches)")
+    parser.add_argument("--mode", choices=["vector", "hybrid"], default="vector",
+                        help="Modo do search_articles (hybrid = embeddings + BM25)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Grava o relatório em JSON")
+    parser.add_argument("--verbose", action="store_true", help="Mostra o log do servidor")
+    parser.add_argument("--max-p95-ms", type=float,
+                        help="Falha (código 1) se o p95 geral passar deste limite")
+    args = parser.parse_args()
+
+    chunk_ids = build_fixture()
+    print(f"🧩 Fixture com {len(chunk_ids)} chunks.")
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/sse"
+    server = start_server(port, args.verbose)
+    try:
+        idle_rss = read_rss_mb(server.pid)
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "clients": 1, "requests": args.warmup})
+            asyncio.run(run_load(url, warmup, chunk_ids))
+
+        sampler = RSSSampler(server.pid)
+        sampler.start()
+        samples, errors, elapsed = asyncio.run(run_load(url, args, chunk_ids))
+        sampler.stop()
+        cache_stats = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5).read())
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    report = {
+        "clients": args.clients,
+        "requests_per_client": args.requests,
+        "unique_queries": args.unique,
+        "search_mode": args.mode,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "errors": len(errors),
+        "overall": summarize(samples),
+        "tools": {name: summarize([s for s in samples if s[0] == name])
+                  for name in sorted({name for name, _ in samples})},
+        "server_rss_mb": {"idle": round(idle_rss, 1), "peak": round(sampler.peak_mb, 1)},
+        "cache": cache_stats,
+    }
+
+    print(f"\n{'ferramenta':<24}{'n':>6}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+    for name, row in [*report["tools"].items(), ("TOTAL", report["overall"])]:
+        print(f"{name:<24}{row['count']:>6}{row['p50_ms']:>11.1f}{row['p95_ms']:>11.1f}{row['p99_ms']:>11.1f}")
+    print(f"⚡ Throughput: {report['throughput_rps']} req/s em {report['elapsed_s']}s "
+          f"({args.clients} clientes, {report['errors']} erros)")
+    print(f"💾 RSS do servidor: {report['server_rss_mb']['idle']} MB ocioso, "
+          f"{report['server_rss_mb']['peak']} MB de pico")
+    if errors:
+        print(f"⚠️  Primeiros erros: {errors[:3]}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📝 Relatório salvo em {args.output}")
+
+    if errors or (args.max_p95_ms is not None and report["overall"]["p95_ms"] > args.max_p95_ms):
+        print("❌ Regressão: erros ou p95 acima do limite.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
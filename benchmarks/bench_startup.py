@@ -0,0 +1,120 @@
+"""
+Partida a frio do servidor MCP: custo do 'import src.mcp_server' (e os módulos
+mais caros, via -X importtime), tempo até a primeira conexão aceita (/healthz
+responde 200) e até o servidor ficar pronto (/readyz 200, modelo aquecido).
+
+Roda sobre a mesma fixture de bench_server.py (db/bench_fixture), offline.
+
+Uso: uv run python benchmarks/bench_startup.py [--repeat 3] [--top 10]
+     [--max-accept-s 1.0] [--output out/bench_startup.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_server import build_fixture, bench_env, free_port, STARTUP_TIMEOUT
+
+POLL_INTERVAL = 0.01  # segundos entre tentativas de conexão
+
+def measure_import() -> float:
+    """Segundos do 'import src.mcp_server' em um processo novo (sem o custo de subir o Python)."""
+    code = ("import time; start = time.perf_counter(); import src.mcp_server; "
+            "print(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=bench_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def import_breakdown(top: int) -> list:
+    """Imports diretos de src.mcp_server com maior tempo acumulado (-X importtime), em ms."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.mcp_server"],
+                            cwd=ROOT, env=bench_env(), capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        module = module.rstrip()[1:]
+        if module.startswith("  ") and not module.startswith("   "):  # um nível de indentação = import direto
+            rows.append((module.strip(), int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+def wait_for(url: str, process: subprocess.Popen, start: float) -> float:
+    """Segundos desde 'start' até a URL responder 200."""
+    deadline = start + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor encerrou na inicialização (código {process.returncode}).")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return time.perf_counter() - start
+        except OSError:  # conexão recusada ou 503 enquanto aquece
+            time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"{url} não respondeu em {STARTUP_TIMEOUT}s")
+
+def measure_cold_start() -> dict:
+    """Sobe o uvicorn e mede até o /healthz e até o /readyz."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.mcp_server:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=bench_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        accept_s = wait_for(f"http://127.0.0.1:{port}/healthz", process, start)
+        ready_s = wait_for(f"http://127.0.0.1:{port}/readyz", process, start)
+        state = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=5).read())
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"accept_s": accept_s, "ready_s": ready_s, "warmup_s": state.get("warmup_s")}
+
+def main():
+    parser = argparse.ArgumentParser(description="Partida a frio do servidor MCP.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Módulos mais caros no import")
+    parser.add_argument("--max-accept-s", type=float,
+                        help="Falha (código 1) se a primeira conexão aceita demorar mais que isso")
+    parser.add_argument("--output", help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    build_fixture()
+    print(f"⏱️  {args.repeat} partidas a frio...")
+    imports = [measure_import() for _ in range(args.repeat)]
+    starts = [measure_cold_start() for _ in range(args.repeat)]
+    breakdown = import_breakdown(args.top)
+
+    report = {
+        "import_s": round(min(imports), 3),
+        "accept_s": round(min(s["accept_s"] for s in starts), 3),
+        "ready_s": round(min(s["ready_s"] for s in starts), 3),
+        "warmup_s": starts[-1]["warmup_s"],
+        "runs": starts,
+        "import_breakdown_ms": dict(breakdown),
+    }
+
+    print(f"\n📦 import src.mcp_server: {report['import_s'] * 1000:.0f} ms (melhor de {args.repeat})")
+    for module, ms in breakdown:
+        print(f"   {module:<40}{ms:>9.1f} ms")
+    print(f"🔌 primeira conexão aceita (/healthz): {report['accept_s']:.2f}s")
+    print(f"🔥 pronto para buscas (/readyz):        {report['ready_s']:.2f}s "
+          f"(aquecimento em segundo plano: {report['warmup_s']}s)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Relatório salvo em {args.output}")
+
+    if args.max_accept_s is not None and report["accept_s"] > args.max_accept_s:
+        print(f"❌ Primeira conexão em {report['accept_s']:.2f}s (limite: {args.max_accept_s}s)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,25 @@
 import sys
 import os
-import asyncio
 import json
 import time
 import argparse
-from typing import Any
-from crewai import Agent, Task, Crew, Process
+IMPORT_STARTED = time.perf_counter()  # o --profile reporta quanto as importações (crewai) custaram
+from typing import Any, Optional
+from pydantic import BaseModel, Field
+from crewai import Agent, Task, Crew, Process, LLM
 from crewai.tools import BaseTool
-from mcp import ClientSession
 from dotenv import load_dotenv
-from src.utils import process_input, extract_json_from_text, clean_input_for_tool
-from mcp.client.sse import sse_client
+from src.utils import process_input, extract_json_from_text, clean_input_for_tool, parse_query_list
+from src.mcp_client import get_mcp_client, MCP_SERVER_URL
+from src.llm_cache import get_llm_cache, llm_cache_enabled, make_key
+from src.fast_classifier import classify_fast
+from src.batch import load_jobs, run_batch, BATCH_RESULTS_PATH, DEFAULT_CONCURRENCY
+from src.condense import condense_text, local_embed, CONDENSE_TOKEN_BUDGET
+from src.runs import RunStore, new_run_id, repair_output, valid_result
+from src.profiling import Profiler, profiling, span, set_meta, print_summary
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 load_dotenv()
-MCP_SERVER_URL = "http://localhost:8000/sse"
 
 if not os.getenv("GEMINI_API_KEY"):
     print("❌ ERRO: GEMINI_API_KEY não encontrada.")
@@ -21,31 +27,90 @@ if not os.getenv("GEMINI_API_KEY"):
 
 # Modelo Estável
 CURRENT_LLM = "gemini/gemini-2.5-flash-lite"
+# Cota de requisições/minuto por agente. No modo batch ela é dividida entre os jobs simultâneos.
+MAX_RPM = 5
+# Sem condensação (--context-budget 0), o texto vai ao extrator cortado neste limite
+MAX_INPUT_CHARS = 25000
+
+class CachedLLM(LLM):
+    """
+    LLM do CrewAI com cache local de respostas (src/llm_cache.py): a mesma
+    conversa (task + resultados de ferramentas) no mesmo modelo não vai ao Gemini
+    de novo. Respostas que não são texto (chamadas de função) não são guardadas.
+    """
+
+    def __init__(self, model: str, response_cache=None, **kwargs):
+        super().__init__(model, **kwargs)
+        self.response_cache = response_cache
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        with span("llm", model=self.model) as attrs:
+            if self.response_cache is None:
+                attrs["cache"] = "off"
+                return super().call(messages, tools=tools, callbacks=callbacks,
+                                    available_functions=available_functions, from_task=from_task,
+                                    from_agent=from_agent)
+
+            key = make_key(self.model, messages, tools, temperature=self.temperature, stop=self.stop)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                attrs["cache"] = "hit"
+                print("  > ♻️ [LLM CACHE] Resposta reaproveitada.")
+                return cached
+
+            attrs["cache"] = "miss"
+            response = super().call(messages, tools=tools, callbacks=callbacks,
+                                    available_functions=available_functions, from_task=from_task,
+                                    from_agent=from_agent)
+            if isinstance(response, str) and response.strip():
+                self.response_cache.put(key, self.model, response)
+            return response
+
+def build_llm(use_cache: bool = True) -> LLM:
+    cache = get_llm_cache() if use_cache and llm_cache_enabled() else None
+    return CachedLLM(CURRENT_LLM, response_cache=cache)
 
 PYTHON_PATH = sys.executable
 SERVER_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), 'mcp_server.py'))
 
 # --- TOOLS ---
+# Todas as ferramentas compartilham uma única sessão MCP persistente (src/mcp_client.py):
+# a conexão SSE e o initialize() acontecem uma vez; cada chamada é um request/response.
+class SearchArticlesInput(BaseModel):
+    query: Any = Field(..., description="Search phrase")
+    area: Optional[str] = Field(None, description="Optional: only search this area (Computacao, Medicina or Quimica)")
+
 class SearchArticlesTool(BaseTool):
     name: str = "Search Articles"
-    description: str = "Search reference database via MCP Server."
+    description: str = ("Search reference database via MCP Server. "
+                        "Optional 'area' (Computacao, Medicina or Quimica) restricts the search to that area.")
+    args_schema: type[BaseModel] = SearchArticlesInput
     
-    def _run(self, query: Any) -> str:
+    def _run(self, query: Any, area: Any = None) -> str:
         clean_q = clean_input_for_tool(query)
-        print(f"  > 🔍 [Tool: Search] Conectando ao servidor em {MCP_SERVER_URL}...")
-        
-        async def run_remote_mcp():
-            try:
-                # Conecta via HTTP (SSE)
-                async with sse_client(MCP_SERVER_URL) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        result = await session.call_tool("search_articles", arguments={"query": clean_q})
-                        return str(result.content)
-            except Exception as e:
-                return f"❌ ERRO DE CONEXÃO: Não foi possível conectar ao servidor MCP em {MCP_SERVER_URL}. Verifique se rodou 'make mcp'."
-
-        return asyncio.run(run_remote_mcp())
+        arguments = {"query": clean_q}
+        clean_area = clean_input_for_tool(area) if area else ""
+        if clean_area:
+            arguments["area"] = clean_area
+        print(f"  > 🔍 [Tool: Search] Buscando '{clean_q}'{f' (área {clean_area})' if clean_area else ''} em {MCP_SERVER_URL}...")
+        try:
+            return get_mcp_client().call_tool("search_articles", arguments)
+        except Exception as e:
+            return f"❌ ERRO DE CONEXÃO: Não foi possível conectar ao servidor MCP em {MCP_SERVER_URL}. Verifique se rodou 'make mcp'."
+
+class SearchArticlesBatchTool(BaseTool):
+    name: str = "Search Articles Batch"
+    description: str = ("Search reference database for several phrases in ONE call "
+                        "(e.g. abstract, methods, conclusion). Input: list of queries.")
+    
+    def _run(self, queries: Any) -> str:
+        query_list = parse_query_list(queries)
+        print(f"  > 🔍 [Tool: SearchBatch] {len(query_list)} consultas em uma chamada...")
+        try:
+            return get_mcp_client().call_tool("search_articles_batch", {"queries": query_list})
+        except Exception as e:
+            return f"❌ ERRO DE CONEXÃO: Não foi possível conectar ao servidor MCP em {MCP_SERVER_URL}. Verifique se rodou 'make mcp'."
 
 class GetContentTool(BaseTool):
     name: str = "Get Article Content"
@@ -54,54 +119,129 @@ class GetContentTool(BaseTool):
     def _run(self, id: Any) -> str:
         clean_id = clean_input_for_tool(id)
         print(f"  > 📖 [Tool: GetContent] Solicitando ID: '{clean_id}'...")
-        
-        async def run_remote_mcp():
-            try:
-                async with sse_client(MCP_SERVER_URL) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        result = await session.call_tool("get_article_content", arguments={"id": clean_id})
-                        return str(result.content)
-            except Exception as e:
-                return f"❌ ERRO DE CONEXÃO: O servidor MCP está offline."
-
-        return asyncio.run(run_remote_mcp())
+        try:
+            return get_mcp_client().call_tool("get_article_content", {"id": clean_id})
+        except Exception as e:
+            return f"❌ ERRO DE CONEXÃO: O servidor MCP está offline."
+
+class GetDocumentTool(BaseTool):
+    name: str = "Get Document"
+    description: str = ("Get a whole reference paper in ONE call (chunks already stitched in order). "
+                        "Input: document ID or any chunk ID, e.g. 'Computacao/transformers.pdf_chunk_3'.")
+    
+    def _run(self, id: Any) -> str:
+        clean_id = clean_input_for_tool(id)
+        print(f"  > 📚 [Tool: GetDocument] Solicitando documento: '{clean_id}'...")
+        try:
+            return get_mcp_client().call_tool("get_document", {"id": clean_id})
+        except Exception as e:
+            return f"❌ ERRO DE CONEXÃO: O servidor MCP está offline."
+
+class SearchDocumentsTool(BaseTool):
+    name: str = "Search Documents"
+    description: str = "Rank whole reference papers (one result per paper, with area) via MCP Server."
+    
+    def _run(self, query: Any) -> str:
+        clean_q = clean_input_for_tool(query)
+        print(f"  > 🔍 [Tool: SearchDocuments] Buscando artigos para '{clean_q}'...")
+        try:
+            return get_mcp_client().call_tool("search_documents", {"query": clean_q})
+        except Exception as e:
+            return f"❌ ERRO DE CONEXÃO: Não foi possível conectar ao servidor MCP em {MCP_SERVER_URL}. Verifique se rodou 'make mcp'."
 
 search_tool = SearchArticlesTool()
+search_batch_tool = SearchArticlesBatchTool()
 content_tool = GetContentTool()
+document_tool = GetDocumentTool()
+search_documents_tool = SearchDocumentsTool()
 
 # --- AGENTES ---
+# Criados por crew: instâncias de Agent guardam estado de execução (contador de RPM,
+# iterações), então jobs simultâneos do modo batch não podem compartilhá-las.
+
+def build_agents(max_rpm: int = MAX_RPM, use_llm_cache: bool = True):
+    researcher = Agent(
+        role='Scientific Taxonomist',
+        goal='Classify the article into one of the allowed categories.',
+        backstory="""You are a strict classifier. 
+        You MUST map any scientific topic into one of these three buckets: [Computacao, Medicina, Quimica].
+        Even if the topic is Physics, Biology, or Mathematics, you MUST force it into the closest bucket above.""",
+        tools=[search_tool, search_batch_tool, search_documents_tool, content_tool, document_tool],
+        verbose=True,
+        memory=False,
+        llm=build_llm(use_llm_cache),
+        max_iter=2,
+        max_rpm=max_rpm
+    )
 
-researcher = Agent(
-    role='Scientific Taxonomist',
-    goal='Classify the article into one of the allowed categories.',
-    backstory="""You are a strict classifier. 
-    You MUST map any scientific topic into one of these three buckets: [Computacao, Medicina, Quimica].
-    Even if the topic is Physics, Biology, or Mathematics, you MUST force it into the closest bucket above.""",
-    tools=[search_tool, content_tool],
-    verbose=True,
-    memory=False,
-    llm=CURRENT_LLM,
-    max_iter=2,
-    max_rpm=5
-)
-
-analyst = Agent(
-    role='Scientific Extractor',
-    goal='Extract data keeping original language and write review in Portuguese.',
-    backstory="""You are a precise data analyst. 
-    1. You extract technical details maintaining the SOURCE TEXT LANGUAGE (e.g., if input is English, extraction is English).
-    2. You write the review ONLY in Portuguese.""",
-    verbose=True,
-    memory=False,
-    llm=CURRENT_LLM,
-    max_rpm=5
-)
+    analyst = Agent(
+        role='Scientific Extractor',
+        goal='Extract data keeping original language and write review in Portuguese.',
+        backstory="""You are a precise data analyst. 
+        1. You extract technical details maintaining the SOURCE TEXT LANGUAGE (e.g., if input is English, extraction is English).
+        2. You write the review ONLY in Portuguese.""",
+        verbose=True,
+        memory=False,
+        llm=build_llm(use_llm_cache),
+        max_rpm=max_rpm
+    )
+    return researcher, analyst
 
 # --- TASKS ---
 
-def create_crew(input_text: str):
-    
+def fast_classify(input_text: str):
+    """
+    Classificação determinística antes da crew: os trechos da entrada vão em uma
+    única busca em lote no servidor MCP e as áreas dos hits votam (sem LLM).
+    Devolve o voto, ou None se o servidor não respondeu.
+    """
+    def search_batch(queries):
+        return get_mcp_client().call_tool_text("search_articles_batch", {"queries": queries, "format": "json"})
+
+    try:
+        vote = classify_fast(input_text, search_batch)
+    except Exception as e:
+        print(f"  > ⚠️ [FAST PATH] Voto indisponível ({e}). Seguindo com o pesquisador.")
+        return None
+    verdict = "decisivo, pulando o pesquisador" if vote["decisive"] else "indeciso, o pesquisador decide"
+    print(f"  > 🗳️ [FAST PATH] {vote['area']} (margem {vote['margin']:.2f}, "
+          f"similaridade {vote.get('best_similarity', 0):.2f}): {verdict}.")
+    return vote
+
+def condense_input(input_text: str, budget: int = CONDENSE_TOKEN_BUDGET) -> str:
+    """
+    Texto do prompt do extrator: os chunks mais informativos do artigo inteiro
+    (abstract, método, resultados, conclusão), em ordem, dentro de 'budget' tokens.
+    Com budget 0, o corte antigo em MAX_INPUT_CHARS.
+    """
+    if budget <= 0:
+        return input_text[:MAX_INPUT_CHARS]
+    result = condense_text(input_text, budget, embed=local_embed)
+    if result["condensed"]:
+        print(f"  > ✂️ [CONDENSE] ~{result['tokens_in']} -> ~{result['tokens_out']} tokens "
+              f"({len(result['selected'])}/{result['chunks']} chunks).")
+    return result["text"]
+
+def create_crew(input_text: str, max_rpm: int = MAX_RPM, use_llm_cache: bool = True, classification: dict = None,
+                context_text: str = None, researcher_output: str = None, on_task_output=None):
+    """
+    Monta a crew. Com um voto decisivo em 'classification', a task de classificação
+    (uma ida ao LLM + ferramentas) é pulada e a área/evidência vão direto ao analista.
+    O mesmo vale para 'researcher_output', a classificação salva de uma execução anterior.
+    'context_text' é o texto (condensado) que o extrator analisa, e
+    'on_task_output(task, texto)' recebe a saída de cada task assim que ela termina.
+    """
+    researcher, analyst = build_agents(max_rpm, use_llm_cache)
+    if context_text is None:
+        context_text = input_text[:MAX_INPUT_CHARS]
+    fast_path = bool(classification and classification.get("decisive"))
+    skip_researcher = fast_path or bool(researcher_output)
+
+    def checkpoint(task_name):
+        if on_task_output is None:
+            return None
+        return lambda output: on_task_output(task_name, output.raw)
+
     # Task 1: Classificação Rigorosa
     task_classify = Task(
         description=f"""
@@ -113,6 +253,8 @@ def create_crew(input_text: str):
 
         Steps:
         1. MANDATORY: Use the 'Search Articles' tool to find similar papers in the Reference Database.
+           To probe several aspects at once (abstract, methods, conclusion), prefer ONE call to 'Search Articles Batch'.
+           'Search Documents' ranks whole papers; use 'Get Document' (not repeated 'Get Article Content') to read one.
         2. Analyze the 'Area' field of the retrieved metadata.
         3. If the retrieved articles are predominantly 'Computacao', classify input as 'Computacao'. Same for 'Medicina' or 'Quimica'.
         
@@ -122,25 +264,41 @@ def create_crew(input_text: str):
         Output: The Area Name and the Reference ID used as proof.
         """,
         expected_output="Scientific Area and Reference ID Evidence.",
-        agent=researcher
+        agent=researcher,
+        callback=checkpoint("classify")
     )
 
+    if fast_path:
+        area_rule = f"""1. AREA (CRITICAL): 
+           - The area was already validated against the Vector Store: "{classification['area']}".
+           - Evidence (reference IDs): {", ".join(classification['evidence'])}.
+           - You MUST output EXACTLY "{classification['area']}".
+"""
+    elif researcher_output:
+        area_rule = f"""1. AREA (CRITICAL): 
+           - The Researcher already classified this article against the Vector Store:
+             "{researcher_output.strip()}"
+           - You MUST output EXACTLY one of these strings: "Computacao", "Medicina", "Quimica", following that classification.
+"""
+    else:
+        area_rule = """1. AREA (CRITICAL): 
+           - You MUST output EXACTLY one of these strings: "Computacao", "Medicina", "Quimica".
+           - Even if the article is Physics, Biology, or Math, map it to the closest allowed category based on the Researcher's findings.
+           - Trust the Researcher's classification.
+"""
+
     # Task 2: Extração e Resenha (Ajustada para o Edital)
     task_final = Task(
         description=f"""
-        Analyze the ORIGINAL INPUT below.
+        Analyze the ORIGINAL INPUT below. It covers the whole article; "[...]" marks omitted passages.
         
         === ORIGINAL INPUT START ===
-        {input_text[:25000]} 
+        {context_text}
         === ORIGINAL INPUT END ===
 
         Generate a JSON object strictly following these rules:
 
-        1. AREA (CRITICAL): 
-           - You MUST output EXACTLY one of these strings: "Computacao", "Medicina", "Quimica".
-           - Even if the article is Physics, Biology, or Math, map it to the closest allowed category based on the Researcher's findings.
-           - Trust the Researcher's classification.
-
+        {area_rule}
         2. EXTRACTION (Same Language as Input):
            - Detect the language of the input.
            - Extract "what problem...", "step by step...", and "conclusion" using THAT DETECTED LANGUAGE.
@@ -168,9 +326,12 @@ def create_crew(input_text: str):
         """,
         expected_output="Valid JSON string.",
         agent=analyst,
-        context=[task_classify]
+        context=[] if skip_researcher else [task_classify],
+        callback=checkpoint("final")
     )
 
+    if skip_researcher:
+        return Crew(agents=[analyst], tasks=[task_final], process=Process.sequential, verbose=True)
     return Crew(
         agents=[researcher, analyst],
         tasks=[task_classify, task_final],
@@ -178,41 +339,225 @@ def create_crew(input_text: str):
         verbose=True
     )
 
-def run_agent(source: str, output_name: str = "output"):
-    print(f"📥 Entrada: {source}")
+JSON_REPAIR_PROMPT = """The text below should be ONE JSON object with the keys "area", "extraction" and
+"review_markdown", but it is not valid JSON (or misses keys). Rewrite it as that JSON object,
+keeping all of its content: do not summarize, translate or invent anything.
+Output ONLY the raw JSON string.
+
+=== TEXT START ===
+{raw}
+=== TEXT END ===
+"""
+
+def save_outputs(json_data: dict, output_name: str):
+    os.makedirs("out", exist_ok=True)
+    with open(f"out/{output_name}.json", "w", encoding="utf-8") as f:
+        json.dump(json_data, f, indent=2, ensure_ascii=False)
+    if "review_markdown" in json_data:
+        with open(f"out/review_{output_name}.md", "w", encoding="utf-8") as f:
+            f.write(json_data["review_markdown"])
+    print(f"\n✅ SUCESSO! Salvo em 'out/{output_name}.json'")
+    print(json.dumps(json_data, indent=2, ensure_ascii=False))
+
+def run_agent(source: str, output_name: str = "output", max_rpm: int = MAX_RPM, use_cache: bool = True,
+              use_llm_cache: bool = True, fast_path: bool = True, context_budget: int = CONDENSE_TOKEN_BUDGET,
+              run_id: str = None, resume: bool = False, profile: bool = False, profile_cpu: bool = False):
+    """
+    Processa uma fonte e grava out/{output_name}.json. Devolve o JSON gerado (ou None).
+
+    Cada etapa fica salva em out/runs/{run_id}/ (src/runs.py). Com 'resume', as
+    etapas já concluídas são reaproveitadas: uma execução que falhou no JSON não
+    repete o pesquisador nem as ferramentas. Sem 'source', fonte e nome vêm do run.json.
+
+    Com 'profile', o tempo de cada etapa, chamada ao LLM e ida ao MCP vai para
+    out/{output_name}.profile.json (src/profiling.py); 'profile_cpu' acrescenta o
+    dump do cProfile das etapas locais em out/{output_name}.profile.prof.
+    """
+    args = (source, output_name, max_rpm, use_cache, use_llm_cache, fast_path, context_budget, run_id, resume)
+    if not (profile or profile_cpu):
+        return _run_agent(*args)
+
+    profiler = Profiler(cpu=profile_cpu)
+    profiler.meta.update(imports_s=round(IMPORT_SECONDS, 4), model=CURRENT_LLM, context_budget=context_budget)
     try:
-        raw_text = process_input(source)
-    except Exception as e:
-        print(f"❌ Erro de Leitura: {e}")
-        return
+        with profiling(profiler):
+            return _run_agent(*args)
+    finally:
+        name = profiler.meta.get("name") or output_name or "output"
+        report = profiler.save(f"out/{name}.profile.json")
+        print_summary(report)
+        print(f"💾 [PROFILE] Relatório salvo em 'out/{name}.profile.json'")
+        if "cpu_profile" in report:
+            print(f"💾 [PROFILE] cProfile salvo em '{report['cpu_profile']}' "
+                  f"(python -m pstats {report['cpu_profile']})")
+
+def _run_agent(source: str, output_name: str, max_rpm: int, use_cache: bool, use_llm_cache: bool,
+               fast_path: bool, context_budget: int, run_id: str, resume: bool):
+    store = RunStore(run_id or new_run_id(output_name or "output"))
+    if not resume:
+        store.reset()
+    meta = store.load_meta()
+    if source is None:
+        if not meta:
+            print(f"❌ Execução '{store.run_id}' não encontrada em '{store.path}'.")
+            return None
+        source, output_name = meta["source"], meta["name"]
+    elif meta and meta.get("source") != source:
+        store.reset()  # mesmo run_id para outra fonte (ex: job do batch editado): começa do zero
+        meta = {}
+    print(f"📥 Entrada: {source}")
+    print(f"🧾 [RUN] {store.run_id}{' (retomando)' if meta else ''}")
+    set_meta(run_id=store.run_id, name=output_name, source=source, resumed=bool(meta))
+    if not meta:
+        store.update_meta(source=source, name=output_name, status="running")
+
+    json_data = store.load_result()
+    if json_data is not None:
+        save_outputs(json_data, output_name)
+        return json_data
+
+    raw_text = None
+    context_text = store.load_text("context")
+    classification = meta.get("classification")
+    researcher_output = store.load_text("classify")
+    needs_vote = fast_path and classification is None and researcher_output is None
+    if context_text is None or needs_vote:
+        try:
+            with span("input", cpu=True):
+                raw_text = process_input(source, use_cache=use_cache)
+        except Exception as e:
+            print(f"❌ Erro de Leitura: {e}")
+            store.update_meta(status="failed", error=f"input: {e}")
+            return None
+    if context_text is None:
+        with span("condense", cpu=True):
+            context_text = condense_input(raw_text, context_budget)
+        store.save_text("context", context_text)
+    if needs_vote:
+        with span("fast_classify", cpu=True):
+            classification = fast_classify(raw_text)
+        if classification is not None:
+            store.update_meta(classification=classification)
+
+    def kickoff_final(llm_cache: bool) -> str:
+        """Roda a crew (só o analista, se a classificação já existe) e devolve a saída do extrator."""
+        with span("crew_setup", cpu=True):
+            crew = create_crew(raw_text or context_text, max_rpm, llm_cache, classification,
+                               context_text=context_text, researcher_output=store.load_text("classify"),
+                               on_task_output=store.save_text)
+        with span("crew_kickoff", tasks=len(crew.tasks)):
+            result = crew.kickoff()
+        return store.load_text("final") or str(result)
+
+    def fix_json(raw: str) -> str:
+        """Reparo barato: uma chamada ao LLM só para reescrever a saída como JSON válido."""
+        return build_llm(use_llm_cache).call(JSON_REPAIR_PROMPT.format(raw=raw))
 
     print(f"🚀 Iniciando Agentes ({CURRENT_LLM})...")
-    crew = create_crew(raw_text)
-    
     try:
-        result = crew.kickoff()
+        final_output = store.load_text("final")
+        if final_output is None:
+            final_output = kickoff_final(use_llm_cache)
+        with span("json_extract", cpu=True):
+            json_data = extract_json_from_text(final_output)
+        if not valid_result(json_data):
+            print("⚠️ JSON inválido na saída do extrator. Tentando reparar (sem refazer a classificação)...")
+            # A saída inválida está no cache do LLM: a nova rodada do extrator vai direto ao Gemini
+            with span("json_repair"):
+                json_data = repair_output(store, final_output, [
+                    ("fix_json", fix_json),
+                    ("rerun_final", lambda raw: kickoff_final(llm_cache=False)),
+                ])
     except Exception as e:
         print(f"❌ Erro no CrewAI: {e}")
-        return
+        json_data = None
+        store.update_meta(error=str(e))
+    finally:
+        if use_llm_cache and llm_cache_enabled():
+            stats = get_llm_cache().stats()
+            print(f"📊 [LLM CACHE] hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.0%}")
 
-    json_data = extract_json_from_text(str(result))
-    
-    if json_data:
-        os.makedirs("out", exist_ok=True)
-        with open(f"out/{output_name}.json", "w", encoding="utf-8") as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
-        if "review_markdown" in json_data:
-            with open(f"out/review_{output_name}.md", "w", encoding="utf-8") as f:
-                f.write(json_data["review_markdown"])
-        print(f"\n✅ SUCESSO! Salvo em 'out/{output_name}.json'")
-        print(json.dumps(json_data, indent=2, ensure_ascii=False))
-    else:
+    if json_data is None:
+        store.update_meta(status="failed")
         print("❌ Falha: JSON inválido.")
-        print(result)
+        print(f"♻️ Etapas salvas em '{store.path}'. Retome com: python src/agent.py --resume {store.run_id}")
+        return None
+
+    store.save_result(json_data)
+    store.update_meta(status="ok", error=None)
+    save_outputs(json_data, output_name)
+    return json_data
+
+def run_batch_agent(queue_path: str, concurrency: int = DEFAULT_CONCURRENCY,
+                    results_path: str = BATCH_RESULTS_PATH, resume: bool = True,
+                    use_cache: bool = True, use_llm_cache: bool = True, fast_path: bool = True,
+                    context_budget: int = CONDENSE_TOKEN_BUDGET, profile: bool = False,
+                    profile_cpu: bool = False) -> dict:
+    """
+    Modo batch: um único processo (crewai importado uma vez, sessão MCP compartilhada)
+    consome a fila JSONL. A cota MAX_RPM é dividida entre os jobs simultâneos para que
+    o total de requisições/minuto continue o mesmo do modo de um artigo só.
+    Cada job grava suas etapas em out/runs/batch-{nome}: ao rodar a fila de novo,
+    um job que falhou retoma de onde parou em vez de refazer a crew inteira.
+    """
+    jobs = load_jobs(queue_path)
+    concurrency = max(1, min(concurrency, MAX_RPM))
+    max_rpm = max(1, MAX_RPM // concurrency)
+    print(f"📦 [BATCH] Fila '{queue_path}': {len(jobs)} jobs (max_rpm por agente: {max_rpm}).")
+    summary = run_batch(jobs, lambda source, name: run_agent(source, name, max_rpm, use_cache,
+                                                                  use_llm_cache, fast_path, context_budget,
+                                                                  run_id=f"batch-{name}", resume=resume,
+                                                                  profile=profile, profile_cpu=profile_cpu),
+                        concurrency=concurrency, results_path=results_path, resume=resume)
+    print(f"🏁 [BATCH] ok={summary['ok']} falhas={summary['failed']} pulados={summary['skipped']} "
+          f"-> '{results_path}'")
+    return summary
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("source", help="Arquivo/URL")
+    parser.add_argument("source", nargs="?", help="Arquivo/URL")
     parser.add_argument("--name", default="output")
-    args = parser.parse_args() if len(sys.argv) > 1 else argparse.Namespace(source="Test...", name="test")
-    run_agent(args.source, args.name)
\ No newline at end of file
+    parser.add_argument("--batch", metavar="FILA.jsonl",
+                        help="Fila JSONL de jobs {\"source\": ..., \"name\": ...}")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Jobs simultâneos no modo batch (limitado por MAX_RPM)")
+    parser.add_argument("--results", default=BATCH_RESULTS_PATH,
+                        help="Resultados JSONL do modo batch (também serve de checkpoint)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Reprocessa jobs já concluídos no arquivo de resultados")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignora o cache de entradas e baixa/lê a fonte de novo")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Ignora o cache de respostas do LLM (sempre chama o Gemini)")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="Sempre usa o agente pesquisador para classificar (ignora o voto local)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Retoma uma execução salva em out/runs/RUN_ID (pula as etapas já concluídas)")
+    parser.add_argument("--context-budget", type=int, default=CONDENSE_TOKEN_BUDGET,
+                        help="Tokens do artigo no prompt do extrator (0 = corte simples nos primeiros "
+                             f"{MAX_INPUT_CHARS} caracteres)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mede cada etapa, chamada ao LLM e ida ao MCP em out/NOME.profile.json")
+    parser.add_argument("--profile-cpu", action="store_true",
+                        help="Como --profile, mais o dump do cProfile das etapas locais (out/NOME.profile.prof)")
+    args = parser.parse_args() if len(sys.argv) > 1 else argparse.Namespace(
+        source="Test...", name="test", batch=None, no_cache=False, no_llm_cache=False, no_fast_path=False,
+        context_budget=CONDENSE_TOKEN_BUDGET, resume=None, profile=False, profile_cpu=False)
+    try:
+        if args.batch:
+            run_batch_agent(args.batch, args.concurrency, args.results, resume=not args.no_resume,
+                            use_cache=not args.no_cache, use_llm_cache=not args.no_llm_cache,
+                            fast_path=not args.no_fast_path, context_budget=args.context_budget,
+                            profile=args.profile, profile_cpu=args.profile_cpu)
+        elif args.resume:
+            run_agent(None, None, use_cache=not args.no_cache, use_llm_cache=not args.no_llm_cache,
+                      fast_path=not args.no_fast_path, context_budget=args.context_budget,
+                      run_id=args.resume, resume=True, profile=args.profile, profile_cpu=args.profile_cpu)
+        elif args.source:
+            run_agent(args.source, args.name, use_cache=not args.no_cache, use_llm_cache=not args.no_llm_cache,
+                      fast_path=not args.no_fast_path, context_budget=args.context_budget,
+                      profile=args.profile, profile_cpu=args.profile_cpu)
+        else:
+            parser.error("informe uma fonte (arquivo/URL), --resume RUN_ID ou --batch FILA.jsonl")
+    finally:
+        get_mcp_client().close()
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BATCH_RESULTS_PATH = "out/batch_results.jsonl"
+DEFAULT_CONCURRENCY = 2
+
+def default_job_name(source: str) -> str:
+    """Nome de saída derivado da fonte (arquivo ou URL), sem extensão."""
+    name = os.path.basename(source.rstrip("/")) or "output"
+    root, extension = os.path.splitext(name)
+    if extension[1:].isalpha():  # '.pdf', '.html'; não corta ids como '1706.03762'
+        name = root
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "output"
+
+def load_jobs(path: str) -> list:
+    """
+    Lê a fila JSONL de jobs {"source": ..., "name": ...}.
+    Linhas vazias, inválidas ou sem 'source' são ignoradas com aviso;
+    nomes repetidos ganham sufixo para não sobrescrever a saída um do outro.
+    """
+    jobs, seen = [], set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"⚠️ [BATCH] Linha {line_number} ignorada: JSON inválido.")
+                continue
+            source = entry.get("source") if isinstance(entry, dict) else None
+            if not source:
+                print(f"⚠️ [BATCH] Linha {line_number} ignorada: sem campo 'source'.")
+                continue
+            name = entry.get("name") or default_job_name(source)
+            unique_name, suffix = name, 2
+            while unique_name in seen:
+                unique_name = f"{name}_{suffix}"
+                suffix += 1
+            seen.add(unique_name)
+            jobs.append({"source": source, "name": unique_name})
+    return jobs
+
+def load_checkpoint(results_path: str = BATCH_RESULTS_PATH) -> set:
+    """Nomes dos jobs já concluídos com sucesso (o próprio arquivo de resultados é o checkpoint)."""
+    done = set()
+    try:
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # última linha truncada por uma queda
+                if record.get("status") == "ok":
+                    done.add(record.get("name"))
+    except OSError:
+        pass
+    return done
+
+class ResultWriter:
+    """Acrescenta um registro JSONL por job concluído, com flush + fsync (sobrevive a quedas)."""
+
+    def __init__(self, path: str = BATCH_RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+def run_batch(jobs: list, worker, concurrency: int = DEFAULT_CONCURRENCY,
+              results_path: str = BATCH_RESULTS_PATH, resume: bool = True) -> dict:
+    """
+    Executa 'worker(source, name)' para cada job com no máximo 'concurrency'
+    jobs simultâneos. Cada resultado é gravado assim que termina; com 'resume',
+    jobs que já constam como 'ok' no arquivo de resultados são pulados.
+    O worker devolve os dados gerados (ou None em caso de falha).
+    """
+    done = load_checkpoint(results_path) if resume else set()
+    pending = [job for job in jobs if job["name"] not in done]
+    summary = {"total": len(jobs), "skipped": len(jobs) - len(pending), "ok": 0, "failed": 0}
+    if summary["skipped"]:
+        print(f"⏭️ [BATCH] {summary['skipped']} jobs já concluídos (checkpoint em '{results_path}').")
+    if not pending:
+        return summary
+
+    writer = ResultWriter(results_path)
+
+    def execute(job):
+        start = time.perf_counter()
+        try:
+            data, error = worker(job["source"], job["name"]), None
+        except Exception as e:
+            data, error = None, repr(e)
+        return job, data, error, time.perf_counter() - start
+
+    print(f"📦 [BATCH] {len(pending)} jobs, {concurrency} simultâneos.")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+        futures = [pool.submit(execute, job) for job in pending]
+        for future in as_completed(futures):
+            job, data, error, elapsed = future.result()
+            status = "ok" if data is not None and error is None else "failed"
+            summary[status] += 1
+            writer.write({
+                "name": job["name"],
+                "source": job["source"],
+                "status": status,
+                "elapsed_s": round(elapsed, 2),
+                "output": f"out/{job['name']}.json" if status == "ok" else None,
+                "error": error,
+            })
+            print(f"{'✅' if status == 'ok' else '❌'} [BATCH] {job['name']} ({elapsed:.1f}s) "
+                  f"[{summary['ok'] + summary['failed']}/{len(pending)}]")
+    return summary
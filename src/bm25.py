@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import time
+import shutil
+from collections import Counter
+import numpy as np
+
+# --- CONFIGURAÇÃO ---
+BM25_INDEX_VERSION = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # constante da Reciprocal Rank Fusion (valor usual da literatura)
+
+# Termos técnicos inteiros: 'LiCoO2', 'IL-6', 'BRCA1', 'Cu2+', '3.5', 'TNF-α'
+TOKEN_PATTERN = re.compile(r"\w+(?:[-+.]\w+)*")
+MAX_TOKEN_CHARS = 64
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in is it its of on or that the
+their this to was were which with we our these those than then there also can not
+""".split())
+
+# Arquivos do índice (diretório ao lado de db/chroma_data)
+META_FILE = "meta.json"
+VOCAB_FILE = "vocab.json"
+IDS_FILE = "ids.json"
+OFFSETS_FILE = "offsets.npy"
+DOCS_FILE = "postings_docs.npy"
+WEIGHTS_FILE = "postings_weights.npy"
+AREAS_FILE = "chunk_areas.npy"
+SOURCES_FILE = "chunk_sources.npy"
+
+def tokenize(text: str) -> list:
+    """
+    Tokens em minúsculas. Termos compostos ('il-6', 'h2so4.5h2o') entram inteiros
+    e também por partes, para que 'BRCA1' case com 'BRCA1-mutated'.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if len(token) > MAX_TOKEN_CHARS:
+            continue
+        if token not in STOPWORDS:
+            tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-+._]", token)
+                          if part and part != token and part not in STOPWORDS)
+    return tokens
+
+def encode_labels(values: list, dtype) -> tuple:
+    """Rótulos (área, fonte) de cada chunk como códigos inteiros + tabela de rótulos."""
+    labels = {}
+    codes = np.asarray([labels.setdefault(value, len(labels)) for value in values], dtype=dtype)
+    return list(labels), codes
+
+def build_index(ids: list, texts: list, metadatas: list | None = None,
+                k1: float = BM25_K1, b: float = BM25_B) -> dict:
+    """
+    Índice invertido em arrays: para o termo t, os postings ficam em
+    [offsets[t], offsets[t+1]) de 'docs' (int32) e 'weights' (float32).
+    O peso já é o score BM25 do termo no chunk (idf * tf saturado e normalizado
+    pelo tamanho), então a consulta só soma pesos. Área e fonte de cada chunk
+    viram códigos inteiros, para filtrar sem consultar o Chroma; os outros
+    arquivos de um chunk mesclado (metadado 'also_in') ficam em meta["also_in"].
+    """
+    vocab = {}
+    post_terms, post_docs, post_tfs = [], [], []
+    doc_lengths = np.zeros(len(ids), dtype=np.float32)
+    for doc, text in enumerate(texts):
+        counts = Counter(tokenize(text or ""))
+        doc_lengths[doc] = sum(counts.values())
+        for term, tf in counts.items():
+            post_terms.append(vocab.setdefault(term, len(vocab)))
+            post_docs.append(doc)
+            post_tfs.append(tf)
+
+    terms = np.asarray(post_terms, dtype=np.int32)
+    docs = np.asarray(post_docs, dtype=np.int32)
+    tfs = np.asarray(post_tfs, dtype=np.float32)
+    order = np.argsort(terms, kind="stable")  # estável: postings em ordem de chunk
+    terms, docs, tfs = terms[order], docs[order], tfs[order]
+
+    n_docs = len(ids)
+    df = np.bincount(terms, minlength=len(vocab))
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(df, out=offsets[1:])
+    avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * doc_lengths[docs] / (avgdl or 1.0))
+    weights = (idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+    metadatas = metadatas or [{} for _ in ids]
+    area_labels, chunk_areas = encode_labels([(m or {}).get("area") for m in metadatas], np.int16)
+    source_labels, chunk_sources = encode_labels([(m or {}).get("source") for m in metadatas], np.int32)
+    also_in = {}
+    for doc, metadata in enumerate(metadatas):
+        for source in json.loads((metadata or {}).get("also_in") or "[]"):
+            also_in.setdefault(source, []).append(doc)
+
+    return {
+        "meta": {
+            "version": BM25_INDEX_VERSION,
+            "n_docs": n_docs,
+            "n_terms": len(vocab),
+            "n_postings": int(len(docs)),
+            "avgdl": round(avgdl, 2),
+            "k1": k1,
+            "b": b,
+            "built_at": time.time(),
+            "areas": area_labels,
+            "sources": source_labels,
+            "also_in": also_in,
+        },
+        "vocab": vocab,
+        "ids": list(ids),
+        "offsets": offsets,
+        "docs": docs,
+        "weights": weights,
+        "chunk_areas": chunk_areas,
+        "chunk_sources": chunk_sources,
+    }
+
+def save_index(index: dict, path: str):
+    """
+    Grava o índice em um diretório temporário e troca pelo atual no final:
+    o servidor nunca vê um índice pela metade.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, OFFSETS_FILE), index["offsets"])
+    np.save(os.path.join(tmp_path, DOCS_FILE), index["docs"])
+    np.save(os.path.join(tmp_path, WEIGHTS_FILE), index["weights"])
+    np.save(os.path.join(tmp_path, AREAS_FILE), index["chunk_areas"])
+    np.save(os.path.join(tmp_path, SOURCES_FILE), index["chunk_sources"])
+    with open(os.path.join(tmp_path, VOCAB_FILE), "w", encoding="utf-8") as f:
+        json.dump(index["vocab"], f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(index["ids"], f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(index["meta"], f, indent=2)
+
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def index_is_current(path: str) -> bool:
+    """O índice existe e foi gerado pela versão atual do tokenizador/pesos."""
+    try:
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("version") == BM25_INDEX_VERSION
+    except (OSError, ValueError):
+        return False
+
+class BM25Index:
+    """
+    Índice BM25 somente leitura. Os arrays de postings são abertos com mmap:
+    a carga é instantânea e as páginas são compartilhadas entre processos.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != BM25_INDEX_VERSION:
+            raise ValueError(f"versão do índice BM25 {self.meta.get('version')} != {BM25_INDEX_VERSION}")
+        with open(os.path.join(path, VOCAB_FILE), "r", encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(path, IDS_FILE), "r", encoding="utf-8") as f:
+            self.ids = json.load(f)
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self.docs = np.load(os.path.join(path, DOCS_FILE), mmap_mode="r")
+        self.weights = np.load(os.path.join(path, WEIGHTS_FILE), mmap_mode="r")
+        self.chunk_areas = np.load(os.path.join(path, AREAS_FILE), mmap_mode="r")
+        self.chunk_sources = np.load(os.path.join(path, SOURCES_FILE), mmap_mode="r")
+        self.area_codes = {label: code for code, label in enumerate(self.meta.get("areas", []))}
+        self.source_codes = {label: code for code, label in enumerate(self.meta.get("sources", []))}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, n_results: int = 10, area: str | None = None,
+               source: str | None = None) -> list:
+        """
+        Top-n (chunk_id, score) da consulta; termos repetidos contam uma vez por ocorrência.
+        'area'/'source' restringem aos chunks com esses metadados.
+        """
+        counts = Counter(term for term in tokenize(query) if term in self.vocab)
+        if not counts or not self.ids:
+            return []
+        also_in = self.meta.get("also_in", {}).get(source, []) if source is not None else []
+        if ((area is not None and area not in self.area_codes)
+                or (source is not None and source not in self.source_codes and not also_in)):
+            return []
+        doc_parts, weight_parts = [], []
+        for term, qtf in counts.items():
+            t = self.vocab[term]
+            start, end = self.offsets[t], self.offsets[t + 1]
+            doc_parts.append(self.docs[start:end])
+            weight = self.weights[start:end]
+            weight_parts.append(weight * qtf if qtf > 1 else weight)
+        docs = np.concatenate(doc_parts)
+        scores = np.bincount(docs, weights=np.concatenate(weight_parts), minlength=len(self.ids))
+        if area is not None:
+            scores[self.chunk_areas != self.area_codes[area]] = 0.0
+        if source is not None:
+            keep = self.chunk_sources == self.source_codes.get(source, -1)
+            keep[also_in] = True  # chunks quase duplicados que o arquivo reaproveita
+            scores[~keep] = 0.0
+
+        n_results = min(n_results, int(np.count_nonzero(scores)))
+        if n_results <= 0:
+            return []
+        top = np.argpartition(-scores, n_results - 1)[:n_results]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+def load_index(path: str):
+    """Índice do diretório, ou None se ausente/desatualizado (a busca híbrida fica indisponível)."""
+    if not index_is_current(path):
+        return None
+    return BM25Index(path)
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K, n_results: int | None = None) -> list:
+    """
+    Funde listas ordenadas de IDs: score(d) = soma de 1 / (k + posição).
+    Só usa as posições, então não precisa calibrar BM25 contra distância vetorial.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return fused[:n_results] if n_results is not None else fused
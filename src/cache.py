@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+
+def cache_enabled(env_var: str) -> bool:
+    """Flag de ambiente que liga/desliga um cache: '0', 'false', 'no' ou 'off' desligam."""
+    return os.getenv(env_var, "1").strip().lower() not in ("0", "false", "no", "off")
+
+def lazy_singleton(factory):
+    """Devolve um getter thread-safe que cria a instância com 'factory' só na primeira chamada."""
+    instance = None
+    lock = threading.Lock()
+
+    def get():
+        nonlocal instance
+        with lock:
+            if instance is None:
+                instance = factory()
+            return instance
+    return get
+
+class HitMissStats:
+    """Contadores de hit/miss compartilhados pelos caches (memória, disco e SQLite)."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class LRUCache(HitMissStats):
+    """Cache LRU limitado, thread-safe, com contadores de hit/miss."""
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize = max(0, maxsize)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.record(True)
+                return self._data[key]
+            self.record(False)
+            return default
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._data), "maxsize": self.maxsize}
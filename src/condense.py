@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+import numpy as np
+from src.documents import stitch_chunks
+
+# --- CONFIGURAÇÃO ---
+# Orçamento (em tokens) do texto do artigo no prompt do extrator; 0 desliga a condensação
+CONDENSE_TOKEN_BUDGET = int(os.getenv("CONDENSE_TOKEN_BUDGET", "3000"))
+# Estimativa sem tokenizador do Gemini: ~4 caracteres por token em inglês/português
+CHARS_PER_TOKEN = 4
+# Seções que o extrator precisa (problema, passo a passo, conclusão, resenha):
+# cada uma garante ao menos um chunk, escolhido por similaridade com a consulta
+# e pela posição esperada no artigo (fração do texto)
+SECTION_QUERIES = {
+    "abstract": ("abstract: the problem this paper addresses and its main contribution", 0.0),
+    "method": ("methodology: the proposed approach, model, materials and experimental setup", 0.35),
+    "results": ("results: experiments, evaluation, measurements and performance compared to baselines", 0.65),
+    "conclusion": ("conclusion: summary of findings, limitations and future work", 1.0),
+}
+POSITION_WEIGHT = 0.3  # peso da distância à posição esperada na escolha de cada seção
+MMR_LAMBDA = 0.7  # relevância vs. redundância ao completar o orçamento
+# A bibliografia não ajuda o extrator: chunks a partir do cabeçalho são descartados
+REFERENCES_PATTERN = re.compile(r'\b(?:References|REFERENCES|Bibliography|BIBLIOGRAPHY|Referências|REFERÊNCIAS)\b')
+REFERENCES_MIN_POSITION = 0.5  # só vale como cabeçalho na segunda metade do texto
+GAP_MARKER = "\n\n[...]\n\n"
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def body_length(text: str) -> int:
+    """Posição onde começa a bibliografia (primeiro cabeçalho na segunda metade), ou o fim do texto."""
+    for match in REFERENCES_PATTERN.finditer(text, int(len(text) * REFERENCES_MIN_POSITION)):
+        return match.start()
+    return len(text)
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def select_chunks(chunks: list, budget: int, vectors: np.ndarray = None,
+                  query_vectors: np.ndarray = None) -> list:
+    """
+    Índices (em ordem) dos chunks escolhidos dentro do orçamento de tokens:
+    o início do texto (título/abstract), o melhor chunk de cada seção de
+    SECTION_QUERIES e, no que sobrar, os mais representativos do artigo (próximos
+    do centroide) e menos redundantes com os já escolhidos (MMR).
+    Sem embeddings, seções e preenchimento usam só a posição no texto.
+    """
+    n = len(chunks)
+    # Cada chunk paga também um '[...]': o texto montado nunca passa do orçamento
+    costs = [estimate_tokens(chunk + GAP_MARKER) for chunk in chunks]
+    positions = np.linspace(0.0, 1.0, n) if n > 1 else np.zeros(1)
+    if vectors is not None:
+        centrality = vectors @ _normalize(vectors.mean(axis=0, keepdims=True))[0]
+        similarity = vectors @ vectors.T
+    else:
+        centrality = np.zeros(n)
+        similarity = 1.0 - np.abs(positions[:, None] - positions[None, :])
+
+    selected, spent = [], 0
+
+    def take(i) -> bool:
+        nonlocal spent
+        if i in selected or spent + costs[i] > budget:
+            return False
+        selected.append(i)
+        spent += costs[i]
+        return True
+
+    take(0)
+    for k, (_, expected) in enumerate(SECTION_QUERIES.values()):
+        score = -POSITION_WEIGHT * np.abs(positions - expected)
+        if query_vectors is not None:
+            score = score + vectors @ query_vectors[k]
+        for i in np.argsort(-score, kind="stable"):
+            if i in selected or take(int(i)):
+                break
+
+    while True:
+        candidates = [i for i in range(n) if i not in selected and spent + costs[i] <= budget]
+        if not candidates:
+            break
+        redundancy = similarity[candidates][:, selected].max(axis=1) if selected else np.zeros(len(candidates))
+        mmr = MMR_LAMBDA * centrality[candidates] - (1 - MMR_LAMBDA) * redundancy
+        take(candidates[int(np.argmax(mmr))])
+    return sorted(selected)
+
+def assemble(chunks: list, selected: list) -> str:
+    """Chunks escolhidos em ordem; vizinhos são costurados (sem o overlap) e lacunas viram '[...]'."""
+    runs, run = [], []
+    for i in selected:
+        if run and i != run[-1] + 1:
+            runs.append(run)
+            run = []
+        run.append(i)
+    if run:
+        runs.append(run)
+    text = GAP_MARKER.join(stitch_chunks([chunks[i] for i in run]) for run in runs)
+    if selected and selected[0] > 0:
+        text = GAP_MARKER.lstrip() + text
+    return text
+
+def condense_text(text: str, budget: int = CONDENSE_TOKEN_BUDGET, embed=None, text_splitter=None) -> dict:
+    """
+    Condensa a entrada para caber em 'budget' tokens, cobrindo o artigo inteiro
+    (em vez de cortar no caractere N e perder a conclusão). 'embed(textos) -> vetores'
+    é a função de embeddings local; se faltar ou falhar, a seleção é só por posição.
+    """
+    text = text.strip()
+    tokens_in = estimate_tokens(text)
+    result = {"text": text, "condensed": False, "tokens_in": tokens_in, "tokens_out": tokens_in,
+              "chunks": None, "selected": None}
+    if budget <= 0 or tokens_in <= budget:
+        return result
+
+    if text_splitter is None:
+        from src.ingest import build_text_splitter
+        text_splitter = build_text_splitter()
+    chunks = text_splitter.split_text(text[:body_length(text)]) or text_splitter.split_text(text)
+
+    vectors = query_vectors = None
+    if embed is not None:
+        try:
+            embedded = _normalize(embed(chunks + [query for query, _ in SECTION_QUERIES.values()]))
+            vectors, query_vectors = embedded[:len(chunks)], embedded[len(chunks):]
+        except Exception as e:
+            print(f"  > ⚠️ [CONDENSE] Embeddings indisponíveis ({e}). Seleção só por posição.")
+
+    selected = select_chunks(chunks, budget, vectors, query_vectors)
+    # Orçamento menor que um chunk: resta o corte simples
+    condensed = assemble(chunks, selected) if selected else text[:budget * CHARS_PER_TOKEN]
+    result.update(text=condensed, condensed=True, tokens_out=estimate_tokens(condensed),
+                  chunks=len(chunks), selected=selected)
+    return result
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def local_embed(texts: list) -> list:
+    """Embeddings com o mesmo modelo/backend da ingestão, carregado uma vez por processo."""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            from src.embeddings import get_embedding_function
+            _embedder = get_embedding_function()
+    return _embedder(texts)
@@ -0,0 +1,91 @@
+import re
+import json
+import hashlib
+import numpy as np
+
+# SimHash de 64 bits sobre shingles de palavras: textos quase iguais (overlap do
+# splitter, cabeçalhos e licenças repetidos, o mesmo PDF exportado de novo) ficam
+# a poucos bits de distância; textos diferentes ficam perto de 32.
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# Até 3 bits diferentes = quase duplicado. Medido no corpus de data/pdfs: o par
+# mais próximo de chunks distintos fica a 10 bits.
+SIMHASH_MAX_DISTANCE = 3
+# Chunks curtos (fim de seção, legenda) têm SimHash instável: nunca são mesclados
+MIN_DEDUP_WORDS = 30
+
+# Chunk mesclado guarda os outros arquivos que o usam: 'also_in' (lista JSON, para leitura)
+# e uma chave booleana por arquivo, que o filtro 'where' por 'source' consegue consultar
+ALSO_IN_FIELD = "also_in"
+
+WORD_PATTERN = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE, min_words: int = MIN_DEDUP_WORDS):
+    """Impressão digital de 64 bits do texto (int), ou None se ele for curto demais."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < min_words:
+        return None
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # Cada bit vota +1/-1 por shingle; o bit final é o sinal da soma
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0).tolist()))
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+class NearDuplicateIndex:
+    """
+    Busca de SimHash a até 'max_distance' bits. Os 64 bits são cortados em
+    max_distance + 1 faixas: dois hashes que diferem em até max_distance bits
+    coincidem em pelo menos uma faixa (pigeonhole), então só os candidatos que
+    dividem alguma faixa são comparados.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = SIMHASH_BITS // bands
+        self._bands = [(i * width, SIMHASH_BITS - i * width if i == bands - 1 else width) for i in range(bands)]
+        self._buckets = [{} for _ in self._bands]
+        self._fingerprints = {}
+
+    def _keys(self, fingerprint: int):
+        for (shift, width), buckets in zip(self._bands, self._buckets):
+            yield buckets, (fingerprint >> shift) & ((1 << width) - 1)
+
+    def add(self, key: str, fingerprint: int):
+        self._fingerprints[key] = fingerprint
+        for buckets, band in self._keys(fingerprint):
+            buckets.setdefault(band, []).append(key)
+
+    def find(self, fingerprint: int):
+        """Chave do item mais próximo a até max_distance bits, ou None."""
+        best, best_distance = None, self.max_distance + 1
+        for buckets, band in self._keys(fingerprint):
+            for key in buckets.get(band, ()):
+                distance = hamming(fingerprint, self._fingerprints[key])
+                if distance < best_distance:
+                    best, best_distance = key, distance
+        return best
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+def also_in_key(source: str) -> str:
+    """Chave do metadado que marca o chunk como parte também de 'source'."""
+    return f"{ALSO_IN_FIELD}:{source}"
+
+def also_in_update(metadata: dict, add=(), remove=()) -> dict:
+    """Metadados para o collection.update que soma/tira arquivos de 'also_in' (None apaga a chave)."""
+    current = set(json.loads(metadata.get(ALSO_IN_FIELD) or "[]"))
+    sources = (current | set(add)) - set(remove)
+    update = {ALSO_IN_FIELD: json.dumps(sorted(sources)) if sources else None}
+    update.update({also_in_key(source): True for source in sources})
+    update.update({also_in_key(source): None for source in current - sources})
+    return update
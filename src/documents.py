@@ -0,0 +1,53 @@
+import json
+
+# Os chunks da ingestão se sobrepõem em até CHUNK_OVERLAP caracteres (200);
+# a busca pela emenda olha um pouco além disso
+MAX_STITCH_OVERLAP = 400
+# O splitter corta em '.', então um chunk sem overlap pode começar pela pontuação
+LEADING_PUNCTUATION = ('.', ',', ';', ':', '!', '?')
+
+def stitch_chunks(chunks: list, max_overlap: int = MAX_STITCH_OVERLAP) -> str:
+    """
+    Remonta o texto a partir de chunks consecutivos, removendo o trecho repetido
+    entre o fim de um chunk e o início do seguinte. Sem sobreposição, junta com
+    espaço (ou cola, se o chunk começa com pontuação).
+    """
+    text = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not text:
+            text = chunk
+            continue
+        overlap = 0
+        # Maior sufixo do texto que é prefixo do chunk, começando em início de palavra
+        # (ou na pontuação onde o splitter cortou)
+        starts_with_punctuation = chunk.startswith(LEADING_PUNCTUATION)
+        for size in range(min(len(text), len(chunk), max_overlap), 0, -1):
+            boundary = len(text) - size
+            at_boundary = boundary == 0 or text[boundary - 1] == " " or starts_with_punctuation
+            if at_boundary and text.endswith(chunk[:size]):
+                overlap = size
+                break
+        if overlap:
+            text += chunk[overlap:]
+        else:
+            text += chunk if starts_with_punctuation else " " + chunk
+    return text
+
+def parse_document_metadata(metadata: dict) -> dict:
+    """Metadados da coleção de documentos com as listas (guardadas como JSON) decodificadas."""
+    parsed = dict(metadata)
+    parsed["chunk_ids"] = json.loads(metadata.get("chunk_ids") or "[]")
+    parsed["chunk_pages"] = json.loads(metadata.get("chunk_pages") or "[]")
+    parsed["aliases"] = json.loads(metadata.get("aliases") or "[]")
+    return parsed
+
+def select_chunk_ids(chunk_ids: list, chunk_pages: list, page_from: int = None, page_to: int = None) -> list:
+    """IDs (em ordem) dos chunks que tocam o intervalo de páginas [page_from, page_to]."""
+    if page_from is None and page_to is None:
+        return list(chunk_ids)
+    low = page_from if page_from is not None else 1
+    high = page_to if page_to is not None else float("inf")
+    return [chunk_id for chunk_id, (first, last) in zip(chunk_ids, chunk_pages)
+            if last >= low and first <= high]
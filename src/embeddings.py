@@ -0,0 +1,195 @@
+import os
+import sys
+import hashlib
+import argparse
+import numpy as np
+
+# --- CONFIGURAÇÃO ---
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# torch: SentenceTransformer (PyTorch, referência); onnx: ONNX Runtime em CPU;
+# onnx-int8: o mesmo modelo ONNX com pesos quantizados em int8 (quantização dinâmica)
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.cache/embeddings")
+# Export ONNX (model.onnx + tokenizer.json): baixado uma vez com "make onnx-model"
+# ou, em ambientes sem acesso à rede, um export local apontado por EMBEDDING_ONNX_DIR
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(EMBEDDING_CACHE_DIR, f"{EMBEDDING_MODEL}-onnx"))
+# Export público do all-MiniLM-L6-v2 (o mesmo que o Chroma usa), conferido pelo SHA-256
+ONNX_MODEL_URL = "https://chroma-onnx-models.s3.amazonaws.com/all-MiniLM-L6-v2/onnx.tar.gz"
+ONNX_MODEL_SHA256 = "913d7300ceae3b2dbc2c50d1de4baacab4be7b9380491c27fab7418616a16ec3"
+ONNX_MODEL_FILES = ("model.onnx", "tokenizer.json")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = o ONNX Runtime decide
+ONNX_BATCH_SIZE = 32
+# Mesmo limite do SentenceTransformer para este modelo (textos maiores são truncados)
+MAX_SEQ_LENGTH = 256
+# Cosseno mínimo contra o modelo de referência para um backend ser considerado equivalente
+PARITY_MIN_COSINE = 0.98
+
+def onnx_model_dir(model_dir: str | None = None) -> str:
+    """Diretório com model.onnx + tokenizer.json (EMBEDDING_ONNX_DIR por padrão)."""
+    model_dir = model_dir or EMBEDDING_ONNX_DIR
+    missing = [name for name in ONNX_MODEL_FILES if not os.path.exists(os.path.join(model_dir, name))]
+    if missing:
+        raise FileNotFoundError(
+            f"Modelo ONNX não encontrado em '{model_dir}' (faltam: {', '.join(missing)}). "
+            "Baixe com 'make onnx-model' ou aponte EMBEDDING_ONNX_DIR para um export local.")
+    return model_dir
+
+def download_onnx_model(target_dir: str = EMBEDDING_ONNX_DIR, url: str = ONNX_MODEL_URL,
+                        sha256: str = ONNX_MODEL_SHA256) -> str:
+    """Baixa o export ONNX, confere o SHA-256 e extrai model.onnx, tokenizer.json etc. em 'target_dir'."""
+    import shutil
+    import tarfile
+    import tempfile
+    import urllib.request
+
+    os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(target_dir))) as tmp:
+        archive = os.path.join(tmp, "onnx.tar.gz")
+        print(f"⬇️  Baixando {url}...")
+        urllib.request.urlretrieve(url, archive)
+        with open(archive, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        if digest != sha256:
+            raise ValueError(f"SHA-256 do modelo ONNX não confere: {digest} (esperado {sha256}).")
+        with tarfile.open(archive, mode="r:gz") as tar:
+            tar.extractall(path=tmp, filter="data")
+        # O arquivo traz os arquivos dentro de uma pasta (onnx/): ela vira o target_dir
+        extracted = next((root for root, _, files in os.walk(tmp) if "model.onnx" in files), None)
+        if extracted is None:
+            raise ValueError(f"O arquivo baixado de {url} não contém model.onnx.")
+        shutil.rmtree(target_dir, ignore_errors=True)
+        shutil.move(extracted, target_dir)
+    print(f"✅ Modelo ONNX salvo em {target_dir}.")
+    return onnx_model_dir(target_dir)
+
+def quantize_model(model_path: str, output_path: str) -> str:
+    """Quantização dinâmica (pesos int8, ativações quantizadas em tempo de execução)."""
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError as e:
+        raise ImportError("O backend 'onnx-int8' precisa do pacote 'onnx' para quantizar o modelo: "
+                          "uv pip install onnx") from e
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    print(f"⚙️  Quantizando {os.path.basename(model_path)} para int8 (só na primeira vez)...")
+    quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+def quantized_model_path(model_path: str, cache_dir: str = EMBEDDING_CACHE_DIR) -> str:
+    """Caminho do modelo int8 em cache, atrelado ao arquivo de origem (caminho, tamanho e mtime)."""
+    stat = os.stat(model_path)
+    key = f"{os.path.realpath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, f"{EMBEDDING_MODEL}-int8-{hashlib.sha256(key.encode()).hexdigest()[:12]}.onnx")
+
+class OnnxEmbeddingFunction:
+    """
+    all-MiniLM-L6-v2 no ONNX Runtime, com o mesmo pós-processamento do
+    SentenceTransformer (mean pooling pela máscara de atenção + normalização L2).
+
+    Diferente do ONNXMiniLM_L6_V2 do Chroma, que completa toda entrada até 256
+    tokens, cada lote é completado só até o maior texto dele, e os textos são
+    agrupados por tamanho antes de formar os lotes.
+    """
+
+    def __init__(self, quantized: bool = False, model_dir: str | None = None,
+                 cache_dir: str = EMBEDDING_CACHE_DIR, threads: int = EMBEDDING_THREADS,
+                 batch_size: int = ONNX_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = onnx_model_dir(model_dir)
+        model_path = os.path.join(model_dir, "model.onnx")
+        if quantized:
+            quantized_path = quantized_model_path(model_path, cache_dir)
+            if not os.path.exists(quantized_path):
+                quantize_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # até o maior texto do lote
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.log_severity_level = 3
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = max(1, batch_size)
+        self.quantized = quantized
+        self.model_path = model_path
+
+    def __call__(self, input: list) -> list:
+        texts = list(input)
+        embeddings = [None] * len(texts)
+        # Textos de tamanho parecido no mesmo lote: quase nenhum token de padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            for i, embedding in zip(rows, self._embed([texts[i] for i in rows])):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _embed(self, texts: list) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        weights = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-12
+        return (pooled / norms).astype(np.float32)
+
+def get_embedding_function(backend: str | None = None):
+    """
+    Função de embeddings do backend escolhido (EMBEDDING_BACKEND por padrão).
+    Todas recebem uma lista de textos e devolvem um vetor normalizado por texto.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND inválido: '{backend}'. Opções: {', '.join(EMBEDDING_BACKENDS)}.")
+    if backend == "torch":
+        from chromadb.utils import embedding_functions
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+    return OnnxEmbeddingFunction(quantized=backend == "onnx-int8")
+
+def cosine_parity(reference: list, candidate: list) -> dict:
+    """Cosseno entre o vetor de referência e o do backend avaliado, texto a texto."""
+    if not len(reference):
+        return {"n": 0, "min": 0.0, "mean": 0.0, "p01": 0.0}
+    ref = np.asarray(reference, dtype=np.float32)
+    cand = np.asarray(candidate, dtype=np.float32)
+    ref /= np.clip(np.linalg.norm(ref, axis=1, keepdims=True), 1e-12, None)
+    cand /= np.clip(np.linalg.norm(cand, axis=1, keepdims=True), 1e-12, None)
+    cosines = (ref * cand).sum(axis=1)
+    return {
+        "n": int(len(cosines)),
+        "min": round(float(cosines.min()), 5),
+        "mean": round(float(cosines.mean()), 5),
+        "p01": round(float(np.percentile(cosines, 1)), 5),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prepara o export ONNX dos backends 'onnx' e 'onnx-int8'.")
+    parser.add_argument("--download", action="store_true",
+                        help=f"Baixa o modelo para EMBEDDING_ONNX_DIR ({EMBEDDING_ONNX_DIR}).")
+    args = parser.parse_args(argv)
+    if args.download:
+        download_onnx_model()
+        return
+    try:
+        print(f"✅ Modelo ONNX em {onnx_model_dir()}.")
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
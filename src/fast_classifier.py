@@ -0,0 +1,96 @@
+import os
+import json
+
+# --- CONFIGURAÇÃO ---
+ALLOWED_AREAS = ("Computacao", "Medicina", "Quimica")
+# Fração do peso total que a área vencedora precisa ter a mais que a segunda
+FAST_PATH_MARGIN = float(os.getenv("FAST_PATH_MARGIN", "0.5"))
+# Similaridade mínima do melhor hit: abaixo disso a entrada é "fora da base"
+# (ex: Física) e a decisão fica com o agente pesquisador
+FAST_PATH_MIN_SIMILARITY = float(os.getenv("FAST_PATH_MIN_SIMILARITY", "0.3"))
+SEGMENT_CHARS = 600
+N_SEGMENTS = 3
+N_EVIDENCE = 3
+
+def select_segments(text: str, n_segments: int = N_SEGMENTS, size: int = SEGMENT_CHARS) -> list:
+    """
+    Trechos representativos da entrada: o início (título/abstract) e pontos
+    espaçados ao longo do texto (métodos, conclusão), sem repetição.
+    """
+    text = " ".join(text.split())
+    if not text:
+        return []
+    if len(text) <= size or n_segments <= 1:
+        return [text[:size]]
+    last_start = max(0, len(text) - size)
+    # O último ponto fica em 3/4 do texto: o final costuma ser a bibliografia
+    starts = [int(last_start * 0.75 * i / (n_segments - 1)) for i in range(n_segments)]
+    segments = []
+    for start in dict.fromkeys(starts):
+        segment = text[start:start + size].strip()
+        if segment:
+            segments.append(segment)
+    return segments
+
+def hit_similarity(distance: float) -> float:
+    """
+    Similaridade de cosseno a partir da distância L2² do Chroma (padrão da coleção).
+    O all-MiniLM-L6-v2 gera vetores normalizados, então d = 2 - 2*cos.
+    """
+    return max(0.0, 1.0 - distance / 2.0)
+
+def area_vote(hits: list) -> dict:
+    """
+    Voto por área ponderado pela similaridade de cada hit.
+    'margin' é a diferença entre a 1ª e a 2ª área como fração do peso total.
+    """
+    scores = {area: 0.0 for area in ALLOWED_AREAS}
+    best_similarity = 0.0
+    evidence = {}
+    for hit in hits:
+        area = hit.get("area")
+        if area not in scores:
+            continue
+        similarity = hit_similarity(hit.get("distance", 2.0))
+        scores[area] += similarity
+        best_similarity = max(best_similarity, similarity)
+        if hit.get("id") and similarity > evidence.get(hit["id"], (None, -1.0))[1]:
+            evidence[hit["id"]] = (area, similarity)
+
+    total = sum(scores.values())
+    ranking = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    winner, top = ranking[0]
+    runner_up = ranking[1][1]
+    margin = (top - runner_up) / total if total else 0.0
+    winner_ids = sorted((sim, doc_id) for doc_id, (area, sim) in evidence.items() if area == winner)
+    return {
+        "area": winner if total else None,
+        "margin": round(margin, 4),
+        "best_similarity": round(best_similarity, 4),
+        "scores": {area: round(score / total, 4) if total else 0.0 for area, score in scores.items()},
+        "evidence": [doc_id for _, doc_id in reversed(winner_ids)][:N_EVIDENCE],
+    }
+
+def is_decisive(vote: dict, margin: float = FAST_PATH_MARGIN,
+                min_similarity: float = FAST_PATH_MIN_SIMILARITY) -> bool:
+    return (vote["area"] is not None and bool(vote["evidence"])
+            and vote["margin"] >= margin and vote["best_similarity"] >= min_similarity)
+
+def parse_batch_hits(payload: str) -> list:
+    """Hits de todas as consultas da resposta JSON de search_articles_batch."""
+    data = json.loads(payload)
+    return [hit for entry in data for hit in entry.get("hits", [])]
+
+def classify_fast(text: str, search_batch, margin: float = FAST_PATH_MARGIN,
+                  min_similarity: float = FAST_PATH_MIN_SIMILARITY) -> dict:
+    """
+    Classificação determinística (sem LLM): busca os trechos da entrada em uma
+    única chamada a 'search_batch(queries) -> JSON' e vota pela área.
+    O voto volta com 'decisive' indicando se dá para pular o agente pesquisador.
+    """
+    segments = select_segments(text)
+    if not segments:
+        return {"area": None, "decisive": False, "margin": 0.0, "evidence": []}
+    vote = area_vote(parse_batch_hits(search_batch(segments)))
+    vote["decisive"] = is_decisive(vote, margin, min_similarity)
+    return vote
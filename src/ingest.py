@@ -1,48 +1,47 @@
 import os
 import re
+import sys
+import json
+import time
+import bisect
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import chromadb
-from chromadb.utils import embedding_functions
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pypdf import PdfReader
+
+# Permite 'python src/ingest.py' (Makefile) e 'import src.ingest' (testes)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.text_cleaning import clean_text_robust
+from src.bm25 import build_index, save_index, index_is_current
+from src.embeddings import get_embedding_function, EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_BACKENDS
+from src.dedup import simhash, NearDuplicateIndex, also_in_update
+from src.input_cache import file_sha256
 # from dotenv import load_dotenv # Não precisamos mais carregar .env para embeddings
 
 # --- CONFIGURAÇÕES ---
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
-DB_PATH = "./db/chroma_data"
+# CHROMA_DB_PATH permite apontar para outro banco (ex: fixture dos benchmarks)
+DB_PATH = os.getenv("CHROMA_DB_PATH", "./db/chroma_data")
 DATA_PATH = "./data/pdfs"
 COLLECTION_NAME = "scientific_articles"
-
-def clean_text_robust(text: str) -> str:
-    """
-    Limpeza robusta de texto extraído de PDFs.
-    Remove caracteres especiais, corrige hifens quebrados, normaliza espaços.
-    """
-    if not text:
-        return ""
-    
-    # Remove caracteres de controle e tokens especiais
-    text = text.replace("<EOS>", "").replace("<pad>", "").replace("\x00", "")
-    
-    # Corrige hifens quebrados no final de linha (ex: "texto-\nquebrado" -> "textoquebrado")
-    text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
-    
-    # Remove múltiplas quebras de linha e substitui por espaço simples
-    text = re.sub(r'\n+', ' ', text)
-    
-    # Remove múltiplos espaços em branco
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove caracteres não-ASCII problemáticos, mas mantém acentos
-    text = re.sub(r'[^\w\s\.\,\;\:\!\?\-\(\)\[\]\{\}\"\'\@\#\$\%\&\*\+\=\<\>\|\~\`\/\\áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ]', '', text)
-    
-    # Remove espaços no início e fim
-    text = text.strip()
-    
-    # Remove espaços antes de pontuação
-    text = re.sub(r'\s+([\.\,\;\:\!\?])', r'\1', text)
-    
-    return text
+# Com --partition-by-area, cada área também ganha uma coleção própria (HNSW menor
+# para buscas filtradas por área), identificada pelo metadado 'partition_area'
+PARTITION_PREFIX = f"{COLLECTION_NAME}__"
+# Um registro por artigo: embedding médio dos chunks + chunk_ids em ordem e páginas
+DOCUMENTS_COLLECTION_NAME = "scientific_documents"
+# 2: artigos e chunks identificados pelo caminho relativo a DATA_PATH ("Area/arquivo.pdf")
+DOCUMENT_INDEX_VERSION = 2
+DOCUMENT_PREVIEW_CHARS = 1000
+MANIFEST_PATH = os.path.join(os.path.dirname(DB_PATH), "ingest_manifest.json")
+# Índice léxico (BM25) da busca híbrida, reconstruído a partir da coleção ao final
+BM25_PATH = os.path.join(os.path.dirname(DB_PATH), "bm25")
+BM25_READ_BATCH = 5000
+EMBED_BATCH_SIZE = 256
 
 def get_files_from_data():
     """Varre a pasta data/pdfs e retorna lista de caminhos e áreas baseadas nas subpastas."""
@@ -60,87 +59,756 @@ def get_files_from_data():
                 documents.append({"path": full_path, "area": area, "filename": file})
     return documents
 
-def extract_text_from_pdf(pdf_path):
+def document_id(path: str) -> str:
+    """
+    ID do artigo (e prefixo dos IDs dos seus chunks): caminho relativo a DATA_PATH,
+    como "Computacao/transformers.pdf". O mesmo nome de arquivo pode existir em duas áreas.
+    """
+    return os.path.relpath(path, DATA_PATH).replace(os.sep, "/")
+
+# Palavra hifenizada no fim de uma página, continuada na página seguinte
+TRAILING_HYPHEN = re.compile(r'\w+-\s*$')
+# Pontuação no início de uma página cola no texto anterior (como no texto inteiro)
+LEADING_PUNCTUATION = ('.', ',', ';', ':', '!', '?')
+
+def build_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+
+def iter_pdf_pages_numbered(pdf_path):
+    """
+    Gera (número da página, texto limpo) de cada página do PDF, uma por vez,
+    sem montar o documento inteiro em memória. Uma palavra hifenizada na quebra
+    de página é levada para a página seguinte, para que a limpeza a reconstrua.
+    Páginas que falham na extração são ignoradas com aviso.
+    """
     try:
         reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            extract = page.extract_text()
-            if extract: text += extract + "\n"
-        return text
     except Exception as e:
         print(f"❌ Erro ao ler {pdf_path}: {e}")
+        return
+
+    carry = ""
+    number = 0
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            extract = page.extract_text()
+        except Exception as e:
+            print(f"⚠️  {pdf_path}: página {number} ignorada ({e})")
+            continue
+        if not extract: continue
+
+        text = carry + extract + "\n"
+        carry = ""
+        match = TRAILING_HYPHEN.search(text)
+        if match:
+            text, carry = text[:match.start()], text[match.start():]
+
+        cleaned = clean_text_robust(text)
+        if cleaned:
+            yield number, cleaned
+
+    if carry:
+        cleaned = clean_text_robust(carry)
+        if cleaned:
+            yield number, cleaned
+
+def iter_pdf_pages(pdf_path):
+    """Gera o texto limpo de cada página do PDF (sem o número da página)."""
+    for _, text in iter_pdf_pages_numbered(pdf_path):
+        yield text
+
+def extract_text_from_pdf(pdf_path):
+    text = " ".join(iter_pdf_pages(pdf_path))
+    return text or None
+
+def locate_chunks(buffer: str, chunks: list) -> list:
+    """
+    Posição de cada chunk no buffer de onde saiu. Os chunks vêm em ordem e
+    se sobrepõem, então cada busca começa logo depois do início do anterior.
+    """
+    positions = []
+    previous = -1
+    for chunk in chunks:
+        start = buffer.find(chunk, previous + 1)
+        if start < 0:  # não deveria acontecer; mantém a posição anterior
+            start = max(previous, 0)
+        positions.append(start)
+        previous = start
+    return positions
+
+def iter_chunks_with_pages(pages, text_splitter, window: int = CHUNK_SIZE * 8):
+    """
+    Consome um fluxo de (número da página, texto) e gera (chunk, página inicial,
+    página final) à medida que o buffer enche.
+    O último chunk de cada split fica no buffer: ele ainda pode crescer com a
+    próxima página e já começa com o overlap do chunk anterior, então o
+    overlap é preservado entre páginas. A memória fica limitada a ~window.
+    """
+    buffer = ""
+    offsets, numbers = [], []  # onde cada página começa no buffer
+
+    def page_at(position):
+        return numbers[max(0, bisect.bisect_right(offsets, position) - 1)]
+
+    def spans(chunks):
+        for chunk, start in zip(chunks, locate_chunks(buffer, chunks)):
+            yield chunk, start, page_at(start), page_at(start + max(len(chunk) - 1, 0))
+
+    for number, page in pages:
+        if buffer and not page.startswith(LEADING_PUNCTUATION):
+            buffer += " "
+        offsets.append(len(buffer))
+        numbers.append(number)
+        buffer += page
+        if len(buffer) < window:
+            continue
+        chunks = list(spans(text_splitter.split_text(buffer)))
+        for chunk, _, first, last in chunks[:-1]:
+            yield chunk, first, last
+        if not chunks:
+            buffer, offsets, numbers = "", [], []
+            continue
+        # O buffer passa a ser o último chunk; as páginas são reancoradas nele
+        tail, tail_start, _, _ = chunks[-1]
+        keep = max(0, bisect.bisect_right(offsets, tail_start) - 1)
+        offsets = [0] + [offset - tail_start for offset in offsets[keep + 1:]]
+        numbers = numbers[keep:]
+        buffer = tail
+
+    if buffer:
+        for chunk, _, first, last in spans(text_splitter.split_text(buffer)):
+            yield chunk, first, last
+
+def iter_chunks(pages, text_splitter, window: int = CHUNK_SIZE * 8):
+    """Como iter_chunks_with_pages, para um fluxo de textos de página sem numeração."""
+    for chunk, _, _ in iter_chunks_with_pages(enumerate(pages, start=1), text_splitter, window):
+        yield chunk
+
+def iter_document_chunks(doc: dict, text_splitter=None):
+    """Extrai, limpa e divide um PDF em (chunk, página inicial, página final), página a página."""
+    text_splitter = text_splitter or build_text_splitter()
+    return iter_chunks_with_pages(iter_pdf_pages_numbered(doc['path']), text_splitter)
+
+def _extract_chunks(doc: dict):
+    """Etapa executada nos processos do pool: extrai, limpa e divide um PDF."""
+    return doc, list(iter_document_chunks(doc))
+
+def extract_documents(docs: list, workers: int = 1):
+    """
+    Gera (doc, chunks) para cada PDF. Com um único worker (o padrão), os chunks
+    são produzidos sob demanda (streaming, memória limitada a algumas páginas).
+    Com vários workers, a extração roda em um pool de processos e a lista de
+    chunks de cada arquivo inteiro volta do worker de uma vez (sem streaming).
+    Nos dois casos os resultados saem na ordem de 'docs' (a deduplicação depende
+    dela para escolher sempre a mesma cópia); no pool, no máximo 2x o número de
+    workers ficam em voo ou prontos esperando a vez, limitando a memória do pai.
+    """
+    if workers <= 1 or len(docs) <= 1:
+        for doc in docs:
+            yield doc, iter_document_chunks(doc)
+        return
+
+    pending_docs = list(docs)
+    workers = min(workers, len(docs))
+
+    # 'spawn': o processo pai já tem threads (cliente do Chroma), e fork() com threads pode travar
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        while pending_docs or in_flight:
+            while pending_docs and len(in_flight) < 2 * workers:
+                in_flight.append(pool.submit(_extract_chunks, pending_docs.pop(0)))
+            yield in_flight.popleft().result()
+
+# --- LOTES DE EMBEDDINGS ---
+
+class EmbeddingBatcher:
+    """
+    Junta chunks de vários documentos em lotes de tamanho fixo, calcula os
+    embeddings explicitamente e grava cada lote com um único upsert.
+    O tamanho do lote controla o throughput e o pico de memória.
+    """
+
+    def __init__(self, collection, embedding_func, batch_size: int = EMBED_BATCH_SIZE, on_written=None,
+                 partition_for=None):
+        self.collection = collection
+        self.embedding_func = embedding_func
+        # partition_for(area) -> coleção da área (ou None): os mesmos embeddings vão para as duas
+        self.partition_for = partition_for
+        self.batch_size = max(1, batch_size)
+        self.on_written = on_written  # chamado com a chave do documento quando todos os seus chunks foram gravados
+        self.ids, self.documents, self.metadatas, self.keys = [], [], [], []
+        self.pending = {}  # chave do documento -> chunks ainda não gravados
+        self.open = set()  # documentos que ainda podem receber chunks
+        self.embedding_sums = {}  # chave do documento -> soma dos embeddings (para o vetor do documento)
+        self.total_chunks = 0
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def add(self, key, ids: list, documents: list, metadatas: list):
+        """Enfileira chunks de um documento (pode ser chamado várias vezes até finish)."""
+        self.open.add(key)
+        self.pending[key] = self.pending.get(key, 0) + len(ids)
+        for item in zip(ids, documents, metadatas):
+            self.ids.append(item[0])
+            self.documents.append(item[1])
+            self.metadatas.append(item[2])
+            self.keys.append(key)
+            if len(self.ids) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if not self.ids:
+            return
+        start = time.perf_counter()
+        embeddings = self.embedding_func(self.documents)
+        embedded = time.perf_counter()
+        self.collection.upsert(
+            ids=self.ids, documents=self.documents, metadatas=self.metadatas, embeddings=embeddings
+        )
+        if self.partition_for:
+            self._upsert_partitions(embeddings)
+        written = time.perf_counter()
+
+        count = len(self.ids)
+        self.total_chunks += count
+        self.embed_seconds += embedded - start
+        self.write_seconds += written - embedded
+        print(f"   ⚡ Lote de {count} chunks: {count / max(written - start, 1e-9):.1f} chunks/s")
+
+        keys = self.keys
+        self.ids, self.documents, self.metadatas, self.keys = [], [], [], []
+        for key, embedding in zip(keys, embeddings):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if key in self.embedding_sums:
+                self.embedding_sums[key] += embedding
+            else:
+                self.embedding_sums[key] = embedding.copy()
+        for key in keys:
+            self.pending[key] -= 1
+            if self.pending[key] == 0 and key not in self.open:
+                self._written(key)
+
+    def _upsert_partitions(self, embeddings):
+        by_area = {}
+        for i, metadata in enumerate(self.metadatas):
+            by_area.setdefault(metadata.get("area"), []).append(i)
+        for area, rows in by_area.items():
+            partition = self.partition_for(area)
+            if partition is None:
+                continue
+            partition.upsert(
+                ids=[self.ids[i] for i in rows],
+                documents=[self.documents[i] for i in rows],
+                metadatas=[self.metadatas[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+            )
+
+    def finish(self, key):
+        """Marca o documento como completo; avisa on_written quando tudo estiver gravado."""
+        self.open.discard(key)
+        if self.pending.get(key, 0) == 0:
+            self._written(key)
+
+    def _written(self, key):
+        self.pending.pop(key, None)
+        if self.on_written:
+            self.on_written(key)
+        self.embedding_sums.pop(key, None)
+
+    def document_embedding(self, key):
+        """Centróide normalizado dos chunks do documento (válido dentro de on_written)."""
+        total = self.embedding_sums.get(key)
+        if total is None:
+            return None
+        norm = float(np.linalg.norm(total))
+        return (total / norm if norm else total).tolist()
+
+    def report(self):
+        elapsed = self.embed_seconds + self.write_seconds
+        if not self.total_chunks or elapsed <= 0:
+            return
+        print(f"📈 {self.total_chunks} chunks em {elapsed:.1f}s ({self.total_chunks / elapsed:.1f} chunks/s, "
+              f"lote={self.batch_size}; embeddings {self.embed_seconds:.1f}s, escrita {self.write_seconds:.1f}s)")
+
+# --- MANIFESTO (INDEXAÇÃO INCREMENTAL) ---
+
+def index_settings(partition_by_area: bool = False, dedup: bool = True, embedding_backend: str = "torch") -> dict:
+    """Parâmetros que, se alterados, invalidam todos os chunks já indexados."""
+    settings = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": EMBEDDING_MODEL,
+        "document_index": DOCUMENT_INDEX_VERSION,
+    }
+    if partition_by_area:
+        # Só entra quando ligado: bancos sem partição não são reconstruídos
+        settings["partition_by_area"] = True
+    if not dedup:
+        # Idem: a deduplicação é o padrão, só o --no-dedup muda as configurações
+        settings["dedup"] = False
+    if embedding_backend != "torch":
+        # Vetores de backends diferentes não se misturam na mesma coleção: trocar reindexa tudo
+        settings["embedding_backend"] = embedding_backend
+    return settings
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """Carrega o manifesto da última indexação (ou um manifesto vazio)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get("files"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"settings": None, "files": {}}
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def plan_changes(docs: list, manifest: dict):
+    """
+    Compara os PDFs encontrados com o manifesto.
+    Retorna (novos_ou_alterados, caminhos_removidos, inalterados).
+    Tamanho e mtime iguais dispensam o hash; se mudaram, o hash decide.
+    """
+    known = manifest.get("files", {})
+    changed, unchanged = [], []
+
+    for doc in docs:
+        stat = os.stat(doc["path"])
+        doc["size"] = stat.st_size
+        doc["mtime"] = stat.st_mtime
+        entry = known.get(doc["path"])
+
+        if entry and entry.get("size") == doc["size"] and entry.get("mtime") == doc["mtime"]:
+            doc["sha256"] = entry.get("sha256")
+            unchanged.append(doc)
+            continue
+
+        doc["sha256"] = file_sha256(doc["path"])
+        if entry and entry.get("sha256") == doc["sha256"] and entry.get("area") == doc["area"]:
+            # Apenas o mtime mudou (ex: cópia/touch): não precisa reindexar
+            unchanged.append(doc)
+        else:
+            changed.append(doc)
+
+    current_paths = {doc["path"] for doc in docs}
+    removed = [path for path in known if path not in current_paths]
+    return changed, removed, unchanged
+
+def manifest_entry(doc: dict, chunk_ids: list, embedding_backend: str = "torch", shared_chunk_ids: list = None,
+                   fingerprints: dict = None, duplicate_of: str = None) -> dict:
+    """
+    'chunk_ids' são os chunks gravados por este arquivo. Com a deduplicação,
+    'shared_chunk_ids' são chunks de outros arquivos que ele reaproveita,
+    'fingerprints' o SimHash (hex) de cada chunk próprio e 'duplicate_of' o
+    caminho do arquivo idêntico que foi indexado no lugar dele.
+    """
+    entry = {
+        "filename": doc["filename"],
+        "area": doc["area"],
+        "size": doc["size"],
+        "mtime": doc["mtime"],
+        "sha256": doc["sha256"],
+        "chunk_ids": chunk_ids,
+        # Informativo: o backend também entra em index_settings, e trocá-lo reindexa
+        # tudo, então todas as entradas do manifesto têm sempre o mesmo valor
+        "embedding_backend": embedding_backend,
+    }
+    if shared_chunk_ids:
+        entry["shared_chunk_ids"] = shared_chunk_ids
+    if fingerprints:
+        entry["fingerprints"] = fingerprints
+    if duplicate_of:
+        entry["duplicate_of"] = duplicate_of
+    return entry
+
+def plan_dependents(manifest: dict, invalidated: list, unchanged: list):
+    """
+    Arquivos inalterados que reaproveitam chunks (ou o arquivo inteiro) de um
+    arquivo removido ou alterado também precisam ser reindexados. Repete até
+    estabilizar: reindexar um dependente apaga os chunks dele, que outros podem usar.
+    Retorna (dependentes, inalterados restantes).
+    """
+    files = manifest.get("files", {})
+    lost_paths = set(invalidated)
+    lost_chunks = {chunk_id for path in lost_paths for chunk_id in files.get(path, {}).get("chunk_ids", [])}
+    dependents, remaining = [], list(unchanged)
+    while True:
+        found = [doc for doc in remaining
+                 if files[doc["path"]].get("duplicate_of") in lost_paths
+                 or lost_chunks.intersection(files[doc["path"]].get("shared_chunk_ids", []))]
+        if not found:
+            return dependents, remaining
+        for doc in found:
+            lost_paths.add(doc["path"])
+            lost_chunks.update(files[doc["path"]].get("chunk_ids", []))
+        dependents.extend(found)
+        remaining = [doc for doc in remaining if doc not in found]
+
+def sync_aliases(manifest: dict, documents) -> int:
+    """
+    Grava em cada artigo indexado a lista das suas cópias idênticas (IDs "Area/arquivo.pdf"),
+    no manifesto e no metadado 'aliases' (JSON) da coleção de documentos, e o mapa
+    cópia -> artigo indexado em manifest["aliases"] (o servidor resolve get_document
+    de uma cópia por ele). Devolve quantas mudanças houve (artigos e o mapa).
+    """
+    files = manifest["files"]
+    aliases, canonical_ids = {}, {}
+    for path, entry in files.items():
+        if entry.get("duplicate_of") in files:
+            aliases.setdefault(entry["duplicate_of"], []).append(document_id(path))
+            canonical_ids[document_id(path)] = document_id(entry["duplicate_of"])
+    updated = 0
+    if manifest.get("aliases", {}) != canonical_ids:
+        manifest["aliases"] = dict(sorted(canonical_ids.items()))
+        updated += 1
+    for path, entry in files.items():
+        names = sorted(aliases.get(path, []))
+        if entry.get("duplicate_of") or entry.get("aliases", []) == names:
+            continue
+        if not documents.get(ids=[document_id(path)], include=[])["ids"]:
+            continue  # registro do artigo ausente (ex: sem vetor): tenta de novo na próxima execução
+        documents.update(ids=[document_id(path)], metadatas=[{"aliases": json.dumps(names)}])
+        entry["aliases"] = names
+        updated += 1
+    return updated
+
+def update_also_in(collection, sources: dict, partition_for=None, remove: bool = False) -> int:
+    """
+    Soma (ou tira, com 'remove') arquivos do 'also_in' dos chunks mesclados:
+    'sources' mapeia chunk_id -> nomes dos arquivos que o reaproveitam. Chunks
+    que não existem mais são ignorados. Devolve quantos chunks foram atualizados.
+    """
+    if not sources:
+        return 0
+    stored = collection.get(ids=list(sources), include=["metadatas"])
+    if not stored["ids"]:
+        return 0
+    change = "remove" if remove else "add"
+    updates = [also_in_update(meta or {}, **{change: sources[chunk_id]})
+               for chunk_id, meta in zip(stored["ids"], stored["metadatas"])]
+    collection.update(ids=stored["ids"], metadatas=updates)
+    # A partição da área tem cópias dos mesmos chunks (mesmos IDs e metadados)
+    by_area = {}
+    for chunk_id, meta, update in zip(stored["ids"], stored["metadatas"], updates):
+        by_area.setdefault((meta or {}).get("area"), []).append((chunk_id, update))
+    for area, rows in by_area.items():
+        partition = partition_for(area) if partition_for else None
+        if partition is not None:
+            partition.update(ids=[chunk_id for chunk_id, _ in rows], metadatas=[update for _, update in rows])
+    return len(stored["ids"])
+
+def document_record(doc: dict, chunk_ids: list, chunk_pages: list) -> dict:
+    """Metadados do artigo na coleção de documentos (listas guardadas como JSON)."""
+    return {
+        "source": doc["filename"],
+        "area": doc["area"],
+        "n_chunks": len(chunk_ids),
+        "n_pages": max((last for _, last in chunk_pages), default=0),
+        "chunk_ids": json.dumps(chunk_ids),
+        "chunk_pages": json.dumps(chunk_pages),
+    }
+
+def stored_centroid(collection, chunk_ids: list):
+    """
+    Centróide normalizado de chunks já gravados (um chunk repetido conta de novo),
+    para artigos que reaproveitam chunks de outros arquivos. None se nenhum existir.
+    """
+    stored = collection.get(ids=list(dict.fromkeys(chunk_ids)), include=["embeddings"])
+    by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    vectors = [np.asarray(by_id[i], dtype=np.float32) for i in chunk_ids if i in by_id]
+    if not vectors:
         return None
+    total = np.sum(vectors, axis=0)
+    norm = float(np.linalg.norm(total))
+    return (total / norm if norm else total).tolist()
+
+def rebuild_lexical_index(collection, path: str = BM25_PATH) -> dict:
+    """
+    Reconstrói o índice BM25 com todos os chunks da coleção (lidos em páginas).
+    Tokenizar o corpus inteiro custa bem menos que os embeddings, então não
+    vale a pena manter o índice invertido incremental.
+    """
+    start = time.perf_counter()
+    ids, texts, metadatas = [], [], []
+    total = collection.count()
+    for offset in range(0, total, BM25_READ_BATCH):
+        page = collection.get(include=["documents", "metadatas"], limit=BM25_READ_BATCH, offset=offset)
+        ids.extend(page["ids"])
+        texts.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    index = build_index(ids, texts, metadatas)
+    save_index(index, path)
+    meta = index["meta"]
+    print(f"🔤 Índice BM25: {meta['n_docs']} chunks, {meta['n_terms']} termos, "
+          f"{meta['n_postings']} postings ({time.perf_counter() - start:.2f}s).")
+    return meta
+
+def partition_collection_name(area: str) -> str:
+    """Nome válido para o Chroma (letras, números, '_', '-') da coleção da área."""
+    return PARTITION_PREFIX + "".join(c if c.isalnum() or c in "_-" else "_" for c in area)
+
+def list_partitions(client) -> list:
+    return [c.name for c in client.list_collections() if c.name.startswith(PARTITION_PREFIX)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexa os PDFs de referência no ChromaDB.")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignora o manifesto e reconstrói a coleção do zero.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos para extração/limpeza dos PDFs (padrão: 1, em streaming). "
+                             "Com mais de 1, cada PDF volta inteiro do worker (mais rápido, mais memória).")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE,
+                        help=f"Chunks por lote de embeddings/upsert (padrão: {EMBED_BATCH_SIZE}).")
+    parser.add_argument("--partition-by-area", action="store_true",
+                        help="Grava também uma coleção por área (buscas filtradas por área ficam mais rápidas). "
+                             "Fica ligada nas execuções seguintes; para desligar, rode --full sem ela.")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help=f"Backend dos embeddings (padrão: EMBEDDING_BACKEND={EMBEDDING_BACKEND}).")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Indexa arquivos idênticos e chunks quase duplicados normalmente. "
+                             "Fica desligada nas execuções seguintes; para religar, rode --full sem ela.")
+    args = parser.parse_args(argv)
 
-def main():
     # 1. Configurar Cliente ChromaDB
     client = chromadb.PersistentClient(path=DB_PATH)
     
     
-    print("⚙️  Carregando modelo de embeddings local (pode demorar um pouco na 1ª vez)...")
-    embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
-    )
+    print(f"⚙️  Carregando modelo de embeddings local ({args.embedding_backend}; pode demorar um pouco na 1ª vez)...")
+    embedding_func = get_embedding_function(args.embedding_backend)
 
-    try:
-        client.delete_collection(name=COLLECTION_NAME)
-        print(f"🗑️  Coleção anterior removida para reinício limpo.")
-    except Exception as e:
-        pass
+    manifest = load_manifest()
+    previous = manifest.get("settings") or {}
+    partition_by_area = args.partition_by_area or (not args.full and bool(previous.get("partition_by_area")))
+    dedup = not (args.no_dedup or (not args.full and previous.get("dedup") is False))
+    settings = index_settings(partition_by_area, dedup, args.embedding_backend)
+    full_rebuild = args.full or manifest.get("settings") != settings
 
-    collection = client.create_collection(
+    if full_rebuild:
+        for name in (COLLECTION_NAME, DOCUMENTS_COLLECTION_NAME, *list_partitions(client)):
+            try:
+                client.delete_collection(name=name)
+                print(f"🗑️  Coleção anterior '{name}' removida para reinício limpo.")
+            except Exception as e:
+                pass
+        manifest = {"settings": settings, "files": {}}
+
+    # Os embeddings são sempre calculados aqui (EmbeddingBatcher), com o backend
+    # escolhido: a coleção não guarda uma embedding_function própria
+    collection = client.get_or_create_collection(
         name=COLLECTION_NAME,
-        embedding_function=embedding_func
+        embedding_function=None
+    )
+    # Vetores já vêm calculados (centróides), então a coleção não precisa de embedding_function.
+    # Espaço cosseno: o score (1 - distância) dos documentos é a similaridade de cosseno.
+    documents = client.get_or_create_collection(
+        name=DOCUMENTS_COLLECTION_NAME,
+        embedding_function=None,
+        metadata={"hnsw:space": "cosine"}
     )
 
+    partitions = {}
+
+    def partition_for(area):
+        if not partition_by_area or not area:
+            return None
+        if area not in partitions:
+            # Mesma métrica (L2) da coleção principal: as distâncias continuam comparáveis
+            partitions[area] = client.get_or_create_collection(
+                name=partition_collection_name(area),
+                embedding_function=None,
+                metadata={"partition_area": area}
+            )
+        return partitions[area]
+
+    if manifest["files"] and (collection.count() == 0 or documents.count() == 0):
+        # Banco apagado (ex: 'make clean') mas o manifesto sobreviveu
+        print("⚠️  Manifesto sem coleção correspondente. Reindexando tudo.")
+        manifest["files"] = {}
+
     # 2. Ler Arquivos
     docs_metadata = get_files_from_data()
-    if not docs_metadata:
+    if not docs_metadata and not manifest["files"]:
         print("⚠️  Nenhum PDF encontrado. Verifique as pastas em 'data/pdfs/'.")
         return
 
-    print(f"📚 Encontrados {len(docs_metadata)} artigos. Processando...")
+    changed, removed, unchanged = plan_changes(docs_metadata, manifest)
+    print(f"📚 Encontrados {len(docs_metadata)} artigos: {len(changed)} novos/alterados, "
+          f"{len(removed)} removidos, {len(unchanged)} inalterados.")
+    dependents, unchanged = plan_dependents(manifest, removed + [doc["path"] for doc in changed], unchanged)
+    if dependents:
+        print(f"🔗 {len(dependents)} artigo(s) reaproveitavam chunks alterados/removidos: reindexando também.")
+        changed += dependents
 
-    # 3. Splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
+    # 3. Remove chunks de arquivos apagados ou modificados
+    stale_also_in = {}  # chunks de outros arquivos que marcavam estes em 'also_in'
+    for path in removed + [doc["path"] for doc in changed]:
+        entry = manifest["files"].pop(path, None)
+        for chunk_id in (entry or {}).get("shared_chunk_ids", []):
+            stale_also_in.setdefault(chunk_id, set()).add(entry["filename"])
+        if entry and entry.get("chunk_ids"):
+            collection.delete(ids=entry["chunk_ids"])
+            partition = partition_for(entry.get("area"))
+            if partition is not None:
+                partition.delete(ids=entry["chunk_ids"])
+            print(f"🗑️  {entry['filename']}: {len(entry['chunk_ids'])} chunks antigos removidos.")
+        if entry and not entry.get("duplicate_of"):
+            documents.delete(ids=[document_id(path)])
+    update_also_in(collection, stale_also_in, partition_for, remove=True)
+
+    # Arquivos inalterados só atualizam tamanho/mtime no manifesto
+    for doc in unchanged:
+        entry = manifest["files"][doc["path"]]
+        manifest["files"][doc["path"]] = {**entry, **manifest_entry(doc, entry.get("chunk_ids", []),
+                                                                    entry.get("embedding_backend", "torch"))}
+    save_manifest(manifest)
+
+    # Deduplicação antes dos embeddings: um arquivo idêntico (mesmo SHA-256) a outro já
+    # indexado vira só um alias, e chunks quase iguais (SimHash) a um já gravado não são
+    # gravados de novo: o documento aponta para o chunk existente.
+    # Só dentro da mesma área: o chunk guarda uma área só, e uma cópia mesclada com a de
+    # outra área sumiria dos filtros por área, das partições e do voto do fast path.
+    # Em ordem de caminho (a extração preserva a ordem): a cópia que fica é sempre a mesma.
+    changed = sorted(changed, key=lambda d: d["path"])
+    near_duplicates = {}  # área -> NearDuplicateIndex
+    canonical_files, duplicates = {}, []
+    if dedup:
+        for doc in unchanged:
+            entry = manifest["files"][doc["path"]]
+            if entry.get("duplicate_of"):
+                continue
+            canonical_files.setdefault((entry.get("sha256"), doc["area"]), doc["path"])
+            area_index = near_duplicates.setdefault(doc["area"], NearDuplicateIndex())
+            for chunk_id, fingerprint in entry.get("fingerprints", {}).items():
+                area_index.add(chunk_id, int(fingerprint, 16))
+        unique = []
+        for doc in changed:
+            canonical = canonical_files.setdefault((doc["sha256"], doc["area"]), doc["path"])
+            if canonical == doc["path"]:
+                unique.append(doc)
+            else:
+                duplicates.append((doc, canonical))
+        changed = unique
+
+    def record_duplicates():
+        # Depois dos originais: um alias nunca aponta para um arquivo ainda não indexado
+        for doc, canonical in duplicates:
+            if canonical not in manifest["files"]:
+                continue  # o original falhou na extração: a cópia (mesmos bytes) também falharia
+            manifest["files"][doc["path"]] = manifest_entry(doc, [], args.embedding_backend, duplicate_of=canonical)
+            print(f"♻️  {doc['filename']} ({doc['area']}): idêntico a {canonical}, registrado como alias.")
+        updated = sync_aliases(manifest, documents) if dedup else 0
+        if duplicates or updated:
+            save_manifest(manifest)
 
-    # 4. Processamento
-    total_chunks = 0
+    if not changed:
+        record_duplicates()
+        if removed or full_rebuild or not index_is_current(BM25_PATH):
+            rebuild_lexical_index(collection)
+        print(f"\n✅ Índice já atualizado ({collection.count()} chunks em '{DB_PATH}').")
+        return
+
+    # 4. Processamento: extração/limpeza/split (streaming ou pool), embeddings e escrita neste processo
+    print(f"⚙️  Extraindo {len(changed)} PDFs com {min(args.workers, len(changed))} processo(s)...")
+    entries = {}
+    records = {}
+    merged = set()  # arquivos com chunks mesclados: o vetor do documento sai da coleção, no fim
+    merged_chunks = 0
+    merged_into = {}  # chunk mantido -> arquivos que o reaproveitam (metadado 'also_in')
+    failed = 0
+
+    def write_document(path, embedding):
+        record, preview = records.pop(path)
+        if embedding is not None:
+            documents.upsert(ids=[document_id(path)], embeddings=[embedding],
+                             documents=[preview], metadatas=[record])
+        manifest["files"][path] = entries.pop(path)
+        save_manifest(manifest)
+
+    def on_written(path):
+        # Só registra o arquivo no manifesto depois que todos os seus chunks foram gravados
+        if path not in merged:
+            write_document(path, batcher.document_embedding(path))
+
+    batch_size = min(args.batch_size, client.get_max_batch_size())
+    batcher = EmbeddingBatcher(collection, embedding_func, batch_size=batch_size, on_written=on_written,
+                               partition_for=partition_for if partition_by_area else None)
     
-    for doc in docs_metadata:
-        raw_text = extract_text_from_pdf(doc['path'])
-        if not raw_text: continue
-
-        # Limpa o texto ANTES de fazer o split
-        cleaned_text = clean_text_robust(raw_text)
-        
-        chunks = text_splitter.split_text(cleaned_text)
-        
-        ids = []
-        metadatas = []
-        documents_content = []
-
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{doc['filename']}_chunk_{i}"
+    for doc, chunks in extract_documents(changed, workers=args.workers):
+        ids, own_ids, pages, fingerprints, preview = [], [], [], {}, ""
+        area_index = near_duplicates.setdefault(doc["area"], NearDuplicateIndex()) if dedup else None
+        for i, (chunk, page_start, page_end) in enumerate(chunks):
+            chunk_id = f"{document_id(doc['path'])}_chunk_{i}"
+            pages.append([page_start, page_end])
+            preview = preview or chunk
+            fingerprint = simhash(chunk) if dedup else None
+            match = area_index.find(fingerprint) if fingerprint is not None else None
+            if match is not None:
+                ids.append(match)
+                merged_chunks += 1
+                if match not in fingerprints:  # repetição dentro do próprio arquivo não vira also_in
+                    merged_into.setdefault(match, set()).add(doc["filename"])
+                continue
             ids.append(chunk_id)
-            documents_content.append(chunk)
+            own_ids.append(chunk_id)
+            if fingerprint is not None:
+                area_index.add(chunk_id, fingerprint)
+                fingerprints[chunk_id] = f"{fingerprint:016x}"
             # Metadados são cruciais para o RAG depois
-            metadatas.append({
+            metadata = {
                 "source": doc['filename'],
                 "area": doc['area'],
-                "chunk_index": i
-            })
+                "chunk_index": i,
+                "page_start": page_start,
+                "page_end": page_end
+            }
+            batcher.add(doc["path"], [chunk_id], [chunk], [metadata])
+
+        if not ids:
+            # Falha na extração (ou PDF sem texto): fora do manifesto, para ser tentado de novo
+            failed += 1
+            print(f"⚠️  {doc['filename']} ({doc['area']}): nenhum texto extraído; "
+                  f"fica fora do índice e será tentado na próxima execução.")
+            continue
+
+        shared = sorted(set(ids) - set(own_ids))
+        if len(own_ids) < len(ids):
+            merged.add(doc["path"])
+        entries[doc["path"]] = manifest_entry(doc, own_ids, args.embedding_backend, shared, fingerprints)
+        records[doc["path"]] = (document_record(doc, ids, pages), preview[:DOCUMENT_PREVIEW_CHARS])
+        print(f"✅ {doc['filename']} ({doc['area']}): {len(own_ids)} chunks"
+              f"{f' (+{len(ids) - len(own_ids)} quase duplicados mesclados)' if len(own_ids) < len(ids) else ''}.")
+        batcher.finish(doc["path"])
 
-        if ids:
-            collection.add(ids=ids, documents=documents_content, metadatas=metadatas)
-            total_chunks += len(ids)
-            print(f"✅ {doc['filename']} ({doc['area']}): {len(ids)} chunks.")
+    batcher.flush()
+    batcher.report()
+    # Depois do flush: o chunk mantido pode ter sido gravado só no último lote
+    update_also_in(collection, merged_into, partition_for)
+    for path in merged:
+        write_document(path, stored_centroid(collection, json.loads(records[path][0]["chunk_ids"])))
+    record_duplicates()
+    if dedup:
+        print(f"♻️  Deduplicação: {merged_chunks} chunks quase duplicados sem novo embedding, "
+              f"{len(duplicates)} arquivo(s) idêntico(s) registrado(s) como alias.")
+    total_chunks = batcher.total_chunks
+    rebuild_lexical_index(collection)
 
-    print(f"\n🎉 Sucesso! {total_chunks} chunks indexados localmente em '{DB_PATH}'.")
+    print(f"\n🎉 Sucesso! {total_chunks} chunks indexados localmente em '{DB_PATH}' "
+          f"(total na coleção: {collection.count()}; {documents.count()} documentos).")
+    if failed:
+        print(f"⚠️  {failed} PDF(s) sem texto extraído ficaram fora do manifesto.")
+    if partitions:
+        print("🗂️  Partições por área: " + ", ".join(f"{area} ({c.count()})" for area, c in sorted(partitions.items())))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import os
+import json
+import zlib
+import hashlib
+import threading
+from src.cache import HitMissStats, cache_enabled, lazy_singleton
+
+# --- CONFIGURAÇÃO ---
+INPUT_CACHE_DIR = os.getenv("INPUT_CACHE_DIR", "./.cache/inputs")
+INPUT_CACHE_MAX_MB = float(os.getenv("INPUT_CACHE_MAX_MB", "256"))
+# Dentro desta janela uma URL já baixada é reaproveitada sem nenhum acesso à rede;
+# depois dela, o cache só vale se ETag/Last-Modified do servidor não mudaram.
+URL_FRESH_SECONDS = int(os.getenv("INPUT_CACHE_URL_TTL", "3600"))
+ENTRY_SUFFIX = ".z"
+
+def input_cache_enabled() -> bool:
+    """INPUT_CACHE=0 desliga o cache (equivale a --no-cache no agente)."""
+    return cache_enabled("INPUT_CACHE")
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash SHA-256 do conteúdo do arquivo, lido em blocos. Único helper de hash de
+    arquivos: o manifesto da ingestão (src/ingest.py) também o usa.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class InputCache(HitMissStats):
+    """
+    Cache em disco do texto já extraído das entradas (PDFs e páginas web).
+
+    Cada entrada é um arquivo com o JSON {"text", ...metadados} comprimido com zlib,
+    nomeado pelo SHA-256 da chave. O mtime do arquivo marca o último uso: ao passar
+    de 'max_bytes', as entradas usadas há mais tempo são apagadas primeiro (LRU).
+    """
+
+    def __init__(self, directory: str = INPUT_CACHE_DIR, max_bytes: int = int(INPUT_CACHE_MAX_MB * 1024 * 1024),
+                 url_fresh_seconds: int = URL_FRESH_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        super().__init__()
+        self.url_fresh_seconds = url_fresh_seconds
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ENTRY_SUFFIX)
+
+    def get(self, key: str):
+        """Devolve a entrada ({"text", ...}) ou None. Marca a entrada como usada agora."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError, zlib.error):
+            # Entrada corrompida (ex: escrita interrompida): descarta e trata como miss
+            self._remove(path)
+            entry = None
+        with self._lock:
+            self.record(entry is not None)
+        return entry
+
+    def put(self, key: str, text: str, **meta):
+        """Grava o texto comprimido (escrita atômica) e aplica o limite de tamanho."""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = zlib.compress(json.dumps({"key": key, "text": text, **meta}, ensure_ascii=False).encode("utf-8"))
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Apaga as entradas menos usadas até o total caber em 'max_bytes'."""
+        with self._lock:
+            entries = []
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+                if name.endswith(ENTRY_SUFFIX):
+                    self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Cache compartilhado pelo processo
+get_input_cache = lazy_singleton(InputCache)
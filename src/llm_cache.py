@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from src.cache import HitMissStats, cache_enabled, lazy_singleton
+
+# --- CONFIGURAÇÃO ---
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./.cache/llm_responses.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # segundos
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+def llm_cache_enabled() -> bool:
+    """LLM_CACHE=0 desliga o cache de respostas (equivale a --no-llm-cache no agente)."""
+    return cache_enabled("LLM_CACHE")
+
+def make_key(model: str, messages, tools=None, **params) -> str:
+    """
+    Chave da chamada: modelo + parâmetros de geração + hash de cada mensagem.
+    As mensagens carregam a descrição da task e cada resultado de ferramenta
+    (Observation), então uma mudança em qualquer um deles gera outra chave.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    message_hashes = [
+        hashlib.sha256(json.dumps(message, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+        for message in messages
+    ]
+    payload = {
+        "model": model,
+        "params": params,
+        "messages": message_hashes,
+        "tools": tools or [],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class LLMResponseCache(HitMissStats):
+    """
+    Cache persistente (SQLite) de respostas do LLM.
+
+    Entradas expiram após 'ttl_seconds'; acima de 'max_entries', as usadas
+    há mais tempo são apagadas. Pode ser usado por várias threads (modo batch).
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        super().__init__()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Resposta em cache (ou None se ausente/expirada)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            self.record(row is not None)
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Remove expiradas e, acima do limite, as menos usadas recentemente."""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Cache compartilhado pelo processo
+get_llm_cache = lazy_singleton(LLMResponseCache)
@@ -0,0 +1,194 @@
+import sys
+import time
+import asyncio
+import threading
+from datetime import timedelta
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from src.profiling import span, record_span
+
+MCP_SERVER_URL = "http://localhost:8000/sse"
+CALL_TIMEOUT = 120  # segundos por chamada de ferramenta
+CONNECT_TIMEOUT = 15  # segundos para abrir o SSE e concluir o initialize()
+# Erros de transporte: o stream caiu e a chamada pode ser repetida numa conexão nova
+TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+                    ConnectionError, httpx.TransportError)
+
+def connection_lost(error: Exception) -> bool:
+    """
+    True se a sessão caiu. Timeout e erros de JSON-RPC (McpError) chegam numa
+    sessão viva: repetir só dobraria a espera, então vão direto para quem chamou.
+    """
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED  # o SDK encerra os pedidos pendentes assim
+    return isinstance(error, TRANSPORT_ERRORS)
+
+class MCPClient:
+    """
+    Cliente MCP de longa duração para as ferramentas do agente.
+
+    Um event loop roda em uma thread de fundo e mantém UMA sessão SSE já
+    inicializada, reutilizada por todas as chamadas. Se o stream cair, a
+    sessão é descartada e a chamada é repetida uma vez numa conexão nova
+    (timeouts e erros devolvidos pelo servidor não são repetidos).
+    Pode ser chamado de várias threads ao mesmo tempo (as requisições
+    compartilham a mesma sessão, identificadas pelo id do JSON-RPC).
+    """
+
+    def __init__(self, url: str = MCP_SERVER_URL, call_timeout: float = CALL_TIMEOUT,
+                 connect_timeout: float = CONNECT_TIMEOUT):
+        self.url = url
+        self.call_timeout = call_timeout
+        self.connect_timeout = connect_timeout
+        self._thread_lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        # Estado abaixo só é tocado dentro do event loop de fundo
+        self._session = None
+        self._stop = None
+        self._runner = None
+        self._connect_lock = None
+        self.connections = 0  # sessões abertas até agora (o --profile separa conexão de chamada)
+
+    # --- EVENT LOOP DE FUNDO ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _submit(self, coro, timeout: float):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    # --- CICLO DE VIDA DA SESSÃO ---
+
+    async def _run_session(self, ready: asyncio.Future, stop: asyncio.Event):
+        """Abre SSE + ClientSession e os mantém abertos até 'stop' (ou queda do stream)."""
+        try:
+            async with sse_client(self.url) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self._session = session
+                    if not ready.done():
+                        ready.set_result(session)
+                    await stop.wait()
+        except Exception as e:
+            # Falha ao conectar vai para quem espera 'ready'; queda depois disso
+            # só encerra o runner (a próxima chamada reconecta)
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            if self._stop is stop:
+                self._session = None
+
+    async def _get_session(self) -> ClientSession:
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._session is None or self._runner is None or self._runner.done():
+                await self._reset()
+                print(f"  > 🔌 [MCP] Conectando a {self.url}...")
+                self.connections += 1
+                ready = asyncio.get_running_loop().create_future()
+                self._stop = asyncio.Event()
+                self._runner = asyncio.create_task(self._run_session(ready, self._stop))
+                try:
+                    await asyncio.wait_for(ready, timeout=self.connect_timeout)
+                except BaseException:
+                    await self._reset()
+                    raise
+            return self._session
+
+    async def _reset(self):
+        """Encerra a sessão atual (se houver) para forçar uma reconexão."""
+        runner, stop = self._runner, self._stop
+        self._session, self._runner, self._stop = None, None, None
+        if runner is None:
+            return
+        stop.set()
+        try:
+            await asyncio.wait_for(runner, timeout=5)
+        except BaseException:
+            runner.cancel()
+
+    async def _call(self, name: str, arguments: dict, timings: list = None):
+        """'timings' recebe (etapa, início, fim) da conexão (se houve) e da chamada."""
+        for attempt in (1, 2):
+            start, connections = time.perf_counter(), self.connections
+            session = await self._get_session()
+            connected = time.perf_counter()
+            if timings is not None and self.connections != connections:
+                timings.append(("mcp.connect", start, connected))
+            try:
+                result = await session.call_tool(
+                    name, arguments=arguments, read_timeout_seconds=timedelta(seconds=self.call_timeout)
+                )
+                if timings is not None:
+                    timings.append(("mcp.call", connected, time.perf_counter()))
+                return result
+            except Exception as e:
+                if attempt == 2 or not connection_lost(e):
+                    raise
+                print(f"  > ⚠️ [MCP] Sessão perdida ({e!r}). Reconectando...", file=sys.stderr)
+                async with self._connect_lock:
+                    if self._session is session:
+                        await self._reset()
+
+    # --- API SÍNCRONA (usada pelas Tools do CrewAI) ---
+
+    def _call_sync(self, name: str, arguments: dict):
+        """Chamada bloqueante; com --profile, vira o span 'mcp:{nome}' com conexão e chamada dentro."""
+        timings = []
+        with span(f"mcp:{name}"):
+            try:
+                return self._submit(self._call(name, arguments, timings),
+                                    timeout=2 * (self.connect_timeout + self.call_timeout))
+            finally:
+                for step, start, end in timings:
+                    record_span(step, start, end)
+
+    def call_tool(self, name: str, arguments: dict) -> str:
+        """Chama uma ferramenta na sessão persistente e devolve o conteúdo como texto."""
+        return str(self._call_sync(name, arguments).content)
+
+    def call_tool_text(self, name: str, arguments: dict) -> str:
+        """Como call_tool, mas devolve só o texto dos blocos (para respostas em JSON)."""
+        result = self._call_sync(name, arguments)
+        return "".join(block.text for block in result.content if getattr(block, "type", None) == "text")
+
+    def close(self):
+        """Fecha a sessão e para o event loop de fundo."""
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._reset(), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def get_mcp_client(url: str = MCP_SERVER_URL) -> MCPClient:
+    """Cliente compartilhado pelo processo (uma conexão para todas as ferramentas)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None or _default_client.url != url:
+            _default_client = MCPClient(url)
+        return _default_client
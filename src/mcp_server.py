@@ -1,35 +1,671 @@
+import os
 import sys
 import json
-import re
+import time
+import threading
+import contextlib
+import anyio
 from mcp.server import Server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from mcp.server.sse import SseServerTransport
 from starlette.applications import Starlette
 from starlette.routing import Route
-import chromadb
-from chromadb.utils import embedding_functions
+from starlette.responses import JSONResponse, Response
+import numpy as np
+from src.text_cleaning import clean_snippet
+from src.cache import LRUCache
+from src.metrics import MetricsRegistry, CONTENT_TYPE, SIZE_BUCKETS, track_phases, phase, add_phase
+from src.documents import stitch_chunks, parse_document_metadata, select_chunk_ids
+from src.embeddings import get_embedding_function, EMBEDDING_BACKEND
+from src.bm25 import load_index, reciprocal_rank_fusion, META_FILE as BM25_META_FILE
+from src.dedup import also_in_key
 
 # --- CONFIGURAÇÃO ---
-DB_PATH = "./db/chroma_data"
+# CHROMA_DB_PATH permite apontar para outro banco (ex: fixture dos benchmarks)
+DB_PATH = os.getenv("CHROMA_DB_PATH", "./db/chroma_data")
 COLLECTION_NAME = "scientific_articles"
+PARTITION_PREFIX = f"{COLLECTION_NAME}__"  # coleções por área (ingest.py --partition-by-area)
+DOCUMENTS_COLLECTION_NAME = "scientific_documents"  # um registro por artigo (src/ingest.py)
+MANIFEST_PATH = os.path.join(os.path.dirname(DB_PATH), "ingest_manifest.json")  # regravado a cada 'make index'
+BM25_PATH = os.path.join(os.path.dirname(DB_PATH), "bm25")  # índice léxico gerado pela ingestão
+DEFAULT_N_RESULTS = 5
+MAX_N_RESULTS = 20
+# 'vector' (só embeddings) ou 'hybrid' (embeddings + BM25 fundidos por RRF)
+SEARCH_MODES = ("vector", "hybrid")
+DEFAULT_SEARCH_MODE = os.getenv("MCP_SEARCH_MODE", "vector")
+HYBRID_DEPTH = 4  # cada lado contribui com n_results * HYBRID_DEPTH candidatos para a fusão
+MAX_BATCH_QUERIES = 16
+MAX_DOCUMENT_CHARS = int(os.getenv("MCP_MAX_DOCUMENT_CHARS", "60000"))  # teto do texto devolvido por get_document
+QUERY_CACHE_SIZE = int(os.getenv("MCP_QUERY_CACHE_SIZE", "1024"))
+RESULT_CACHE_SIZE = int(os.getenv("MCP_RESULT_CACHE_SIZE", "512"))
+# Inferência e acesso ao Chroma rodam fora do event loop, em threads limitadas
+SEARCH_WORKERS = int(os.getenv("MCP_SEARCH_WORKERS", "4"))
+MAX_PENDING = int(os.getenv("MCP_MAX_PENDING", "64"))  # acima disso, recusa com "server busy"
+# Sem banco (servidor subiu antes do 'make index'), as chamadas tentam reabri-lo no máximo a cada N segundos
+INDEX_RETRY_SECONDS = 10
 
-# --- INICIALIZAÇÃO DO BANCO ---
-try:
-    embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
-    )
-    client = chromadb.PersistentClient(path=DB_PATH)
-    collection = client.get_collection(name=COLLECTION_NAME, embedding_function=embedding_func)
-    print(f"✅ [SERVER] ChromaDB carregado: {collection.count()} docs.", file=sys.stderr)
-except Exception as e:
-    print(f"⚠️ [SERVER] Erro ao carregar ChromaDB: {e}", file=sys.stderr)
-    collection = None
-
-def clean_text(text: str) -> str:
-    if not text: return ""
-    text = text.replace("<EOS>", "").replace("<pad>", "")
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+# --- INICIALIZAÇÃO ADIADA ---
+# Nada pesado acontece no import: banco e modelo são carregados por warm_up(),
+# disparado em segundo plano quando o servidor sobe (lifespan do Starlette).
+# Assim 'uvicorn --reload', workers e testes não pagam o carregamento do modelo,
+# e o servidor aceita conexões (/healthz) enquanto aquece (/readyz responde 503).
+embedding_func = None
+client = None
+collection = None
+documents_collection = None
+lexical_index = None
+partitions = {}
+
+_ready = threading.Event()  # aquecimento concluído (com ou sem erro)
+_init_lock = threading.Lock()
+_last_index_attempt = 0.0
+_status = {"model": "pending", "index": "pending", "errors": {}, "warmup_s": None}
+_started_at = time.time()
+
+def open_index() -> bool:
+    """Abre o banco, as coleções, o índice BM25 e as partições. True se a coleção principal existe."""
+    global client, collection, documents_collection, lexical_index, partitions, _last_index_attempt
+    import chromadb  # ~0,7 s de import: fica fora do import do módulo
+
+    _last_index_attempt = time.monotonic()
+    try:
+        client = chromadb.PersistentClient(path=DB_PATH)
+        # As consultas sempre vão com query_embeddings (embed_queries), calculados pelo backend escolhido
+        collection = client.get_collection(name=COLLECTION_NAME, embedding_function=None)
+        print(f"✅ [SERVER] ChromaDB carregado: {collection.count()} docs.", file=sys.stderr)
+    except Exception as e:
+        print(f"⚠️ [SERVER] Erro ao carregar ChromaDB (rode 'make index'): {e}", file=sys.stderr)
+        collection = None
+        _status["index"] = "error"
+        _status["errors"]["index"] = str(e)
+        return False
+
+    try:
+        documents_collection = client.get_collection(name=DOCUMENTS_COLLECTION_NAME, embedding_function=None)
+        print(f"✅ [SERVER] Índice de documentos: {documents_collection.count()} artigos.", file=sys.stderr)
+    except Exception as e:
+        print(f"⚠️ [SERVER] Índice de documentos indisponível (rode 'make index'): {e}", file=sys.stderr)
+        documents_collection = None
+
+    lexical_index = load_lexical_index()
+    partitions = load_partitions()
+    check_embedding_backend()
+    _status["index"] = "ready"
+    _status["errors"].pop("index", None)
+    return True
+
+def load_model() -> bool:
+    """Carrega o backend de embeddings e faz uma inferência de aquecimento."""
+    global embedding_func
+    _status["model"] = "loading"
+    try:
+        func = get_embedding_function()
+        func(["warm up"])  # primeira inferência (alocações, kernels) fora das consultas reais
+    except Exception as e:
+        print(f"❌ [SERVER] Erro ao carregar o modelo de embeddings ({EMBEDDING_BACKEND}): {e}", file=sys.stderr)
+        _status["model"] = "error"
+        _status["errors"]["model"] = str(e)
+        return False
+    embedding_func = func
+    _status["model"] = "ready"
+    _status["errors"].pop("model", None)
+    return True
+
+def warm_up():
+    """Abre o índice e carrega o modelo, uma única vez (chamadas concorrentes esperam a primeira)."""
+    with _init_lock:
+        if _ready.is_set():
+            return
+        start = time.perf_counter()
+        open_index()
+        load_model()
+        _status["warmup_s"] = round(time.perf_counter() - start, 2)
+        _ready.set()
+    print(f"🔥 [SERVER] Aquecimento concluído em {_status['warmup_s']}s "
+          f"(modelo: {_status['model']}, índice: {_status['index']}).", file=sys.stderr)
+
+def is_ready() -> bool:
+    return _ready.is_set() and embedding_func is not None and collection is not None
+
+def retry_index():
+    """Servidor subiu antes do 'make index': tenta abrir o banco de novo (no máximo a cada INDEX_RETRY_SECONDS)."""
+    if _ready.is_set() and collection is None and time.monotonic() - _last_index_attempt >= INDEX_RETRY_SECONDS:
+        with _init_lock:
+            if collection is None:
+                open_index()
+
+def ensure_ready():
+    """
+    Bloqueia até o aquecimento terminar. Devolve None se dá para atender a
+    chamada, ou a mensagem de erro para o cliente.
+    """
+    if not _ready.is_set():
+        warm_up()
+    retry_index()
+    if collection is None:
+        return "Error: Database not initialized. Run 'make index'."
+    if embedding_func is None:
+        return f"Error: Embedding model not available: {_status['errors'].get('model')}"
+    return None
+
+def load_on_first_use(needs_model: bool = True):
+    """
+    As funções de ferramenta também são chamadas direto (src/test_server.py, scripts),
+    sem o warm_up() do servidor: carregam tudo na primeira chamada. None se dá para
+    atender, ou a mensagem de erro para devolver no lugar do resultado.
+    """
+    if collection is None or (needs_model and embedding_func is None):
+        error = ensure_ready()
+        if error and (needs_model or collection is None):
+            return error
+    return None
+
+def readiness() -> dict:
+    """Estado do modelo e do índice (corpo do /readyz)."""
+    retry_index()
+    index = {"status": _status["index"]}
+    if collection is not None:
+        try:
+            index["chunks"] = collection.count()
+            index["documents"] = documents_collection.count() if documents_collection is not None else None
+        except Exception as e:
+            index["status"] = "error"
+            _status["errors"]["index"] = str(e)
+        index["lexical"] = lexical_index is not None
+        index["partitions"] = sorted(partitions)
+    return {
+        "ready": is_ready() and index["status"] == "ready",
+        "model": {"status": _status["model"], "backend": EMBEDDING_BACKEND},
+        "index": index,
+        "warmup_s": _status["warmup_s"],
+        "errors": dict(_status["errors"]),
+    }
+
+def load_lexical_index():
+    try:
+        index = load_index(BM25_PATH)
+    except Exception as e:
+        print(f"⚠️ [SERVER] Erro ao carregar índice BM25: {e}", file=sys.stderr)
+        return None
+    if index is None:
+        print("⚠️ [SERVER] Índice BM25 indisponível (rode 'make index'); busca híbrida usa só vetores.", file=sys.stderr)
+    else:
+        print(f"✅ [SERVER] Índice BM25 (mmap): {len(index)} chunks, {index.meta['n_terms']} termos.", file=sys.stderr)
+    return index
+
+def load_partitions() -> dict:
+    """Área -> coleção da partição. Vazio se a ingestão não usou --partition-by-area."""
+    found = {}
+    try:
+        for c in client.list_collections():
+            area = (c.metadata or {}).get("partition_area")
+            if c.name.startswith(PARTITION_PREFIX) and area:
+                found[area] = client.get_collection(name=c.name, embedding_function=None)
+    except Exception as e:
+        print(f"⚠️ [SERVER] Erro ao listar partições por área: {e}", file=sys.stderr)
+    if found:
+        print(f"✅ [SERVER] Partições por área: {', '.join(sorted(found))}.", file=sys.stderr)
+    return found
+
+def check_embedding_backend():
+    """
+    Avisa se o servidor usa outro backend de embeddings que o índice. A ingestão
+    não mistura backends (trocar reindexa tudo), mas o servidor lê EMBEDDING_BACKEND
+    do próprio ambiente: consultas com outro modelo dão vetores incomparáveis.
+    """
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            settings = json.load(f).get("settings") or {}
+    except (OSError, ValueError):
+        return
+    indexed = settings.get("embedding_backend", "torch")  # ausente = padrão (ingest.index_settings)
+    if indexed != EMBEDDING_BACKEND:
+        print(f"⚠️ [SERVER] Índice gerado com backend '{indexed}'; consultas usam '{EMBEDDING_BACKEND}'. "
+              f"Suba o servidor com EMBEDDING_BACKEND={indexed} ou reindexe.", file=sys.stderr)
+
+# --- CACHES DE BUSCA ---
+# Embeddings por texto normalizado da consulta; resultados por (embedding, n_results, filtros).
+# O cache de resultados é descartado quando a versão do índice muda.
+embedding_cache = LRUCache(QUERY_CACHE_SIZE)
+result_cache = LRUCache(RESULT_CACHE_SIZE)
+_index_version = None
+_index_version_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
+    """O all-MiniLM-L6-v2 é uncased: caixa e espaços extras não mudam o embedding."""
+    return " ".join(query.split()).lower()
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def current_index_version():
+    """Nº de chunks na coleção + mtime do manifesto da ingestão e do índice BM25."""
+    return collection.count(), _mtime_ns(MANIFEST_PATH), _mtime_ns(os.path.join(BM25_PATH, BM25_META_FILE))
+
+def check_index_version():
+    """Invalida o cache de resultados (e recarrega o BM25) se a coleção foi reindexada."""
+    global _index_version, lexical_index, partitions
+    version = current_index_version()
+    with _index_version_lock:
+        if version != _index_version:
+            if _index_version is not None:
+                print(f"♻️ [SERVER] Índice mudou {_index_version} -> {version}. Cache de resultados limpo.", file=sys.stderr)
+                if version[2] != _index_version[2]:
+                    lexical_index = load_lexical_index()
+                partitions = load_partitions()
+            result_cache.clear()
+            _index_version = version
+
+def embed_queries(queries: list) -> list:
+    """
+    Embeddings das consultas reaproveitando o cache; as que faltam são
+    calculadas juntas, em uma única chamada ao modelo.
+    """
+    keys = [normalize_query(q) for q in queries]
+    embeddings = [embedding_cache.get(key) for key in keys]
+    missing = list(dict.fromkeys(key for key, emb in zip(keys, embeddings) if emb is None))
+    if missing:
+        with phase("embed"):
+            computed = dict(zip(missing, (np.asarray(e, dtype=np.float32) for e in embedding_func(missing))))
+        for key, embedding in computed.items():
+            embedding_cache.put(key, embedding)
+        embeddings = [emb if emb is not None else computed[key] for key, emb in zip(keys, embeddings)]
+    return embeddings
+
+def embed_query(query: str) -> np.ndarray:
+    """Embedding da consulta, reaproveitando o cache (pula a inferência do modelo)."""
+    return embed_queries([query])[0]
+
+def build_where(area: str | None = None, source: str | None = None) -> dict | None:
+    """
+    Filtro 'where' do Chroma para área e/ou arquivo de origem. Um arquivo também
+    encontra os chunks quase duplicados que ele reaproveita de outro (also_in).
+    """
+    clauses = [{"area": area}] if area else []
+    if source:
+        clauses.append({"$or": [{"source": source}, {also_in_key(source): True}]})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def route_query(where: dict | None):
+    """
+    Escolhe a coleção da consulta: com filtro de área e partição disponível, a
+    busca vai para o HNSW só daquela área e o filtro de área sai do 'where'.
+    """
+    if not where or not partitions:
+        return collection, where
+    clauses = where.get("$and", [where])
+    area = next((c["area"] for c in clauses if "area" in c), None)
+    if area not in partitions:
+        return collection, where
+    rest = [c for c in clauses if "area" not in c]
+    if not rest:
+        return partitions[area], None
+    return partitions[area], rest[0] if len(rest) == 1 else {"$and": rest}
+
+def query_collection_batch(queries: list, n_results: int = DEFAULT_N_RESULTS, where: dict | None = None) -> list:
+    """
+    Consulta o ChromaDB para várias frases de uma vez. Resultados em cache
+    são reaproveitados; as demais vão em um único collection.query.
+    Devolve um resultado por consulta, no mesmo formato de query_collection.
+    """
+    check_index_version()
+    embeddings = embed_queries(queries)
+    where_key = json.dumps(where, sort_keys=True) if where else None
+    keys = [(emb.tobytes(), n_results, where_key) for emb in embeddings]
+    results = [result_cache.get(key) for key in keys]
+
+    pending = list(dict.fromkeys(key for key, res in zip(keys, results) if res is None))
+    if pending:
+        by_key = {key: emb for key, emb in zip(keys, embeddings)}
+        target, target_where = route_query(where)
+        with phase("query"):
+            raw = target.query(query_embeddings=[by_key[k] for k in pending], n_results=n_results, where=target_where)
+        fields = [field for field in ('ids', 'documents', 'metadatas', 'distances') if raw.get(field) is not None]
+        fresh = {}
+        for i, key in enumerate(pending):
+            fresh[key] = {field: [raw[field][i]] for field in fields}
+            result_cache.put(key, fresh[key])
+        results = [res if res is not None else fresh[key] for key, res in zip(keys, results)]
+    return results
+
+def query_collection(query: str, n_results: int = DEFAULT_N_RESULTS, where: dict | None = None) -> dict:
+    """Consulta o ChromaDB com cache de embeddings e de resultados."""
+    return query_collection_batch([query], n_results=n_results, where=where)[0]
+
+def hybrid_query(query: str, n_results: int = DEFAULT_N_RESULTS, area: str | None = None,
+                 source: str | None = None) -> dict:
+    """
+    Busca híbrida: candidatos do ChromaDB e do BM25 fundidos por Reciprocal Rank
+    Fusion. O BM25 acha termos exatos (fórmulas, genes, siglas) que o embedding
+    dilui. Devolve o formato de query_collection, com 'scores' (RRF) no lugar de
+    'distances'. Sem índice BM25, cai na busca vetorial.
+    """
+    check_index_version()
+    index = lexical_index
+    where = build_where(area, source)
+    if index is None:
+        return query_collection(query, n_results=n_results, where=where)
+    key = ("hybrid", normalize_query(query), n_results, area, source)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    depth = n_results * HYBRID_DEPTH
+    dense = query_collection(query, n_results=depth, where=where)
+    with phase("lexical"):
+        lexical = [doc_id for doc_id, _ in index.search(query, depth, area=area, source=source)]
+    fused = reciprocal_rank_fusion([dense['ids'][0] if dense['ids'] else [], lexical])
+
+    found = {doc_id: (doc, meta) for doc_id, doc, meta
+             in zip(dense['ids'][0], dense['documents'][0], dense['metadatas'][0])} if dense['ids'] else {}
+    missing = [doc_id for doc_id, _ in fused[:n_results] if doc_id not in found]
+    if missing:
+        with phase("query"):
+            extra = collection.get(ids=missing)
+        found.update({doc_id: (doc, meta) for doc_id, doc, meta
+                      in zip(extra['ids'], extra['documents'], extra['metadatas'])})
+    # IDs que só existem no BM25 (índice mais velho que a coleção) são descartados
+    fused = [(doc_id, score) for doc_id, score in fused if doc_id in found][:n_results]
+    result = {
+        'ids': [[doc_id for doc_id, _ in fused]],
+        'documents': [[found[doc_id][0] for doc_id, _ in fused]],
+        'metadatas': [[found[doc_id][1] for doc_id, _ in fused]],
+        'scores': [[score for _, score in fused]],
+    }
+    result_cache.put(key, result)
+    return result
+
+def cache_stats() -> dict:
+    return {
+        "query_embeddings": embedding_cache.stats(),
+        "results": result_cache.stats(),
+        "index_version": list(_index_version) if _index_version else None,
+        "lexical_index": lexical_index.meta if lexical_index is not None else None,
+        "partitions": {area: c.name for area, c in partitions.items()},
+    }
+
+# --- FERRAMENTAS (lógica síncrona) ---
+
+def format_search_results(query: str, results: dict) -> str:
+    """Formata o resultado de uma consulta para o agente."""
+    if not results['ids'] or not results['ids'][0]:
+        return "No results found."
+
+    resp = f"=== SEARCH RESULTS FOR: '{query}' ===\n"
+    docs = results['documents'][0]
+    metas = results['metadatas'][0]
+    ids = results['ids'][0]
+    if 'scores' in results:
+        scores = results['scores'][0]  # busca híbrida: score RRF
+    else:
+        dists = results['distances'][0] if 'distances' in results else [0]*len(ids)
+        scores = [1 - d for d in dists]
+    
+    for i, doc in enumerate(docs):
+        score = scores[i]
+        resp += f"\n--- RESULT {i+1} ---\n"
+        resp += f"ID: {ids[i]}\n"
+        resp += f"Area: {metas[i].get('area')}\n"
+        resp += f"Source: {metas[i].get('source')}\n"
+        resp += f"Score: {score:.4f}\n"
+        resp += f"Snippet: {clean_snippet(doc)[:300]}...\n"
+    
+    return resp
+
+def results_to_hits(results: dict) -> list:
+    """Resultado de uma consulta como lista de hits (id, área, fonte, distância)."""
+    if not results['ids'] or not results['ids'][0]:
+        return []
+    dists = results['distances'][0] if 'distances' in results else [0.0] * len(results['ids'][0])
+    return [
+        {"id": doc_id, "area": meta.get('area'), "source": meta.get('source'), "distance": float(dist)}
+        for doc_id, meta, dist in zip(results['ids'][0], results['metadatas'][0], dists)
+    ]
+
+def search_articles(query: str, n_results: int = DEFAULT_N_RESULTS, mode: str = DEFAULT_SEARCH_MODE,
+                    area: str | None = None, source: str | None = None) -> str:
+    """
+    Busca por similaridade (ou híbrida, com BM25) e formata os resultados para o agente.
+    'area'/'source' restringem a busca (filtro 'where' ou partição da área).
+    """
+    if mode not in SEARCH_MODES:
+        return f"Error: 'mode' must be one of {list(SEARCH_MODES)}."
+    error = load_on_first_use()
+    if error:
+        return error
+    n_results = max(1, min(int(n_results), MAX_N_RESULTS))
+    if mode == "hybrid":
+        return format_search_results(query, hybrid_query(query, n_results=n_results, area=area, source=source))
+    return format_search_results(query, query_collection(query, n_results=n_results, where=build_where(area, source)))
+
+def search_articles_batch(queries: list, n_results: int = DEFAULT_N_RESULTS, output_format: str = "text") -> str:
+    """
+    Várias buscas em um único forward pass do modelo e um único collection.query.
+    output_format="json" devolve só os hits (sem snippets), para consumo por código.
+    """
+    queries = [q for q in queries if isinstance(q, str) and q.strip()][:MAX_BATCH_QUERIES]
+    if not queries:
+        return "Error: 'queries' must be a non-empty list of strings."
+    error = load_on_first_use()
+    if error:
+        return error
+    results = query_collection_batch(queries, n_results=n_results)
+    if output_format == "json":
+        return json.dumps([{"query": q, "hits": results_to_hits(r)} for q, r in zip(queries, results)],
+                          ensure_ascii=False)
+    blocks = [f"##### QUERY {i+1}/{len(queries)} #####\n{format_search_results(q, r)}"
+              for i, (q, r) in enumerate(zip(queries, results))]
+    return "\n".join(blocks)
+
+def get_article_content(doc_id: str) -> str:
+    """Conteúdo de um chunk por ID, como JSON."""
+    error = load_on_first_use(needs_model=False)
+    if error:
+        return error
+    with phase("query"):
+        result = collection.get(ids=[doc_id])
+    if not result['documents']:
+        return "Error: ID not found."
+    
+    full_text = clean_snippet(result['documents'][0])
+    meta = result['metadatas'][0]
+    
+    return json.dumps({
+        "id": doc_id,
+        "title": meta.get('source'),
+        "area": meta.get('area'),
+        "content": full_text
+    }, ensure_ascii=False)
+
+_aliases = (None, {})  # (mtime do manifesto, cópia idêntica -> ID do artigo indexado)
+
+def document_aliases() -> dict:
+    """Mapa de cópias idênticas da ingestão (manifest["aliases"]), relido só quando o manifesto muda."""
+    global _aliases
+    mtime = _mtime_ns(MANIFEST_PATH)
+    if mtime != _aliases[0]:
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                aliases = json.load(f).get("aliases") or {}
+        except (OSError, ValueError):
+            aliases = {}
+        _aliases = (mtime, aliases)
+    return _aliases[1]
+
+def get_document(doc_id: str, page_from: int | None = None, page_to: int | None = None,
+                 max_chars: int = MAX_DOCUMENT_CHARS) -> str:
+    """
+    Artigo inteiro (ou um intervalo de páginas) em uma chamada: os chunks vêm em
+    ordem do índice de documentos e são costurados sem o overlap.
+    Aceita o ID do artigo ('Computacao/transformers.pdf'), o ID de um chunk dele,
+    o ID de uma cópia idêntica (alias) ou só o nome do arquivo, se ele não se
+    repetir em outra área.
+    """
+    error = load_on_first_use(needs_model=False)
+    if error:
+        return error
+    if documents_collection is None:
+        return "Error: Document index not available. Run 'make index'."
+    source = doc_id.split("_chunk_")[0]
+    source = document_aliases().get(source, source)  # cópia idêntica: devolve o artigo indexado
+    with phase("query"):
+        result = documents_collection.get(ids=[source])
+        if not result['ids']:
+            result = documents_collection.get(where={"source": source})
+    if not result['ids']:
+        return "Error: Document not found."
+    if len(result['ids']) > 1:
+        return f"Error: '{source}' exists in more than one area. Use one of: {', '.join(sorted(result['ids']))}."
+
+    source = result['ids'][0]
+    meta = parse_document_metadata(result['metadatas'][0])
+    ids = select_chunk_ids(meta["chunk_ids"], meta["chunk_pages"], page_from, page_to)
+    if not ids:
+        return "Error: No content in the requested page range."
+    with phase("query"):
+        # Chunks quase duplicados são compartilhados (ingest.py): o mesmo ID pode se repetir
+        chunks = collection.get(ids=list(dict.fromkeys(ids)))
+    by_id = dict(zip(chunks['ids'], chunks['documents']))
+    text = clean_snippet(stitch_chunks([by_id[i] for i in ids if i in by_id]))
+
+    pages = {}
+    for i, span in zip(meta["chunk_ids"], meta["chunk_pages"]):
+        pages.setdefault(i, [span[0], span[1]])[1] = span[1]
+    return json.dumps({
+        "id": source,
+        "title": meta.get('source'),
+        "area": meta.get('area'),
+        "n_pages": meta.get('n_pages'),
+        "aliases": meta["aliases"],
+        "pages": [pages[ids[0]][0], pages[ids[-1]][1]],
+        "chunk_ids": ids,
+        "truncated": len(text) > max_chars,
+        "content": text[:max_chars]
+    }, ensure_ascii=False)
+
+def search_documents(query: str, n_results: int = DEFAULT_N_RESULTS) -> str:
+    """Ranqueia artigos (não chunks) pelo embedding médio de cada documento."""
+    error = load_on_first_use()
+    if error:
+        return error
+    if documents_collection is None:
+        return "Error: Document index not available. Run 'make index'."
+    check_index_version()
+    n_results = max(1, min(n_results, documents_collection.count() or 1))
+    embedding = embed_query(query)
+    with phase("query"):
+        results = documents_collection.query(query_embeddings=[embedding], n_results=n_results)
+    if not results['ids'] or not results['ids'][0]:
+        return "No results found."
+
+    resp = f"=== DOCUMENT RESULTS FOR: '{query}' ===\n"
+    for i, (doc_id, meta, dist, preview) in enumerate(zip(results['ids'][0], results['metadatas'][0],
+                                                          results['distances'][0], results['documents'][0])):
+        resp += f"\n--- DOCUMENT {i+1} ---\n"
+        resp += f"ID: {doc_id}\n"
+        resp += f"Area: {meta.get('area')}\n"
+        resp += f"Pages: {meta.get('n_pages')} | Chunks: {meta.get('n_chunks')}\n"
+        aliases = json.loads(meta.get('aliases') or "[]")
+        if aliases:
+            resp += f"Identical copies: {', '.join(aliases)}\n"
+        resp += f"Score: {1 - dist:.4f}\n"
+        resp += f"Preview: {clean_snippet(preview)[:300]}...\n"
+    return resp
+
+# --- EXECUÇÃO FORA DO EVENT LOOP ---
+# O SentenceTransformer (PyTorch) e o Chroma liberam o GIL nas partes pesadas,
+# então threads bastam para não travar os outros clientes SSE.
+_search_limiter = None
+_pending = 0
+
+class ServerBusy(Exception):
+    pass
+
+async def run_blocking(func, *args):
+    """
+    Executa 'func' em uma thread de trabalho. No máximo SEARCH_WORKERS rodam
+    ao mesmo tempo; as demais esperam na fila, até MAX_PENDING no total.
+    """
+    global _search_limiter, _pending
+    if _search_limiter is None:
+        _search_limiter = anyio.CapacityLimiter(SEARCH_WORKERS)
+    if _pending >= MAX_PENDING:
+        raise ServerBusy(f"server busy ({_pending} requests pending), retry later")
+    _pending += 1
+    queued_at = time.perf_counter()
+
+    def run(*run_args):
+        add_phase("queue", time.perf_counter() - queued_at)  # espera por uma vaga no pool
+        return func(*run_args)
+
+    try:
+        return await anyio.to_thread.run_sync(run, *args, limiter=_search_limiter)
+    finally:
+        _pending -= 1
+
+# --- MÉTRICAS (/metrics) ---
+# Tudo em memória, sem dependências: cada chamada custa alguns incrementos sob lock.
+TOOL_NAMES = ("search_articles", "search_articles_batch", "get_article_content", "get_document", "search_documents")
+
+metrics = MetricsRegistry()
+tool_calls = metrics.counter(
+    "mcp_tool_calls_total", "Chamadas de ferramentas por ferramenta e status (ok, error, busy).", ("tool", "status"))
+tool_duration = metrics.histogram(
+    "mcp_tool_duration_seconds", "Duração total da chamada, incluindo a fila do pool de busca.", ("tool",))
+tool_phase_duration = metrics.histogram(
+    "mcp_tool_phase_seconds",
+    "Duração por fase: warmup, queue (fila do pool), embed (modelo), query (ChromaDB), lexical (BM25), other.",
+    ("tool", "phase"))
+request_bytes = metrics.histogram(
+    "mcp_tool_request_bytes", "Tamanho dos argumentos (JSON) por ferramenta.", ("tool",), SIZE_BUCKETS)
+response_bytes = metrics.histogram(
+    "mcp_tool_response_bytes", "Tamanho da resposta (texto UTF-8) por ferramenta.", ("tool",), SIZE_BUCKETS)
+sse_connections = metrics.gauge("mcp_sse_connections", "Sessões SSE abertas.")
+sse_connections_total = metrics.counter("mcp_sse_connections_total", "Sessões SSE abertas desde o início.")
+
+def collection_sizes() -> dict:
+    sizes = {}
+    for c in (collection, documents_collection, *partitions.values()):
+        if c is not None:
+            sizes[(c.name,)] = c.count()
+    return sizes
+
+def cache_counts() -> dict:
+    counts = {}
+    for cache_name, cache in (("query_embeddings", embedding_cache), ("results", result_cache)):
+        stats = cache.stats()
+        counts[(cache_name, "hit")] = stats["hits"]
+        counts[(cache_name, "miss")] = stats["misses"]
+    return counts
+
+metrics.callback("mcp_collection_items", "Itens por coleção do ChromaDB.", collection_sizes, ("collection",))
+metrics.callback("mcp_lexical_index_chunks", "Chunks no índice BM25.",
+                 lambda: len(lexical_index) if lexical_index is not None else None)
+metrics.callback("mcp_cache_lookups_total", "Consultas aos caches de busca por cache e resultado.",
+                 cache_counts, ("cache", "result"), kind="counter")
+metrics.callback("mcp_pending_requests", "Chamadas em execução ou na fila do pool de busca.", lambda: _pending)
+metrics.callback("mcp_ready", "1 com o modelo aquecido e o índice aberto (ver /readyz).", lambda: int(is_ready()))
+metrics.callback("mcp_warmup_seconds", "Duração do aquecimento (modelo + índice).", lambda: _status["warmup_s"])
+
+def record_call(name: str, arguments: dict | None, contents: list, elapsed: float, phases: dict):
+    tool = name if name in TOOL_NAMES else "unknown"  # nomes arbitrários não viram séries novas
+    text = "".join(getattr(content, "text", "") for content in contents)
+    if not text.startswith("Error"):
+        status = "ok"
+    else:
+        status = "busy" if "server busy" in text else "error"
+    tool_calls.inc(tool, status)
+    tool_duration.observe(tool, value=elapsed)
+    for phase_name, seconds in phases.items():
+        tool_phase_duration.observe(tool, phase_name, value=seconds)
+    tool_phase_duration.observe(tool, "other", value=max(0.0, elapsed - sum(phases.values())))
+    request_bytes.observe(tool, value=len(json.dumps(arguments or {}, ensure_ascii=False).encode("utf-8")))
+    response_bytes.observe(tool, value=len(text.encode("utf-8")))
 
 # --- DEFINIÇÃO DO SERVIDOR MCP ---
 server = Server("scientific-knowledge-server")
@@ -45,14 +681,57 @@ async def handle_list_tools() -> list[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "query": {"type": "string", "description": "Search phrase"}
+                    "query": {"type": "string", "description": "Search phrase"},
+                    "mode": {
+                        "type": "string",
+                        "enum": list(SEARCH_MODES),
+                        "description": (
+                            "'vector' (semantic) or 'hybrid' (semantic + BM25 keyword match, "
+                            "better for formulas, gene names and acronyms). "
+                            f"Default: '{DEFAULT_SEARCH_MODE}'"
+                        )
+                    },
+                    "area": {
+                        "type": "string",
+                        "description": "Only search this area (e.g. 'Computacao', 'Medicina', 'Quimica')"
+                    },
+                    "source": {"type": "string", "description": "Only search this paper (file name, e.g. 'transformers.pdf')"},
+                    "n_results": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": MAX_N_RESULTS,
+                        "description": f"Number of results (default {DEFAULT_N_RESULTS})"
+                    }
                 },
                 "required": ["query"]
             }
         ),
+        Tool(
+            name="search_articles_batch",
+            description=(
+                "Search for several phrases at once (e.g. abstract, methods and conclusion of a paper). "
+                f"Up to {MAX_BATCH_QUERIES} queries; returns Metadata and Snippets grouped per query."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Search phrases"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["text", "json"],
+                        "description": "'text' (default) for reading; 'json' returns only ids, areas and distances"
+                    }
+                },
+                "required": ["queries"]
+            }
+        ),
         Tool(
             name="get_article_content",
-            description="Get full content by ID. Returns JSON string.",
+            description="Get the content of ONE chunk by ID. Returns JSON string. For a whole paper use get_document.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -60,44 +739,82 @@ async def handle_list_tools() -> list[Tool]:
                 },
                 "required": ["id"]
             }
+        ),
+        Tool(
+            name="get_document",
+            description=(
+                "Get a whole paper (or a page range) in ONE call, with chunks stitched in order. "
+                "Accepts the document ID (e.g. 'Computacao/transformers.pdf'), any chunk ID of it "
+                "or the bare file name. Returns JSON string."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "description": "Document ID ('Area/file.pdf'), file name or chunk ID"},
+                    "page_from": {"type": "integer", "description": "First page (optional)"},
+                    "page_to": {"type": "integer", "description": "Last page (optional)"}
+                },
+                "required": ["id"]
+            }
+        ),
+        Tool(
+            name="search_documents",
+            description="Rank whole papers (not chunks) by similarity. Returns one entry per paper.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Search phrase"}
+                },
+                "required": ["query"]
+            }
         )
     ]
 
 # 2. EXECUTAR FERRAMENTAS
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict | None) -> list[TextContent | ImageContent | EmbeddedResource]:
+    """Executa a ferramenta e registra duração total, fases, payloads e status (/metrics)."""
+    start = time.perf_counter()
+    with track_phases() as phases:
+        contents = await call_tool(name, arguments)
+    record_call(name, arguments, contents, time.perf_counter() - start, phases)
+    return contents
+
+async def call_tool(name: str, arguments: dict | None) -> list[TextContent | ImageContent | EmbeddedResource]:
     if not arguments:
         return [TextContent(type="text", text="Error: No arguments provided.")]
     
-    if not collection:
-        return [TextContent(type="text", text="Error: Database not initialized. Run 'make index'.")]
+    if not is_ready():
+        # Chamadas durante o aquecimento esperam em uma thread, sem ocupar as vagas de busca
+        with phase("warmup"):
+            error = await anyio.to_thread.run_sync(ensure_ready)
+        if error:
+            return [TextContent(type="text", text=error)]
 
     # --- LÓGICA DA BUSCA ---
     if name == "search_articles":
         query = arguments.get("query", "")
-        print(f"🔎 [SERVER] Buscando: '{query}'", file=sys.stderr)
+        mode = arguments.get("mode") or DEFAULT_SEARCH_MODE
+        area = arguments.get("area") or None
+        source = arguments.get("source") or None
+        filters = ", ".join(f"{k}={v}" for k, v in (("area", area), ("source", source)) if v)
+        print(f"🔎 [SERVER] Buscando ({mode}{', ' + filters if filters else ''}): '{query}'", file=sys.stderr)
+        
+        try:
+            n_results = int(arguments.get("n_results") or DEFAULT_N_RESULTS)
+            text = await run_blocking(search_articles, query, n_results, mode, area, source)
+            return [TextContent(type="text", text=text)]
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+    elif name == "search_articles_batch":
+        queries = arguments.get("queries") or []
+        output_format = arguments.get("format", "text")
+        print(f"🔎 [SERVER] Busca em lote: {len(queries)} consultas", file=sys.stderr)
         
         try:
-            results = collection.query(query_texts=[query], n_results=5)
-            if not results['ids'] or not results['ids'][0]:
-                return [TextContent(type="text", text="No results found.")]
-
-            resp = f"=== SEARCH RESULTS FOR: '{query}' ===\n"
-            docs = results['documents'][0]
-            metas = results['metadatas'][0]
-            ids = results['ids'][0]
-            dists = results['distances'][0] if 'distances' in results else [0]*len(ids)
-            
-            for i, doc in enumerate(docs):
-                score = 1 - dists[i]
-                resp += f"\n--- RESULT {i+1} ---\n"
-                resp += f"ID: {ids[i]}\n"
-                resp += f"Area: {metas[i].get('area')}\n"
-                resp += f"Source: {metas[i].get('source')}\n"
-                resp += f"Score: {score:.4f}\n"
-                resp += f"Snippet: {clean_text(doc)[:300]}...\n"
-            
-            return [TextContent(type="text", text=resp)]
+            text = await run_blocking(search_articles_batch, queries, DEFAULT_N_RESULTS, output_format)
+            return [TextContent(type="text", text=text)]
         except Exception as e:
             return [TextContent(type="text", text=f"Error: {e}")]
 
@@ -107,21 +824,27 @@ async def handle_call_tool(name: str, arguments: dict | None) -> list[TextConten
         print(f"📖 [SERVER] Lendo ID: '{doc_id}'", file=sys.stderr)
         
         try:
-            result = collection.get(ids=[doc_id])
-            if not result['documents']:
-                return [TextContent(type="text", text="Error: ID not found.")]
-            
-            full_text = clean_text(result['documents'][0])
-            meta = result['metadatas'][0]
-            
-            json_resp = json.dumps({
-                "id": doc_id,
-                "title": meta.get('source'),
-                "area": meta.get('area'),
-                "content": full_text
-            }, ensure_ascii=False)
-            
-            return [TextContent(type="text", text=json_resp)]
+            return [TextContent(type="text", text=await run_blocking(get_article_content, doc_id))]
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+    elif name == "get_document":
+        doc_id = arguments.get("id", "")
+        print(f"📚 [SERVER] Lendo documento: '{doc_id}'", file=sys.stderr)
+        
+        try:
+            page_from = int(arguments["page_from"]) if arguments.get("page_from") is not None else None
+            page_to = int(arguments["page_to"]) if arguments.get("page_to") is not None else None
+            return [TextContent(type="text", text=await run_blocking(get_document, doc_id, page_from, page_to))]
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+    elif name == "search_documents":
+        query = arguments.get("query", "")
+        print(f"🔎 [SERVER] Buscando documentos: '{query}'", file=sys.stderr)
+        
+        try:
+            return [TextContent(type="text", text=await run_blocking(search_documents, query))]
         except Exception as e:
             return [TextContent(type="text", text=f"Error: {e}")]
 
@@ -132,27 +855,57 @@ async def handle_call_tool(name: str, arguments: dict | None) -> list[TextConten
 class SSEHandler:
     """Gerencia a conexão persistente SSE (Server-Sent Events)."""
     async def __call__(self, scope, receive, send):
-        # Desempacota a tupla diretamente em (read, write)
-        async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
-            await server.run(
-                read_stream, 
-                write_stream, 
-                server.create_initialization_options()
-            )
+        sse_connections.inc()
+        sse_connections_total.inc()
+        try:
+            # Desempacota a tupla diretamente em (read, write)
+            async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
+                await server.run(
+                    read_stream, 
+                    write_stream, 
+                    server.create_initialization_options()
+                )
+        finally:
+            sse_connections.dec()
 
 class MessagesHandler:
     """Gerencia os comandos POST enviados pelo cliente."""
     async def __call__(self, scope, receive, send):
         await sse.handle_post_message(scope, receive, send)
 
-# --- APLICAÇÃO STARLETTE ---
-from starlette.applications import Starlette
-from starlette.routing import Route
+async def stats_endpoint(request):
+    """Contadores de hit/miss dos caches de busca."""
+    return JSONResponse(cache_stats())
+
+async def metrics_endpoint(request):
+    """Métricas no formato de texto do Prometheus."""
+    text = await anyio.to_thread.run_sync(metrics.render)  # count() das coleções fora do event loop
+    return Response(text, media_type=CONTENT_TYPE)
+
+async def healthz_endpoint(request):
+    """Liveness: o processo está de pé e o event loop responde (não depende do aquecimento)."""
+    return JSONResponse({"status": "ok", "uptime_s": round(time.time() - _started_at, 1)})
 
+async def readyz_endpoint(request):
+    """Readiness: 200 só com o modelo aquecido e o índice aberto; 503 (com o motivo) antes disso."""
+    state = await anyio.to_thread.run_sync(readiness)
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # O aquecimento roda em segundo plano: o servidor aceita conexões imediatamente
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+
+# --- APLICAÇÃO STARLETTE ---
 app = Starlette(routes=[
     Route("/sse", endpoint=SSEHandler()),
-    Route("/messages", endpoint=MessagesHandler(), methods=["POST"])
-])
+    Route("/messages", endpoint=MessagesHandler(), methods=["POST"]),
+    Route("/stats", endpoint=stats_endpoint),
+    Route("/metrics", endpoint=metrics_endpoint),
+    Route("/healthz", endpoint=healthz_endpoint),
+    Route("/readyz", endpoint=readyz_endpoint)
+], lifespan=lifespan)
 
 if __name__ == "__main__":
     # Este bloco só roda se chamar direto o arquivo, mas o Makefile usa uvicorn
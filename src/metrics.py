@@ -0,0 +1,181 @@
+import time
+import bisect
+import threading
+import contextlib
+import contextvars
+
+# Formato de exposição de texto do Prometheus (version=0.0.4)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Latência em segundos: de cache hit (~µs) a inferência em CPU sob carga
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Tamanho de payload em bytes: de um chunk (~1 KB) a um artigo inteiro (get_document)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    """Contador monotônico; cada combinação de labels é uma série."""
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}"
+                                for k, v in items]
+
+class Gauge(Counter):
+    """Valor que sobe e desce (ex: conexões SSE abertas)."""
+    type_name = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+class CallbackMetric(_Metric):
+    """
+    Valor lido na hora da coleta: 'func()' devolve um número ou {labels: número}.
+    Serve para o que já é contado em outro lugar (tamanho das coleções, caches).
+    """
+
+    def __init__(self, name: str, documentation: str, func, labels: tuple = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.func = func
+        self.type_name = kind
+
+    def render(self) -> list:
+        try:
+            value = self.func()
+        except Exception:
+            return []  # fonte indisponível (ex: banco ainda não aberto): a série some
+        if value is None:
+            return []
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}"
+                                for k, v in items]
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos: observe() é uma busca binária e uma soma sob lock."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, renderizado no formato de texto do Prometheus."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def callback(self, name: str, documentation: str, func, labels: tuple = (), kind: str = "gauge") -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, func, labels, kind))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# --- FASES DE UMA CHAMADA ---
+# Tempo acumulado por fase (embed, query, ...) da chamada em andamento. O contexto
+# acompanha a chamada até a thread de trabalho (anyio.to_thread copia o contextvars),
+# então as funções síncronas marcam suas fases sem receber nada a mais.
+_current_phases = contextvars.ContextVar("current_phases", default=None)
+
+@contextlib.contextmanager
+def track_phases():
+    """Abre a contabilidade de fases de uma chamada; o dict recebe os segundos por fase."""
+    phases = {}
+    token = _current_phases.set(phases)
+    try:
+        yield phases
+    finally:
+        _current_phases.reset(token)
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Soma a duração do bloco na fase 'name' da chamada atual (sem chamada aberta, não faz nada)."""
+    phases = _current_phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+def add_phase(name: str, seconds: float):
+    phases = _current_phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
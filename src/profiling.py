@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import cProfile
+import threading
+import contextlib
+import contextvars
+
+# Span aberto na thread/contexto atual: (profiler, id do span pai)
+_current = contextvars.ContextVar("profiler_span", default=(None, None))
+
+class Profiler:
+    """
+    Spans de relógio (wall-clock) de uma execução do agente: cada etapa, cada
+    chamada ao LLM e cada ida ao servidor MCP (conexão separada da chamada).
+    Com 'cpu', as etapas locais (span(..., cpu=True)) também rodam sob o cProfile.
+    """
+
+    def __init__(self, cpu: bool = False):
+        self.started = time.perf_counter()
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.spans = []
+        self.meta = {}
+        self.cpu_profile = cProfile.Profile() if cpu else None
+        self._cpu_active = False
+        self._lock = threading.Lock()
+
+    def open(self, name: str, parent, start: float = None) -> int:
+        start = time.perf_counter() if start is None else start
+        with self._lock:
+            self.spans.append({"id": len(self.spans), "name": name, "parent": parent,
+                               "thread": threading.current_thread().name,
+                               "start_s": round(start - self.started, 6), "duration_s": None})
+            return len(self.spans) - 1
+
+    def close(self, span_id: int, attrs: dict, end: float = None):
+        end = time.perf_counter() if end is None else end
+        with self._lock:
+            entry = self.spans[span_id]
+            entry["duration_s"] = round(end - self.started - entry["start_s"], 6)
+            if attrs:
+                entry["attrs"] = dict(attrs)
+
+    def cpu_start(self) -> bool:
+        """Liga o cProfile se ele ainda não está ligado (spans aninhados não religam)."""
+        with self._lock:
+            if self.cpu_profile is None or self._cpu_active:
+                return False
+            try:
+                self.cpu_profile.enable()
+            except ValueError:
+                return False  # outro profiler já ativo no processo (ex: jobs simultâneos do batch)
+            self._cpu_active = True
+            return True
+
+    def cpu_stop(self):
+        with self._lock:
+            self.cpu_profile.disable()
+            self._cpu_active = False
+
+    def summary(self) -> list:
+        """
+        Tempo por nome de span, ordenado pelo tempo próprio (duração menos os
+        filhos): 'crew_kickoff' sem os spans 'llm' e 'mcp:*' é o overhead do crewai.
+        """
+        with self._lock:
+            spans = [dict(s) for s in self.spans if s["duration_s"] is not None]
+        children = {}
+        for s in spans:
+            if s["parent"] is not None:
+                children[s["parent"]] = children.get(s["parent"], 0.0) + s["duration_s"]
+        total = max(time.perf_counter() - self.started, 1e-9)
+        rows = {}
+        for s in spans:
+            row = rows.setdefault(s["name"], {"name": s["name"], "count": 0, "total_s": 0.0, "self_s": 0.0})
+            row["count"] += 1
+            row["total_s"] += s["duration_s"]
+            row["self_s"] += max(0.0, s["duration_s"] - children.get(s["id"], 0.0))
+        result = sorted(rows.values(), key=lambda r: r["self_s"], reverse=True)
+        for row in result:
+            row["share"] = round(row["self_s"] / total, 4)
+            row["total_s"], row["self_s"] = round(row["total_s"], 4), round(row["self_s"], 4)
+        return result
+
+    def report(self) -> dict:
+        summary = self.summary()
+        with self._lock:
+            spans = [dict(s) for s in self.spans]
+        return {"started_at": self.started_at, "total_s": round(time.perf_counter() - self.started, 4),
+                **self.meta, "summary": summary, "spans": spans}
+
+    def save(self, path: str) -> dict:
+        """Grava o relatório em 'path' (JSON) e, com cProfile, o dump em '.prof' ao lado."""
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.cpu_profile is not None:
+            report["cpu_profile"] = f"{os.path.splitext(path)[0]}.prof"
+            self.cpu_profile.dump_stats(report["cpu_profile"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+def print_summary(report: dict, top: int = 8):
+    print(f"\n⏱️ [PROFILE] Total {report['total_s']:.2f}s (tempo próprio por etapa):")
+    for row in report["summary"][:top]:
+        print(f"  {row['name']:<32}{row['count']:>5}x {row['self_s']:>9.2f}s {row['share']:>6.0%}")
+    if "imports_s" in report:
+        print(f"  (importações antes da execução: {report['imports_s']:.2f}s)")
+
+@contextlib.contextmanager
+def profiling(profiler: Profiler):
+    """Ativa 'profiler' no contexto atual; sem profiler (None), os spans não custam nada."""
+    token = _current.set((profiler, None))
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+
+@contextlib.contextmanager
+def span(name: str, cpu: bool = False, **attrs):
+    """
+    Mede o bloco como um span filho do span atual. O dict devolvido pode receber
+    atributos durante o bloco (ex: cache hit). 'cpu' marca trabalho local para o cProfile.
+    """
+    profiler, parent = _current.get()
+    if profiler is None:
+        yield attrs
+        return
+    span_id = profiler.open(name, parent)
+    token = _current.set((profiler, span_id))
+    cpu_on = cpu and profiler.cpu_start()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        if cpu_on:
+            profiler.cpu_stop()
+        _current.reset(token)
+        profiler.close(span_id, attrs)
+
+def record_span(name: str, start: float, end: float, **attrs):
+    """Registra um span já medido (perf_counter) em outra thread, como filho do span atual."""
+    profiler, parent = _current.get()
+    if profiler is not None:
+        profiler.close(profiler.open(name, parent, start), attrs, end)
+
+def set_meta(**fields):
+    profiler, _ = _current.get()
+    if profiler is not None:
+        profiler.meta.update(fields)
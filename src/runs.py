@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import shutil
+from src.utils import extract_json_from_text
+
+RUNS_DIR = "out/runs"
+# Campos que o prompt do extrator exige; sem eles a saída vai para o reparo
+REQUIRED_KEYS = ("area", "extraction", "review_markdown")
+
+def new_run_id(name: str, root: str = RUNS_DIR) -> str:
+    """'{nome}-{AAAAMMDD-HHMMSS}', com sufixo se já existir uma execução no mesmo segundo."""
+    base = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+    run_id, suffix = base, 2
+    while os.path.exists(os.path.join(root, run_id)):
+        run_id = f"{base}-{suffix}"
+        suffix += 1
+    return run_id
+
+def valid_result(data) -> bool:
+    return isinstance(data, dict) and all(key in data for key in REQUIRED_KEYS)
+
+class RunStore:
+    """
+    Checkpoint de uma execução em out/runs/{run_id}/: run.json (fonte, nome,
+    status, voto de classificação) e um arquivo por etapa concluída (texto
+    condensado, saída bruta de cada task, tentativas de reparo, resultado).
+    Cada arquivo é gravado de forma atômica: uma queda não deixa etapa pela metade.
+    """
+
+    def __init__(self, run_id: str, root: str = RUNS_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _write(self, name: str, content: str):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._file(name)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, self._file(name))
+
+    def _read(self, name: str):
+        try:
+            with open(self._file(name), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def load_meta(self) -> dict:
+        content = self._read("run.json")
+        try:
+            return json.loads(content) if content else {}
+        except ValueError:
+            return {}
+
+    def update_meta(self, **fields) -> dict:
+        meta = {**self.load_meta(), **fields, "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._write("run.json", json.dumps(meta, indent=2, ensure_ascii=False))
+        return meta
+
+    def save_text(self, step: str, text: str):
+        self._write(f"{step}.txt", text)
+
+    def load_text(self, step: str):
+        return self._read(f"{step}.txt")
+
+    def save_result(self, data: dict):
+        self._write("result.json", json.dumps(data, indent=2, ensure_ascii=False))
+
+    def load_result(self):
+        content = self._read("result.json")
+        try:
+            return json.loads(content) if content else None
+        except ValueError:
+            return None
+
+    def reset(self):
+        """Descarta as etapas salvas (ex: a fonte de um job do batch mudou)."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def repair_output(store: RunStore, raw: str, steps: list):
+    """
+    Reparo de uma saída sem JSON válido: cada etapa (nome, função(texto) -> novo texto)
+    roda em ordem, do reparo mais barato ao mais caro, e a primeira com JSON
+    válido vence. Toda tentativa fica salva (nome_N) para inspeção.
+    """
+    attempts = store.load_meta().get("repairs", 0)
+    for name, step in steps:
+        attempts += 1
+        store.update_meta(repairs=attempts)
+        print(f"  > 🔧 [REPAIR] Tentativa {attempts}: {name}...")
+        try:
+            text = step(raw)
+        except Exception as e:
+            print(f"  > ⚠️ [REPAIR] '{name}' falhou: {e}")
+            continue
+        store.save_text(f"{name}_{attempts}", str(text))
+        data = extract_json_from_text(str(text))
+        if valid_result(data):
+            return data
+        raw = str(text) or raw
+    return None
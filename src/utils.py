@@ -2,22 +2,107 @@ import os
 import json
 import re
 import requests
+import time
 import tempfile
 from bs4 import BeautifulSoup
 from pypdf import PdfReader
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Any, Dict, Optional
+from src.input_cache import get_input_cache, input_cache_enabled, file_sha256
+
+# --- HTTP ---
+USER_AGENT = {'User-Agent': 'Mozilla/5.0'}
+MAX_DOWNLOAD_BYTES = int(float(os.getenv("INPUT_MAX_DOWNLOAD_MB", "50")) * 1024 * 1024)
+SPOOL_MAX_BYTES = 16 * 1024 * 1024  # PDFs até este tamanho ficam só em memória
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+def build_http_session() -> requests.Session:
+    """
+    Sessão HTTP compartilhada: pool de conexões keep-alive (reaproveita TCP/TLS
+    entre artigos do modo batch) e retentativas com backoff para falhas transitórias.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+HTTP_SESSION = build_http_session()
+
+class NotModified(Exception):
+    """O servidor respondeu 304: o texto em cache continua válido."""
+
+def conditional_headers(validators: Optional[dict]) -> dict:
+    """Cabeçalhos do GET condicional a partir do ETag/Last-Modified guardados no cache."""
+    headers = dict(USER_AGENT)
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def response_validators(response) -> dict:
+    """ETag/Last-Modified da resposta, usados para revalidar o cache de entradas."""
+    headers = response.headers
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+def check_response(response, validators: Optional[dict]):
+    """Trata o 304 do GET condicional, levanta erros HTTP e atualiza os validadores."""
+    if response.status_code == 304 and validators:
+        raise NotModified()
+    response.raise_for_status()
+    if validators is not None:
+        validators.clear()
+        validators.update(response_validators(response))
+
+def download_to_buffer(response, max_bytes: int = MAX_DOWNLOAD_BYTES):
+    """
+    Copia o corpo da resposta (stream) para um buffer em memória que só vai para
+    o disco acima de SPOOL_MAX_BYTES. Aborta se passar de 'max_bytes'.
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ValueError(f"Arquivo grande demais ({int(declared) / 1e6:.1f} MB; limite {max_bytes / 1e6:.0f} MB).")
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    size = 0
+    try:
+        for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            size += len(block)
+            if size > max_bytes:
+                raise ValueError(f"Download passou do limite de {max_bytes / 1e6:.0f} MB.")
+            buffer.write(block)
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
 
 # --- FUNÇÕES DE LEITURA (IO) ---
 
-def read_pdf(file_path: str) -> str:
-    """Extrai texto de um arquivo PDF local."""
+def iter_pdf_text(reader: PdfReader):
+    """Gera o texto de cada página não vazia, uma por vez."""
+    for page in reader.pages:
+        extract = page.extract_text()
+        if extract:
+            yield extract
+
+def read_pdf(file_path) -> str:
+    """Extrai texto de um PDF (caminho local ou stream binário com seek)."""
     try:
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            extract = page.extract_text()
-            if extract:
-                text += extract + "\n"
+        # join evita a cópia quadrática de 'text += ...' em PDFs longos
+        text = "".join(f"{extract}\n" for extract in iter_pdf_text(reader))
         
         if len(text.strip()) < 10: 
             raise ValueError("PDF ilegível ou vazio (sem OCR detectado).")
@@ -27,36 +112,28 @@ def read_pdf(file_path: str) -> str:
         if "PDF ilegível" in str(e): raise e
         raise ValueError(f"Erro crítico ao ler PDF: {e}")
 
-def read_remote_pdf(url: str) -> str:
-    """Baixa um PDF da web, salva em temp e extrai o texto."""
+def read_remote_pdf(url: str, validators: Optional[dict] = None) -> str:
+    """
+    Baixa um PDF da web em streaming e extrai o texto direto do buffer
+    (sem gravar e reler um arquivo temporário).
+    """
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
         print(f"  > 📥 Baixando PDF remoto: {url}...")
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # Cria arquivo temporário
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_pdf:
-            temp_pdf.write(response.content)
-            temp_path = temp_pdf.name
-            
-        # Lê usando a função existente
-        try:
-            text = read_pdf(temp_path)
-        finally:
-            # Garante que apaga o arquivo temporário
-            os.remove(temp_path)
-            
-        return text
+        with HTTP_SESSION.get(url, headers=conditional_headers(validators), timeout=30, stream=True) as response:
+            check_response(response, validators)
+            buffer = download_to_buffer(response)
+        with buffer:
+            return read_pdf(buffer)
+    except NotModified:
+        raise
     except Exception as e:
         raise ValueError(f"Erro ao processar PDF remoto: {e}")
 
-def read_url(url: str) -> str:
+def read_url(url: str, validators: Optional[dict] = None) -> str:
     """Baixa e extrai texto de página HTML."""
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        response = HTTP_SESSION.get(url, headers=conditional_headers(validators), timeout=15)
+        check_response(response, validators)
         
         soup = BeautifulSoup(response.content, 'html.parser')
         
@@ -75,24 +152,73 @@ def read_url(url: str) -> str:
              raise ValueError("URL retornou pouco conteúdo útil.")
         
         return text_clean
+    except NotModified:
+        raise
     except Exception as e:
         raise ValueError(f"Erro URL HTML: {e}")
 
-def process_input(source: str) -> str:
-    """Identifica o tipo de entrada e retorna texto validado."""
+# --- CACHE DE ENTRADAS ---
+
+def read_url_cached(url: str, reader, cache) -> str:
+    """
+    Texto de uma URL via cache: dentro da janela de frescor não acessa a rede;
+    depois dela, faz um GET condicional (If-None-Match/If-Modified-Since) e só
+    baixa o corpo de novo se o servidor não responder 304.
+    """
+    key = f"url:{url}"
+    entry = cache.get(key)
+    validators = {}
+    if entry is not None:
+        if time.time() - entry.get("checked_at", 0) < cache.url_fresh_seconds:
+            print(f"  > ♻️ [CACHE] Reaproveitando texto de {url}")
+            return entry["text"]
+        validators = dict(entry.get("validators") or {})
+
+    try:
+        text = reader(url, validators)
+    except NotModified:
+        print(f"  > ♻️ [CACHE] {url} não mudou (304). Reaproveitando texto.")
+        cache.put(key, entry["text"], validators=entry.get("validators"), checked_at=time.time())
+        return entry["text"]
+    cache.put(key, text, validators=validators, checked_at=time.time())
+    return text
+
+def read_pdf_cached(path: str, cache) -> str:
+    """Texto de um PDF local via cache, endereçado pelo hash do conteúdo do arquivo."""
+    key = f"pdf:{file_sha256(path)}"
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"  > ♻️ [CACHE] Reaproveitando texto de {path}")
+        return entry["text"]
+    text = read_pdf(path)
+    cache.put(key, text, source=path)
+    return text
+
+def process_input(source: str, use_cache: bool = True) -> str:
+    """
+    Identifica o tipo de entrada e retorna texto validado.
+    Com 'use_cache', URLs e PDFs já processados vêm do cache em disco (src/input_cache.py).
+    """
     source = source.strip()
+    cache = get_input_cache() if use_cache and input_cache_enabled() else None
     
     # 1. URL de PDF (NOVO CASO)
     if source.lower().startswith("http") and source.lower().endswith(".pdf"):
+        if cache is not None:
+            return read_url_cached(source, read_remote_pdf, cache)
         return read_remote_pdf(source)
 
     # 2. URL HTML
     if source.startswith("http://") or source.startswith("https://"):
+        if cache is not None:
+            return read_url_cached(source, read_url, cache)
         return read_url(source)
     
     # 3. Arquivo PDF Local
     if source.lower().endswith(".pdf"):
         if os.path.exists(source):
+            if cache is not None:
+                return read_pdf_cached(source, cache)
             return read_pdf(source)
         else:
             raise ValueError(f"Arquivo PDF não encontrado: {source}")
@@ -116,6 +242,21 @@ def clean_input_for_tool(input_data: Any) -> str:
     if isinstance(input_data, dict): return str(list(input_data.values())[0])
     return str(input_data).replace('{"query":', '').replace('}', '').replace('"', '').strip()
 
+def parse_query_list(input_data: Any) -> list:
+    """Normaliza a entrada da ferramenta de busca em lote para uma lista de frases."""
+    if isinstance(input_data, dict):
+        input_data = list(input_data.values())[0] if input_data else []
+    if isinstance(input_data, str):
+        try:
+            input_data = json.loads(input_data)
+        except json.JSONDecodeError:
+            input_data = re.split(r'\n|;|\|', input_data)
+        if isinstance(input_data, dict):
+            return parse_query_list(input_data)
+    if isinstance(input_data, str):
+        input_data = [input_data]
+    return [str(q).strip() for q in input_data if str(q).strip()]
+
 def extract_json_from_text(text: str) -> Optional[Dict]:
     if not text: return None
     
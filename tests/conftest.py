@@ -0,0 +1,9 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def disable_input_cache(monkeypatch):
+    """
+    Os testes de entrada simulam requests/pypdf e esperam uma leitura real a cada
+    chamada; o cache em disco (src/input_cache.py) só é ligado nos testes dele.
+    """
+    monkeypatch.setenv("INPUT_CACHE", "0")
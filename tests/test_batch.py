@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch import load_jobs, load_checkpoint, run_batch, default_job_name
+
+def write_queue(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_load_jobs_skips_invalid_and_dedupes_names(tmp_path):
+    """Linhas inválidas são ignoradas; nomes ausentes vêm da fonte; repetidos ganham sufixo."""
+    queue = write_queue(tmp_path / "fila.jsonl", [
+        json.dumps({"source": "samples/a.pdf", "name": "a"}),
+        "isto não é json",
+        json.dumps({"name": "sem_fonte"}),
+        "",
+        json.dumps({"source": "https://arxiv.org/abs/1706.03762"}),
+        json.dumps({"source": "samples/b.pdf", "name": "a"}),
+    ])
+    jobs = load_jobs(queue)
+    assert [job["name"] for job in jobs] == ["a", "1706_03762", "a_2"]
+    assert jobs[2]["source"] == "samples/b.pdf"
+
+def test_default_job_name():
+    assert default_job_name("samples/input_article_1.pdf") == "input_article_1"
+    assert default_job_name("https://example.com/papers/") == "papers"
+
+def test_run_batch_writes_results_and_resumes(tmp_path):
+    """Falhas ficam registradas e são refeitas na próxima execução; sucessos são pulados."""
+    results = str(tmp_path / "out" / "results.jsonl")
+    jobs = [{"source": f"src_{i}", "name": f"job_{i}"} for i in range(4)]
+    calls = []
+
+    def flaky(source, name):
+        calls.append(name)
+        if name == "job_1":
+            raise RuntimeError("queda simulada")
+        return None if name == "job_2" else {"area": "Computacao"}
+
+    summary = run_batch(jobs, flaky, concurrency=2, results_path=results)
+    assert summary == {"total": 4, "skipped": 0, "ok": 2, "failed": 2}
+    assert load_checkpoint(results) == {"job_0", "job_3"}
+
+    records = [json.loads(line) for line in open(results, encoding="utf-8")]
+    failed = {r["name"]: r for r in records if r["status"] == "failed"}
+    assert "queda simulada" in failed["job_1"]["error"]
+
+    calls.clear()
+    summary = run_batch(jobs, lambda source, name: calls.append(name) or {"ok": True},
+                        concurrency=2, results_path=results)
+    assert sorted(calls) == ["job_1", "job_2"]
+    assert summary["skipped"] == 2 and summary["ok"] == 2
+    assert load_checkpoint(results) == {f"job_{i}" for i in range(4)}
+
+def test_run_batch_respects_concurrency(tmp_path):
+    """Nunca há mais jobs simultâneos do que 'concurrency'."""
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def worker(source, name):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {}
+
+    jobs = [{"source": str(i), "name": str(i)} for i in range(8)]
+    run_batch(jobs, worker, concurrency=3, results_path=str(tmp_path / "r.jsonl"))
+    assert peak[0] <= 3
+
+def test_checkpoint_ignores_truncated_line(tmp_path):
+    """Uma linha cortada por queda no meio da escrita não impede a retomada."""
+    results = tmp_path / "r.jsonl"
+    results.write_text(json.dumps({"name": "a", "status": "ok"}) + '\n{"name": "b", "sta', encoding="utf-8")
+    assert load_checkpoint(str(results)) == {"a"}
@@ -0,0 +1,72 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bm25 import tokenize, build_index, save_index, load_index, index_is_current, reciprocal_rank_fusion
+
+CORPUS = {
+    "quimica_chunk_0": "The LiCoO2 cathode degrades at high voltage; Cu2+ ions dissolve in the electrolyte.",
+    "quimica_chunk_1": "Graphene is a single layer of carbon atoms with high electron mobility.",
+    "medicina_chunk_0": "Patients with BRCA1-mutated tumours showed elevated IL-6 and inflammation markers.",
+    "medicina_chunk_1": "Depression is associated with inflammation in several cohort studies of patients.",
+    "computacao_chunk_0": "The Transformer relies on multi-head self-attention instead of recurrence.",
+}
+
+def build(tmp_path):
+    path = str(tmp_path / "bm25")
+    save_index(build_index(list(CORPUS), list(CORPUS.values())), path)
+    return load_index(path)
+
+def test_tokenize_keeps_technical_terms():
+    """Fórmulas, genes e siglas ficam inteiros (e as partes de termos compostos também)."""
+    tokens = tokenize("LiCoO2 and Cu2+ with IL-6, BRCA1-mutated cells at pH 7.4.")
+    assert {"licoo2", "il-6", "brca1-mutated", "brca1", "7.4"} <= set(tokens)
+    assert "and" not in tokens and "with" not in tokens
+
+def test_exact_terms_rank_first(tmp_path):
+    index = build(tmp_path)
+    assert index.search("LiCoO2 cathode", 3)[0][0] == "quimica_chunk_0"
+    assert index.search("brca1", 3)[0][0] == "medicina_chunk_0"
+    # 'inflammation' aparece em dois chunks: os dois voltam, nenhum outro
+    assert {doc_id for doc_id, _ in index.search("inflammation", 5)} == {"medicina_chunk_0", "medicina_chunk_1"}
+    assert index.search("quantum chromodynamics", 5) == []
+
+def test_search_filters_by_area_and_source(tmp_path):
+    """Filtros de área/fonte valem também para o lado léxico da busca híbrida."""
+    path = str(tmp_path / "bm25")
+    metadatas = [{"area": doc_id.split("_")[0].capitalize(), "source": doc_id.split("_chunk")[0] + ".pdf"}
+                 for doc_id in CORPUS]
+    save_index(build_index(list(CORPUS), list(CORPUS.values()), metadatas), path)
+    index = load_index(path)
+    assert {d for d, _ in index.search("inflammation patients", 5, area="Medicina")} == {"medicina_chunk_0", "medicina_chunk_1"}
+    assert index.search("inflammation", 5, area="Quimica") == []
+    assert {d for d, _ in index.search("high", 5, source="quimica.pdf")} == {"quimica_chunk_0", "quimica_chunk_1"}
+    assert index.search("inflammation", 5, area="Fisica") == []
+
+def test_source_filter_includes_merged_chunks(tmp_path):
+    """Um chunk mesclado na ingestão (also_in) também é achado pelo filtro do arquivo que o reaproveita."""
+    path = str(tmp_path / "bm25")
+    metadatas = [{"area": "Medicina", "source": doc_id.split("_chunk")[0] + ".pdf"} for doc_id in CORPUS]
+    metadatas[list(CORPUS).index("medicina_chunk_1")]["also_in"] = '["revisao.pdf"]'
+    save_index(build_index(list(CORPUS), list(CORPUS.values()), metadatas), path)
+    index = load_index(path)
+    assert [d for d, _ in index.search("inflammation", 5, source="revisao.pdf")] == ["medicina_chunk_1"]
+    assert {d for d, _ in index.search("inflammation", 5, source="medicina.pdf")} == {"medicina_chunk_0", "medicina_chunk_1"}
+
+def test_index_is_memory_mapped_and_replaced_atomically(tmp_path):
+    """Reconstruir troca o diretório inteiro; o índice carregado usa mmap."""
+    index = build(tmp_path)
+    assert type(index.docs).__name__ == "memmap"
+    path = str(tmp_path / "bm25")
+    save_index(build_index(["novo_chunk_0"], ["LiCoO2 only here"]), path)
+    assert index_is_current(path)
+    assert not os.path.exists(path + ".tmp") and not os.path.exists(path + ".old")
+    assert [doc_id for doc_id, _ in load_index(path).search("LiCoO2", 5)] == ["novo_chunk_0"]
+    assert load_index(str(tmp_path / "inexistente")) is None
+
+def test_reciprocal_rank_fusion():
+    """Um item bem colocado nas duas listas supera o 1º de uma lista só."""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+    assert reciprocal_rank_fusion([["a"], []], n_results=1) == [("a", 1 / 61)]
@@ -0,0 +1,47 @@
+import sys
+import os
+
+# Adiciona src ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cache import LRUCache, cache_enabled, lazy_singleton
+
+# --- TESTE 1: HIT/MISS ---
+def test_lru_hit_miss_counters():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+# --- TESTE 2: EVICÇÃO ---
+def test_lru_evicts_least_recently_used():
+    """O item menos usado recentemente sai primeiro."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")          # 'a' passa a ser o mais recente
+    cache.put("c", 3)       # 'b' é removido
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+# --- TESTE 3: CACHE DESLIGADO ---
+def test_lru_zero_size_disables():
+    cache = LRUCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+# --- TESTE 4: FLAG DE AMBIENTE E INSTÂNCIA ÚNICA ---
+def test_cache_flag_and_lazy_singleton(monkeypatch):
+    """Os caches em disco/SQLite usam a mesma flag de ambiente e o mesmo getter preguiçoso."""
+    monkeypatch.delenv("TEST_CACHE", raising=False)
+    assert cache_enabled("TEST_CACHE")
+    for value in ("0", "False", " off "):
+        monkeypatch.setenv("TEST_CACHE", value)
+        assert not cache_enabled("TEST_CACHE")
+
+    created = []
+    get = lazy_singleton(lambda: created.append(LRUCache()) or created[-1])
+    assert created == []
+    assert get() is get() and len(created) == 1
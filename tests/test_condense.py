@@ -0,0 +1,61 @@
+import sys
+import os
+import hashlib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.condense import condense_text, estimate_tokens, body_length, GAP_MARKER
+
+def bag_of_words(texts):
+    """Embedding determinístico (palavras em 64 dimensões): basta para as seções se distinguirem."""
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().replace(":", " ").replace(",", " ").split():
+            vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+    return vectors
+
+def build_paper() -> str:
+    sections = [
+        "Abstract: this paper addresses the problem of slow battery charging and proposes a new cathode.",
+        "Methodology: the proposed approach uses a model of materials and an experimental setup with cells.",
+        "Filler paragraph about unrelated history of chemistry and general background knowledge.",
+        "Results: experiments and measurements show performance above baselines in every evaluation.",
+        "Conclusion: the summary of findings shows faster charging; limitations and future work remain.",
+    ]
+    body = " ".join(f"{section} Section {i} sentence {j} keeps going with more words."
+                    for i, section in enumerate(sections) for j in range(25))
+    return body + " References [1] Smith et al. Journal of Batteries. " * 40
+
+def test_short_input_is_untouched():
+    text = "Abstract: a short note that fits in any budget."
+    result = condense_text(text, budget=1000, embed=bag_of_words)
+    assert result["text"] == text and result["condensed"] is False
+
+def test_condensed_text_covers_paper_within_budget():
+    """Cabe no orçamento, segue a ordem do documento, inclui início e conclusão e descarta a bibliografia."""
+    paper = build_paper()
+    result = condense_text(paper, budget=1200, embed=bag_of_words)
+    assert result["condensed"] is True
+    assert result["tokens_out"] <= 1200 < result["tokens_in"]
+    assert result["text"].startswith("Abstract: this paper")
+    assert "Conclusion: the summary" in result["text"]
+    assert "Results:" in result["text"] and "Methodology:" in result["text"]
+    assert "Smith et al" not in result["text"]
+    assert result["selected"] == sorted(result["selected"])
+    positions = [paper.find(part[:80]) for part in result["text"].split(GAP_MARKER)]
+    assert -1 not in positions and positions == sorted(positions)
+
+def test_falls_back_to_positions_without_embeddings():
+    def broken(texts):
+        raise RuntimeError("modelo indisponível")
+    paper = build_paper()
+    result = condense_text(paper, budget=1200, embed=broken)
+    assert result["tokens_out"] <= 1200
+    assert result["selected"][0] == 0 and result["selected"][-1] == result["chunks"] - 1
+
+def test_references_header_only_counts_in_second_half():
+    assert body_length("References to prior work appear early. " + "x " * 100) == len("References to prior work appear early. " + "x " * 100)
+    text = "y " * 100 + "References [1] A."
+    assert body_length(text) == 200
+    assert estimate_tokens("abcde") == 2
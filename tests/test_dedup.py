@@ -0,0 +1,38 @@
+import sys
+import os
+import random
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dedup import simhash, hamming, NearDuplicateIndex, SIMHASH_MAX_DISTANCE
+
+random.seed(7)
+VOCAB = [f"termo{i}" for i in range(400)]
+
+def _text(words: int = 150) -> str:
+    return " ".join(random.choice(VOCAB) for _ in range(words))
+
+def test_simhash_separates_near_duplicates_from_distinct_text():
+    """Uma palavra trocada fica a poucos bits; outro texto fica perto de 32."""
+    text = _text()
+    words = text.split()
+    words[70] = "diferente"
+    assert simhash(text) == simhash(text.upper())
+    assert hamming(simhash(text), simhash(" ".join(words))) <= SIMHASH_MAX_DISTANCE
+    assert hamming(simhash(text), simhash(_text())) > 16
+
+def test_short_chunks_are_never_fingerprinted():
+    assert simhash("References") is None
+    assert simhash(_text(10)) is None
+
+def test_index_finds_closest_within_distance():
+    index = NearDuplicateIndex(max_distance=3)
+    base = simhash(_text())
+    index.add("a_chunk_0", base)
+    index.add("b_chunk_0", base ^ 0b11)
+    assert index.find(base ^ (1 << 63)) == "a_chunk_0"  # 1 bit de 'a', 3 de 'b'
+    assert index.find(base ^ 0b111) == "b_chunk_0"
+    # Bits espalhados pelas 4 faixas: ainda é achado se a distância for <= 3
+    assert index.find(base ^ (1 << 5 | 1 << 21 | 1 << 40)) == "a_chunk_0"
+    assert index.find(base ^ (1 << 5 | 1 << 21 | 1 << 40 | 1 << 60)) is None
+    assert len(index) == 2
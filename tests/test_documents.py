@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.documents import stitch_chunks, select_chunk_ids, parse_document_metadata
+from src.ingest import build_text_splitter
+
+def test_stitch_reverses_splitter_overlap():
+    """Costurar os chunks do splitter (com overlap) devolve o texto original."""
+    text = " ".join(f"Sentence number {i} describes the attention mechanism (fig. S{i})." for i in range(300))
+    chunks = build_text_splitter().split_text(text)
+    assert len(chunks) > 5
+    assert stitch_chunks(chunks) == text
+
+def test_stitch_without_overlap():
+    assert stitch_chunks(["primeiro trecho", "segundo trecho"]) == "primeiro trecho segundo trecho"
+    assert stitch_chunks(["fim da frase", ". Nova frase"]) == "fim da frase. Nova frase"
+    assert stitch_chunks(["", "só um"]) == "só um"
+
+def test_stitch_ignores_overlap_inside_a_word():
+    """'the' + 'ending' não vira 'thending': a emenda precisa começar numa palavra."""
+    assert stitch_chunks(["read the", "ending part"]) == "read the ending part"
+
+def test_select_chunk_ids_by_page_range():
+    ids = ["d_chunk_0", "d_chunk_1", "d_chunk_2", "d_chunk_3"]
+    pages = [[1, 1], [1, 2], [2, 3], [3, 3]]
+    assert select_chunk_ids(ids, pages) == ids
+    assert select_chunk_ids(ids, pages, 2, 2) == ["d_chunk_1", "d_chunk_2"]
+    assert select_chunk_ids(ids, pages, page_from=3) == ["d_chunk_2", "d_chunk_3"]
+    assert select_chunk_ids(ids, pages, 5, 9) == []
+
+def test_parse_document_metadata():
+    meta = parse_document_metadata({"source": "a.pdf", "chunk_ids": '["a_chunk_0"]', "chunk_pages": "[[1, 2]]"})
+    assert meta["chunk_ids"] == ["a_chunk_0"] and meta["chunk_pages"] == [[1, 2]]
+    assert meta["aliases"] == []
+    meta = parse_document_metadata({"chunk_ids": "[]", "aliases": '["Medicina/a.pdf"]'})
+    assert meta["aliases"] == ["Medicina/a.pdf"]
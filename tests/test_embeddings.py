@@ -0,0 +1,92 @@
+import sys
+import os
+import io
+import hashlib
+import tarfile
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embeddings import (
+    get_embedding_function, cosine_parity, OnnxEmbeddingFunction, onnx_model_dir, download_onnx_model,
+)
+
+def build_tiny_model(directory):
+    """Modelo ONNX mínimo com a interface do all-MiniLM-L6-v2 (ids/máscara/token types -> last_hidden_state)."""
+    onnx = pytest.importorskip("onnx")
+    from onnx import helper, numpy_helper, TensorProto
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    words = "attention is all you need lithium battery cathode depression treatment graphene".split()
+    vocab = {"[PAD]": 0, "[UNK]": 1, **{w: i + 2 for i, w in enumerate(words)}}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(directory / "tokenizer.json"))
+
+    rng = np.random.default_rng(0)
+    table = rng.normal(size=(len(vocab), 8)).astype(np.float32)
+    weights = rng.normal(size=(8, 8)).astype(np.float32)
+    inputs = [helper.make_tensor_value_info(n, TensorProto.INT64, ["B", "T"])
+              for n in ("input_ids", "attention_mask", "token_type_ids")]
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["E", "input_ids"], ["emb"]),
+         helper.make_node("MatMul", ["emb", "W"], ["h"]),
+         helper.make_node("Tanh", ["h"], ["last_hidden_state"])],
+        "tiny", inputs,
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["B", "T", 8])],
+        [numpy_helper.from_array(table, "E"), numpy_helper.from_array(weights, "W")])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 9
+    onnx.save(model, str(directory / "model.onnx"))
+
+def test_invalid_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_embedding_function("tensorflow")
+
+def test_cosine_parity():
+    reference = [[1.0, 0.0], [0.0, 2.0]]
+    assert cosine_parity(reference, reference)["min"] == pytest.approx(1.0)
+    assert cosine_parity(reference, [[1.0, 1.0], [0.0, 1.0]])["min"] == pytest.approx(0.70711, abs=1e-4)
+    assert cosine_parity([], [])["n"] == 0
+
+def test_onnx_dynamic_padding_matches_single_texts(tmp_path):
+    """Lotes ordenados por tamanho e padding dinâmico dão o mesmo vetor que cada texto sozinho, na ordem de entrada."""
+    build_tiny_model(tmp_path)
+    texts = ["lithium battery cathode " * 5, "attention", "depression treatment", "graphene is all you need"]
+    batched = OnnxEmbeddingFunction(model_dir=str(tmp_path), cache_dir=str(tmp_path), batch_size=3)(texts)
+    single = OnnxEmbeddingFunction(model_dir=str(tmp_path), cache_dir=str(tmp_path), batch_size=1)(texts)
+    assert cosine_parity(single, batched)["min"] > 0.9999
+    assert all(abs(np.linalg.norm(v) - 1.0) < 1e-5 for v in batched)
+
+def test_onnx_int8_parity(tmp_path):
+    """O modelo quantizado é gerado uma vez, em cache, e fica próximo do fp32."""
+    build_tiny_model(tmp_path)
+    texts = ["attention is all you need", "lithium battery cathode", "depression treatment"]
+    reference = OnnxEmbeddingFunction(model_dir=str(tmp_path), cache_dir=str(tmp_path / "cache"))(texts)
+    quantized = OnnxEmbeddingFunction(model_dir=str(tmp_path), cache_dir=str(tmp_path / "cache"), quantized=True)
+    assert os.path.dirname(quantized.model_path) == str(tmp_path / "cache")
+    assert cosine_parity(reference, quantized(texts))["min"] > 0.98
+
+def test_missing_onnx_model_points_to_download_step(tmp_path):
+    with pytest.raises(FileNotFoundError, match="make onnx-model"):
+        onnx_model_dir(str(tmp_path))
+
+def test_download_onnx_model_checks_sha256_and_extracts(tmp_path):
+    """O arquivo (com a pasta onnx/ dentro) vira o diretório do modelo; SHA-256 errado é recusado."""
+    archive = tmp_path / "onnx.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for name in ("model.onnx", "tokenizer.json"):
+            info = tarfile.TarInfo(f"onnx/{name}")
+            info.size = len(name)
+            tar.addfile(info, io.BytesIO(name.encode()))
+    url = archive.as_uri()
+    target = str(tmp_path / "models" / "minilm")
+
+    with pytest.raises(ValueError, match="SHA-256"):
+        download_onnx_model(target, url=url, sha256="0" * 64)
+    assert not os.path.exists(target)
+
+    digest = hashlib.sha256(archive.read_bytes()).hexdigest()
+    assert download_onnx_model(target, url=url, sha256=digest) == target
+    assert sorted(os.listdir(target)) == ["model.onnx", "tokenizer.json"]
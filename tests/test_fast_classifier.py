@@ -0,0 +1,60 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fast_classifier import select_segments, area_vote, classify_fast
+
+def hit(doc_id, area, distance):
+    return {"id": doc_id, "area": area, "source": f"{doc_id}.pdf", "distance": distance}
+
+def fake_search(hits_per_query):
+    """Simula search_articles_batch(format='json') devolvendo os mesmos hits por consulta."""
+    def search(queries):
+        return json.dumps([{"query": q, "hits": hits_per_query} for q in queries])
+    return search
+
+def test_segments_cover_start_and_body_without_repeats():
+    text = " ".join(f"palavra{i}" for i in range(2000))
+    segments = select_segments(text, n_segments=3, size=200)
+    assert len(segments) == 3
+    assert segments[0].startswith("palavra0 ")
+    assert len(set(segments)) == 3
+    assert select_segments("curto demais") == ["curto demais"]
+    assert select_segments("   ") == []
+
+def test_vote_is_weighted_by_distance():
+    """Dois hits distantes perdem para um hit muito próximo."""
+    vote = area_vote([
+        hit("med_1", "Medicina", 0.2),
+        hit("comp_1", "Computacao", 1.9),
+        hit("comp_2", "Computacao", 1.9),
+    ])
+    assert vote["area"] == "Medicina"
+    assert vote["evidence"] == ["med_1"]
+    assert 0 < vote["margin"] < 1
+
+def test_clear_cut_input_is_decisive():
+    hits = [hit("genetic_0", "Medicina", 0.3), hit("genetic_1", "Medicina", 0.4),
+            hit("depression_2", "Medicina", 0.5), hit("graphene_3", "Quimica", 1.2)]
+    vote = classify_fast("Genome-wide association study of variants " * 50, fake_search(hits))
+    assert vote["decisive"] is True
+    assert vote["area"] == "Medicina"
+    assert vote["evidence"][0] == "genetic_0"
+
+def test_split_vote_goes_to_researcher():
+    hits = [hit("a", "Computacao", 0.6), hit("b", "Quimica", 0.6), hit("c", "Computacao", 0.9)]
+    vote = classify_fast("Texto ambiguo sobre simulacao de materiais " * 30, fake_search(hits))
+    assert vote["decisive"] is False
+
+def test_out_of_domain_input_goes_to_researcher():
+    """Unanimidade com hits fracos (ex: Física) não basta para pular o pesquisador."""
+    hits = [hit("a", "Computacao", 1.6), hit("b", "Computacao", 1.7)]
+    vote = classify_fast("Die gegenwärtige Situation in der Quantenmechanik " * 30, fake_search(hits))
+    assert vote["margin"] == 1.0
+    assert vote["decisive"] is False
+
+def test_no_hits_is_not_decisive():
+    vote = classify_fast("Texto sem nenhum resultado na base " * 10, fake_search([]))
+    assert vote["area"] is None and vote["decisive"] is False
@@ -34,7 +34,7 @@ def test_pdf_extraction_empty(mock_pdf_reader):
         os.remove("temp_empty.pdf")
 
 # --- TESTE 2: TIMEOUT DE URL ---
-@patch('src.utils.requests.get')
+@patch('src.utils.HTTP_SESSION.get')
 def test_url_timeout(mock_get):
     """Simula um site que demora demais para responder."""
     mock_get.side_effect = Timeout("O servidor demorou demais")
@@ -46,7 +46,7 @@ def test_url_timeout(mock_get):
     assert "Erro" in str(excinfo.value) and "URL" in str(excinfo.value)
 
 # --- TESTE 3: ERRO 404 (Link Quebrado) ---
-@patch('src.utils.requests.get')
+@patch('src.utils.HTTP_SESSION.get')
 def test_url_404(mock_get):
     """Simula link que não existe."""
     mock_response = MagicMock()
@@ -0,0 +1,52 @@
+import sys
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import read_remote_pdf, download_to_buffer, HTTP_SESSION
+
+SAMPLE_PDF = "samples/input_article_1.pdf"
+
+def streamed_response(payload: bytes, content_length=None):
+    """Resposta simulada com corpo em streaming (iter_content) e uso em 'with'."""
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {} if content_length is None else {"Content-Length": str(content_length)}
+    response.iter_content.side_effect = lambda chunk_size: (
+        payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size))
+    response.__enter__.return_value = response
+    return response
+
+def test_session_pools_and_retries():
+    """A sessão compartilhada reaproveita conexões e refaz falhas transitórias."""
+    adapter = HTTP_SESSION.get_adapter("https://arxiv.org/pdf/1706.03762")
+    assert adapter.max_retries.total == 3
+    assert 503 in adapter.max_retries.status_forcelist
+
+def test_download_limit_from_header():
+    """Content-Length acima do limite é recusado antes de baixar qualquer byte."""
+    response = streamed_response(b"x", content_length=10**9)
+    with pytest.raises(ValueError, match="grande demais"):
+        download_to_buffer(response, max_bytes=1000)
+    response.iter_content.assert_not_called()
+
+def test_download_limit_while_streaming():
+    """Sem Content-Length, o limite é aplicado durante o streaming."""
+    with pytest.raises(ValueError, match="limite"):
+        download_to_buffer(streamed_response(b"x" * 5000), max_bytes=1000)
+
+@patch('src.utils.HTTP_SESSION.get')
+def test_remote_pdf_parsed_from_buffer(mock_get):
+    """O PDF remoto é lido direto do buffer, sem arquivo temporário nomeado."""
+    if not os.path.exists(SAMPLE_PDF):
+        pytest.skip(f"Sample {SAMPLE_PDF} não encontrado.")
+    with open(SAMPLE_PDF, "rb") as f:
+        mock_get.return_value = streamed_response(f.read())
+
+    with patch('tempfile.NamedTemporaryFile') as named_tmp:
+        text = read_remote_pdf("https://site-teste.com/artigo.pdf")
+    named_tmp.assert_not_called()
+    assert len(text) > 100
+    assert mock_get.call_args.kwargs["stream"] is True
@@ -0,0 +1,373 @@
+import sys
+import os
+import json
+import shutil
+import hashlib
+import pytest
+from unittest.mock import patch, MagicMock
+from chromadb.api.client import SharedSystemClient
+
+# Adiciona src ao path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+import src.ingest as ingest
+from src.ingest import (
+    plan_changes, manifest_entry, load_manifest, save_manifest, file_sha256,
+    build_text_splitter, iter_chunks, iter_pdf_pages, iter_chunks_with_pages,
+    EmbeddingBatcher, index_settings, plan_dependents, sync_aliases, get_files_from_data,
+    extract_documents
+)
+
+SAMPLE_PDF = os.path.join(ROOT, "data", "pdfs", "Computacao", "interfaces.pdf")
+
+def _make_doc(tmp_path, name, content, area="Computacao"):
+    path = tmp_path / area / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(content)
+    return {"path": str(path), "area": area, "filename": name}
+
+def _fake_embed(texts):
+    """Embedding determinístico de 8 dimensões (sem carregar modelo)."""
+    return [[b / 255 for b in hashlib.md5(text.encode()).digest()[:8]] for text in texts]
+
+def _run_ingest(tmp_path, monkeypatch, files: dict, *args) -> dict:
+    """
+    Roda a ingestão completa em tmp_path (banco e manifesto nos caminhos relativos
+    padrão) com embeddings falsos. 'files' mapeia "Área/arquivo.pdf" -> caminho ou bytes.
+    Devolve o manifesto gravado.
+    """
+    monkeypatch.chdir(tmp_path)
+    for relative, source in files.items():
+        target = tmp_path / "data" / "pdfs" / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(source, bytes):
+            target.write_bytes(source)
+        else:
+            shutil.copy(source, target)
+    monkeypatch.setattr(ingest, "get_embedding_function", lambda backend: _fake_embed)
+    # O Chroma guarda um cliente por caminho ("./db/chroma_data"), que aqui muda a cada tmp_path
+    SharedSystemClient.clear_system_cache()
+    ingest.main(["--workers", "1", *args])
+    return load_manifest(ingest.MANIFEST_PATH)
+
+def _manifest_for(docs):
+    """Simula o manifesto gravado após uma indexação completa."""
+    changed, _, _ = plan_changes(docs, {"files": {}})
+    return {"files": {d["path"]: manifest_entry(d, [f"{d['filename']}_chunk_0"]) for d in changed}}
+
+# --- TESTE 1: PRIMEIRA EXECUÇÃO ---
+def test_plan_all_new(tmp_path):
+    """Sem manifesto, todos os arquivos são novos."""
+    docs = [_make_doc(tmp_path, "a.pdf", b"aaa"), _make_doc(tmp_path, "b.pdf", b"bbb")]
+    changed, removed, unchanged = plan_changes(docs, {"files": {}})
+    assert len(changed) == 2 and removed == [] and unchanged == []
+    assert changed[0]["sha256"] == file_sha256(docs[0]["path"])
+
+# --- TESTE 2: NADA MUDOU ---
+def test_plan_unchanged_skips(tmp_path):
+    """Arquivos com mesmo tamanho/mtime são ignorados."""
+    docs = [_make_doc(tmp_path, "a.pdf", b"aaa")]
+    manifest = _manifest_for(docs)
+    changed, removed, unchanged = plan_changes([dict(d) for d in docs], manifest)
+    assert changed == [] and removed == [] and len(unchanged) == 1
+
+# --- TESTE 3: CONTEÚDO ALTERADO E ARQUIVO REMOVIDO ---
+def test_plan_modified_and_removed(tmp_path):
+    docs = [_make_doc(tmp_path, "a.pdf", b"aaa"), _make_doc(tmp_path, "b.pdf", b"bbb")]
+    manifest = _manifest_for(docs)
+
+    path_a = docs[0]["path"]
+    with open(path_a, "wb") as f:
+        f.write(b"conteudo novo")
+    os.remove(docs[1]["path"])
+
+    changed, removed, unchanged = plan_changes([{k: docs[0][k] for k in ("path", "area", "filename")}], manifest)
+    assert [d["path"] for d in changed] == [path_a]
+    assert removed == [docs[1]["path"]]
+    assert unchanged == []
+
+# --- TESTE 4: APENAS MTIME MUDOU ---
+def test_plan_touch_without_content_change(tmp_path):
+    """Um 'touch' muda o mtime, mas o hash igual evita reindexar."""
+    docs = [_make_doc(tmp_path, "a.pdf", b"aaa")]
+    manifest = _manifest_for(docs)
+    os.utime(docs[0]["path"], (1, 1))
+    changed, _, unchanged = plan_changes([{k: docs[0][k] for k in ("path", "area", "filename")}], manifest)
+    assert changed == [] and len(unchanged) == 1
+
+# --- TESTE 5: PERSISTÊNCIA DO MANIFESTO ---
+def test_manifest_roundtrip(tmp_path):
+    path = str(tmp_path / "db" / "manifest.json")
+    assert load_manifest(path) == {"settings": None, "files": {}}
+    save_manifest({"settings": {"chunk_size": 1}, "files": {"x": {}}}, path)
+    assert load_manifest(path)["files"] == {"x": {}}
+
+# --- TESTE 6: CHUNKING EM STREAMING ---
+def test_iter_chunks_matches_full_text():
+    """O split página a página deve equivaler ao split do texto inteiro."""
+    splitter = build_text_splitter()
+    pages = [" ".join(f"Sentence {p}-{i} about lithium batteries." for i in range(40)) for p in range(30)]
+
+    streamed = list(iter_chunks(iter(pages), splitter, window=3000))
+    full = splitter.split_text(" ".join(pages))
+
+    assert streamed == full
+    assert all(len(chunk) <= 1000 for chunk in streamed)
+
+def test_pool_and_streaming_extraction_agree():
+    """O pool de processos devolve os mesmos documentos e chunks que o caminho em streaming."""
+    docs = [{"path": os.path.join(ROOT, "data", "pdfs", area, name), "area": area, "filename": name}
+            for area, name in (("Computacao", "interfaces.pdf"), ("Medicina", "genetic.pdf"))]
+    serial = [(doc["filename"], list(chunks)) for doc, chunks in extract_documents(docs, workers=1)]
+    pooled = [(doc["filename"], list(chunks)) for doc, chunks in extract_documents(docs, workers=2)]
+    # Mesma ordem da entrada nos dois caminhos (a deduplicação mantém sempre a mesma cópia)
+    assert [name for name, _ in serial] == ["interfaces.pdf", "genetic.pdf"]
+    assert pooled == serial and all(chunks for _, chunks in serial)
+
+def test_switching_embedding_backend_reindexes_everything(tmp_path, monkeypatch):
+    """Vetores de outro backend não ficam misturados no índice: a troca reconstrói tudo."""
+    files = {"Computacao/interfaces.pdf": SAMPLE_PDF}
+    before = _run_ingest(tmp_path, monkeypatch, files)
+    after = _run_ingest(tmp_path, monkeypatch, files, "--embedding-backend", "onnx")
+    entry = after["files"]["./data/pdfs/Computacao/interfaces.pdf"]
+    assert "embedding_backend" not in before["settings"] and after["settings"]["embedding_backend"] == "onnx"
+    assert entry["embedding_backend"] == "onnx" and entry["chunk_ids"]
+
+def test_same_filename_in_two_areas_does_not_collide(tmp_path, monkeypatch):
+    """Artigos e chunks são identificados por "Area/arquivo.pdf": o nome repetido não sobrescreve o outro."""
+    import chromadb
+    import src.mcp_server as server
+    genetic = os.path.join(ROOT, "data", "pdfs", "Medicina", "genetic.pdf")
+    manifest = _run_ingest(tmp_path, monkeypatch, {"Computacao/paper.pdf": SAMPLE_PDF, "Medicina/paper.pdf": genetic})
+    assert len(manifest["files"]) == 2
+
+    client = chromadb.PersistentClient(path=ingest.DB_PATH)
+    documents = client.get_collection(ingest.DOCUMENTS_COLLECTION_NAME)
+    chunks = client.get_collection(ingest.COLLECTION_NAME)
+    assert sorted(documents.get(include=[])["ids"]) == ["Computacao/paper.pdf", "Medicina/paper.pdf"]
+    stored = chunks.get(ids=["Computacao/paper.pdf_chunk_0", "Medicina/paper.pdf_chunk_0"])
+    assert sorted(meta["area"] for meta in stored["metadatas"]) == ["Computacao", "Medicina"]
+
+    monkeypatch.setattr(server, "collection", chunks)
+    monkeypatch.setattr(server, "documents_collection", documents)
+    by_path = json.loads(server.get_document("Medicina/paper.pdf"))
+    by_chunk = json.loads(server.get_document("Computacao/paper.pdf_chunk_2"))
+    assert (by_path["id"], by_path["area"]) == ("Medicina/paper.pdf", "Medicina")
+    assert (by_chunk["id"], by_chunk["area"]) == ("Computacao/paper.pdf", "Computacao")
+    assert by_path["content"][:200] != by_chunk["content"][:200]
+    assert "more than one area" in server.get_document("paper.pdf")
+
+def test_duplicates_are_merged_only_within_the_same_area(tmp_path, monkeypatch):
+    """A cópia na mesma área vira alias; a de outra área é indexada lá, alcançável pelo filtro da área."""
+    import chromadb
+    manifest = _run_ingest(tmp_path, monkeypatch, {"Computacao/interfaces.pdf": SAMPLE_PDF,
+                                                   "Computacao/interfaces_v2.pdf": SAMPLE_PDF,
+                                                   "Medicina/interfaces.pdf": SAMPLE_PDF}, "--workers", "2")
+    files = manifest["files"]
+    original, same_area, other_area = (files[f"./data/pdfs/{name}"] for name in
+                                       ("Computacao/interfaces.pdf", "Computacao/interfaces_v2.pdf",
+                                        "Medicina/interfaces.pdf"))
+    assert same_area["duplicate_of"] == "./data/pdfs/Computacao/interfaces.pdf"
+    assert original["aliases"] == ["Computacao/interfaces_v2.pdf"]
+    assert "duplicate_of" not in other_area and "shared_chunk_ids" not in other_area
+    assert len(other_area["chunk_ids"]) == len(original["chunk_ids"])
+
+    client = chromadb.PersistentClient(path=ingest.DB_PATH)
+    chunks = client.get_collection(ingest.COLLECTION_NAME)
+    medicina = chunks.get(where={"area": "Medicina"}, include=["metadatas"])
+    assert sorted(medicina["ids"]) == sorted(other_area["chunk_ids"])
+    assert {meta["source"] for meta in medicina["metadatas"]} == {"interfaces.pdf"}
+
+    # A cópia que o próprio servidor lista em 'aliases' abre o artigo indexado
+    import src.mcp_server as server
+    monkeypatch.setattr(server, "collection", chunks)
+    monkeypatch.setattr(server, "documents_collection", client.get_collection(ingest.DOCUMENTS_COLLECTION_NAME))
+    monkeypatch.setattr(server, "MANIFEST_PATH", ingest.MANIFEST_PATH)
+    document = json.loads(server.get_document("Computacao/interfaces_v2.pdf"))
+    assert document["id"] == "Computacao/interfaces.pdf" and document["aliases"] == ["Computacao/interfaces_v2.pdf"]
+
+def test_merged_chunks_record_the_reusing_file(tmp_path, monkeypatch):
+    """O chunk mantido ganha 'also_in' com o arquivo que o reaproveita: o filtro por 'source' dele o acha."""
+    import chromadb
+    import src.mcp_server as server
+    with open(SAMPLE_PDF, "rb") as f:
+        reexported = f.read() + b"\n% exportado de novo\n"  # outros bytes, mesmo texto
+    files = {"Computacao/interfaces.pdf": SAMPLE_PDF, "Computacao/reexport.pdf": reexported}
+    manifest = _run_ingest(tmp_path, monkeypatch, files)
+    shared = manifest["files"]["./data/pdfs/Computacao/reexport.pdf"]["shared_chunk_ids"]
+    assert shared
+
+    chunks = chromadb.PersistentClient(path=ingest.DB_PATH).get_collection(ingest.COLLECTION_NAME)
+    kept = chunks.get(ids=shared, include=["metadatas"])
+    assert all(json.loads(meta["also_in"]) == ["reexport.pdf"] for meta in kept["metadatas"])
+    assert {meta["source"] for meta in kept["metadatas"]} == {"interfaces.pdf"}
+    assert set(shared) <= set(chunks.get(where=server.build_where(source="reexport.pdf"), include=[])["ids"])
+
+    # Apagar o arquivo que reaproveitava tira a marca dos chunks mantidos
+    os.remove(tmp_path / "data" / "pdfs" / "Computacao" / "reexport.pdf")
+    _run_ingest(tmp_path, monkeypatch, {})
+    kept = chunks.get(ids=shared, include=["metadatas"])
+    assert len(kept["ids"]) == len(shared) and not any("also_in" in meta for meta in kept["metadatas"])
+    assert not any(key.startswith("also_in:") for meta in kept["metadatas"] for key in meta)
+
+# --- TESTE 7: HÍFEN NA QUEBRA DE PÁGINA ---
+@patch('src.ingest.PdfReader')
+def test_iter_pdf_pages_joins_hyphen_across_pages(mock_pdf_reader):
+    """'inter-' no fim de uma página + 'national' na seguinte vira 'international'."""
+    first, second = MagicMock(), MagicMock()
+    first.extract_text.return_value = "The inter-"
+    second.extract_text.return_value = "national study."
+    mock_pdf_reader.return_value.pages = [first, second]
+
+    assert " ".join(iter_pdf_pages("fake.pdf")) == "The international study."
+
+
+# --- TESTE 8: PÁGINAS DE CADA CHUNK ---
+def test_iter_chunks_with_pages_spans():
+    """Cada chunk sabe em que páginas começa e termina, inclusive após reancorar o buffer."""
+    splitter = build_text_splitter()
+    pages = [(p, " ".join(f"Page{p} sentence {i} about lithium." for i in range(40))) for p in range(1, 21)]
+
+    spanned = list(iter_chunks_with_pages(iter(pages), splitter, window=3000))
+    assert [chunk for chunk, _, _ in spanned] == list(iter_chunks((text for _, text in pages), splitter, window=3000))
+    for chunk, first, last in spanned:
+        markers = {int(word[4:]) for word in chunk.split() if word.startswith("Page")}
+        assert markers and first <= min(markers) and max(markers) <= last
+    assert spanned[0][1] == 1 and spanned[-1][2] == 20
+    assert [first for _, first, _ in spanned] == sorted(first for _, first, _ in spanned)
+
+# --- TESTE 8b: LOTES DE EMBEDDINGS ---
+class _RecordingCollection:
+    """Coleção falsa que guarda a ordem dos upserts."""
+
+    def __init__(self):
+        self.upserted = []
+        self.batches = []
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        assert len(ids) == len(documents) == len(metadatas) == len(embeddings)
+        self.upserted.extend(ids)
+        self.batches.append(list(ids))
+
+def _batcher_with_log(batch_size):
+    collection = _RecordingCollection()
+    written = []  # (documento, ids já gravados quando on_written foi chamado)
+    embed = lambda docs: [[1.0, float(len(d))] for d in docs]
+    batcher = EmbeddingBatcher(collection, embed, batch_size=batch_size,
+                               on_written=lambda key: written.append((key, list(collection.upserted))))
+    return batcher, collection, written
+
+def _add_doc(batcher, key, n):
+    for i in range(n):
+        batcher.add(key, [f"{key}_chunk_{i}"], [f"texto {key} {i}"], [{"source": key}])
+
+def test_batcher_document_split_across_batches_written_after_last_chunk():
+    """O manifesto (on_written) só vê o documento depois do upsert do seu último chunk."""
+    batcher, collection, written = _batcher_with_log(batch_size=3)
+    _add_doc(batcher, "a", 5)  # 3 no primeiro lote, 2 pendentes
+    batcher.finish("a")
+    assert collection.batches == [["a_chunk_0", "a_chunk_1", "a_chunk_2"]] and written == []
+
+    batcher.flush()
+    assert written == [("a", [f"a_chunk_{i}" for i in range(5)])]
+    assert batcher.total_chunks == 5 and batcher.pending == {}
+
+def test_batcher_document_in_one_batch_and_open_documents_wait():
+    """Documento ainda aberto não é dado como gravado, mesmo com todos os chunks enviados."""
+    batcher, collection, written = _batcher_with_log(batch_size=4)
+    _add_doc(batcher, "a", 2)
+    batcher.finish("a")
+    _add_doc(batcher, "b", 2)  # fecha o lote: a + b no mesmo upsert, mas 'b' ainda pode crescer
+    assert collection.batches == [["a_chunk_0", "a_chunk_1", "b_chunk_0", "b_chunk_1"]]
+    assert [key for key, _ in written] == ["a"]
+
+    batcher.finish("b")
+    assert [key for key, _ in written] == ["a", "b"]
+    assert batcher.document_embedding("b") is None  # somas descartadas após on_written
+
+def test_batcher_final_partial_flush_and_empty_document():
+    batcher, collection, written = _batcher_with_log(batch_size=10)
+    batcher.finish("vazio")  # sem chunks: gravado na hora
+    _add_doc(batcher, "a", 3)
+    batcher.finish("a")
+    assert collection.batches == [] and [key for key, _ in written] == ["vazio"]
+
+    batcher.flush()
+    batcher.flush()  # lote vazio: nada a fazer
+    assert collection.batches == [["a_chunk_0", "a_chunk_1", "a_chunk_2"]]
+    assert [key for key, _ in written] == ["vazio", "a"] and batcher.total_chunks == 3
+
+# --- TESTE 9: PARTIÇÕES POR ÁREA ---
+def test_batcher_writes_area_partitions():
+    """Cada chunk vai para a coleção principal e para a da sua área, com os mesmos embeddings."""
+    main_collection = MagicMock()
+    partitions = {"Medicina": MagicMock(), "Quimica": MagicMock()}
+    embed = lambda docs: [[float(len(d)), 1.0] for d in docs]
+    batcher = EmbeddingBatcher(main_collection, embed, batch_size=10, partition_for=partitions.get)
+
+    batcher.add("a", ["a_chunk_0", "a_chunk_1"], ["x", "yy"], [{"area": "Medicina"}] * 2)
+    batcher.add("b", ["b_chunk_0"], ["zzz"], [{"area": "Quimica"}])
+    batcher.add("c", ["c_chunk_0"], ["w"], [{"area": "Fisica"}])  # sem partição: só na principal
+    batcher.flush()
+
+    assert main_collection.upsert.call_args.kwargs["ids"] == ["a_chunk_0", "a_chunk_1", "b_chunk_0", "c_chunk_0"]
+    medicina = partitions["Medicina"].upsert.call_args.kwargs
+    assert medicina["ids"] == ["a_chunk_0", "a_chunk_1"] and medicina["embeddings"] == [[1.0, 1.0], [2.0, 1.0]]
+    assert partitions["Quimica"].upsert.call_args.kwargs["ids"] == ["b_chunk_0"]
+
+def test_partition_setting_only_when_enabled():
+    """Bancos sem partição mantêm as mesmas configurações (não são reconstruídos)."""
+    assert "partition_by_area" not in index_settings()
+    assert index_settings(True)["partition_by_area"] is True
+    assert index_settings(dedup=False)["dedup"] is False and "dedup" not in index_settings()
+    # Trocar de backend muda as configurações, e isso força a reindexação completa
+    assert "embedding_backend" not in index_settings()
+    assert index_settings(embedding_backend="onnx") != index_settings(embedding_backend="onnx-int8")
+
+# --- TESTE 10: DEDUPLICAÇÃO ---
+def test_plan_dependents_follows_shared_chunks(tmp_path):
+    """Apagar o dono de um chunk compartilhado (ou de um arquivo idêntico) reindexa quem depende dele."""
+    docs = [_make_doc(tmp_path, f"{name}.pdf", name.encode()) for name in "abcd"]
+    manifest = _manifest_for(docs)
+    files = manifest["files"]
+    files[docs[1]["path"]]["shared_chunk_ids"] = ["a.pdf_chunk_0"]
+    files[docs[2]["path"]]["shared_chunk_ids"] = ["b.pdf_chunk_0"]  # depende de 'a' através de 'b'
+    files[docs[3]["path"]]["duplicate_of"] = docs[0]["path"]
+    _, _, unchanged = plan_changes(docs[1:], manifest)
+
+    dependents, remaining = plan_dependents(manifest, [docs[0]["path"]], unchanged)
+    assert sorted(d["filename"] for d in dependents) == ["b.pdf", "c.pdf", "d.pdf"] and remaining == []
+    assert plan_dependents(manifest, [docs[2]["path"]], unchanged[:1]) == ([], unchanged[:1])
+
+def test_sync_aliases_updates_only_changed_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "DATA_PATH", str(tmp_path))
+    docs = [_make_doc(tmp_path, "a.pdf", b"x"), _make_doc(tmp_path, "copia.pdf", b"x")]
+    manifest = _manifest_for(docs)
+    manifest["files"][docs[1]["path"]]["duplicate_of"] = docs[0]["path"]
+    documents = MagicMock()
+
+    assert sync_aliases(manifest, documents) == 2  # o artigo e o mapa cópia -> artigo
+    documents.update.assert_called_once_with(ids=["Computacao/a.pdf"], metadatas=[{"aliases": '["Computacao/copia.pdf"]'}])
+    assert manifest["aliases"] == {"Computacao/copia.pdf": "Computacao/a.pdf"}
+    assert sync_aliases(manifest, documents) == 0
+
+    del manifest["files"][docs[1]["path"]]  # cópia apagada: a lista esvazia
+    assert sync_aliases(manifest, documents) == 2 and manifest["files"][docs[0]["path"]]["aliases"] == []
+    assert manifest["aliases"] == {}
+
+    missing = MagicMock()
+    missing.get.return_value = {"ids": []}  # artigo sem registro na coleção de documentos
+    manifest["files"][docs[0]["path"]].pop("aliases")
+    manifest["files"][docs[1]["path"]] = {**manifest_entry(docs[1], []), "duplicate_of": docs[0]["path"]}
+    assert sync_aliases(manifest, missing) == 1 and not missing.update.called
+    assert "aliases" not in manifest["files"][docs[0]["path"]]
+
+def test_failed_extraction_stays_out_of_manifest(tmp_path, monkeypatch):
+    """Um PDF ilegível não entra no manifesto com 0 chunks: a próxima execução tenta de novo."""
+    manifest = _run_ingest(tmp_path, monkeypatch, {"Computacao/ok.pdf": SAMPLE_PDF,
+                                                   "Computacao/quebrado.pdf": b"nao e um pdf"})
+    assert [entry["filename"] for entry in manifest["files"].values()] == ["ok.pdf"]
+    assert manifest["files"][next(iter(manifest["files"]))]["chunk_ids"]
+    changed, _, _ = plan_changes(get_files_from_data(), manifest)
+    assert [doc["filename"] for doc in changed] == ["quebrado.pdf"]
@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.utils
+from src.input_cache import InputCache
+from src.utils import process_input
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    """Liga o cache (o conftest desliga) apontando para um diretório temporário."""
+    monkeypatch.setenv("INPUT_CACHE", "1")
+    cache = InputCache(str(tmp_path / "inputs"), **kwargs)
+    monkeypatch.setattr(src.utils, "get_input_cache", lambda: cache)
+    return cache
+
+def html_response(text, etag='"v1"'):
+    response = MagicMock()
+    response.status_code = 200
+    response.content = f"<html><body><p>{text}</p></body></html>".encode("utf-8")
+    response.headers = {"ETag": etag}
+    return response
+
+def test_roundtrip_is_compressed(tmp_path):
+    """O texto volta igual e ocupa menos espaço em disco que o original."""
+    cache = InputCache(str(tmp_path))
+    text = "attention is all you need " * 2000
+    cache.put("k", text, source="x")
+    assert cache.get("k")["text"] == text
+    stored = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert stored < len(text) / 10
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    """Ao estourar o limite, sai a entrada usada há mais tempo (não a mais antiga gravada)."""
+    cache = InputCache(str(tmp_path), max_bytes=10**9)
+    for key in ("a", "b", "c"):
+        cache.put(key, os.urandom(2000).hex())
+    past = time.time() - 100
+    for offset, key in enumerate(("a", "b", "c")):
+        os.utime(cache._path(key), (past + offset, past + offset))
+    assert cache.get("a") is not None  # 'a' passa a ser a mais recente
+
+    cache.max_bytes = 2 * os.path.getsize(cache._path("a")) + 100
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = InputCache(str(tmp_path))
+    cache.put("k", "texto")
+    with open(cache._path("k"), "wb") as f:
+        f.write(b"lixo")
+    assert cache.get("k") is None
+    assert not os.path.exists(cache._path("k"))
+
+@patch('src.utils.PdfReader')
+def test_local_pdf_parsed_once(mock_pdf_reader, tmp_path, monkeypatch):
+    """O mesmo conteúdo não passa pelo pypdf duas vezes; conteúdo novo invalida."""
+    make_cache(tmp_path, monkeypatch)
+    page = MagicMock()
+    page.extract_text.return_value = "Texto extraido do PDF em cache."
+    mock_pdf_reader.return_value.pages = [page]
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"versao 1")
+
+    assert "em cache" in process_input(str(pdf))
+    assert "em cache" in process_input(str(pdf))
+    assert mock_pdf_reader.call_count == 1
+
+    pdf.write_bytes(b"versao 2")
+    process_input(str(pdf))
+    assert mock_pdf_reader.call_count == 2
+
+    process_input(str(pdf), use_cache=False)
+    assert mock_pdf_reader.call_count == 3
+
+@patch('src.utils.HTTP_SESSION.get')
+def test_url_fresh_then_conditional_get(mock_get, tmp_path, monkeypatch):
+    """Dentro da janela não há rede; depois, um 304 do GET condicional reaproveita o texto."""
+    cache = make_cache(tmp_path, monkeypatch)
+    url = "http://site-teste.com/artigo"
+    mock_get.return_value = html_response("Conteudo do Artigo Cientifico " * 5)
+
+    first = process_input(url)
+    assert process_input(url) == first
+    assert mock_get.call_count == 1
+
+    cache.url_fresh_seconds = 0
+    not_modified = html_response("")
+    not_modified.status_code = 304
+    mock_get.return_value = not_modified
+    assert process_input(url) == first
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+    mock_get.return_value = html_response("Versao Nova do Artigo Cientifico " * 5, etag='"v2"')
+    assert "Versao Nova" in process_input(url)
+    assert cache.get(f"url:{url}")["validators"]["etag"] == '"v2"'
@@ -17,7 +17,7 @@ def test_input_raw_text():
     assert resultado == texto
 
 # --- TESTE 2: URL (Simulado/Mockado) ---
-@patch('src.utils.requests.get')
+@patch('src.utils.HTTP_SESSION.get')
 def test_input_url(mock_get):
     """
     Testa o processamento de URL simulando uma resposta da internet.
@@ -0,0 +1,54 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm_cache import LLMResponseCache, make_key
+
+MESSAGES = [
+    {"role": "system", "content": "You are a strict classifier."},
+    {"role": "user", "content": "Classify: attention is all you need"},
+]
+
+def test_key_depends_on_model_messages_and_tool_results():
+    """Modelo, task e cada Observation de ferramenta entram na chave."""
+    base = make_key("gemini/a", MESSAGES)
+    assert make_key("gemini/a", [dict(m) for m in MESSAGES]) == base
+    assert make_key("gemini/b", MESSAGES) != base
+    with_tool = MESSAGES + [{"role": "user", "content": "Observation: ID: transformers.pdf_chunk_3"}]
+    other_tool = MESSAGES + [{"role": "user", "content": "Observation: ID: graphene.pdf_chunk_1"}]
+    assert len({base, make_key("gemini/a", with_tool), make_key("gemini/a", other_tool)}) == 3
+    assert make_key("gemini/a", MESSAGES, stop=["\nObservation:"]) != base
+    assert make_key("gemini/a", "texto") == make_key("gemini/a", [{"role": "user", "content": "texto"}])
+
+def test_roundtrip_persists_across_instances(tmp_path):
+    """Uma nova execução (novo processo) encontra as respostas da anterior."""
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMResponseCache(path)
+    key = make_key("gemini/a", MESSAGES)
+    assert cache.get(key) is None
+    cache.put(key, "gemini/a", '{"area": "Computacao"}')
+    cache.close()
+
+    reopened = LLMResponseCache(path)
+    assert reopened.get(key) == '{"area": "Computacao"}'
+    assert reopened.stats() == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+
+def test_ttl_expires_entries(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=60)
+    cache.put("k", "m", "resposta")
+    cache._conn.execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), max_entries=2)
+    cache.put("a", "m", "1")
+    time.sleep(0.01)
+    cache.put("b", "m", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"  # 'a' passa a ser a mais recente
+    cache.put("c", "m", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
@@ -0,0 +1,95 @@
+import sys
+import os
+import contextlib
+import anyio
+import pytest
+from types import SimpleNamespace
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData, CONNECTION_CLOSED, INVALID_PARAMS
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.mcp_client as mcp_client
+from src.mcp_client import MCPClient
+
+class FakeSession:
+    """ClientSession falsa: cada call_tool consome o próximo item do roteiro (exceção ou texto)."""
+
+    def __init__(self, script):
+        self.script = script
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def initialize(self):
+        pass
+
+    async def call_tool(self, name, arguments=None, read_timeout_seconds=None):
+        self.calls.append(name)
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=step)])
+
+@pytest.fixture
+def fake_transport(monkeypatch):
+    """Troca o SSE e a ClientSession; devolve (roteiro compartilhado, sessões abertas)."""
+    script, sessions = [], []
+
+    @contextlib.asynccontextmanager
+    async def fake_sse_client(url):
+        yield None, None
+
+    def fake_client_session(read, write):
+        sessions.append(FakeSession(script))
+        return sessions[-1]
+
+    monkeypatch.setattr(mcp_client, "sse_client", fake_sse_client)
+    monkeypatch.setattr(mcp_client, "ClientSession", fake_client_session)
+    client = MCPClient("http://fake/sse", call_timeout=5, connect_timeout=5)
+    yield client, script, sessions
+    client.close()
+
+def test_session_is_reused_across_calls(fake_transport):
+    client, script, sessions = fake_transport
+    script.extend(["um", "dois", "três"])
+    assert [client.call_tool_text("search_articles", {}) for _ in range(3)] == ["um", "dois", "três"]
+    assert client.connections == 1 and len(sessions) == 1
+    assert sessions[0].calls == ["search_articles"] * 3
+
+@pytest.mark.parametrize("dropped", [
+    McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")),
+    anyio.ClosedResourceError(),
+])
+def test_dropped_stream_reconnects_once(fake_transport, dropped):
+    client, script, sessions = fake_transport
+    script.extend(["ok", dropped, "depois da queda"])
+    assert client.call_tool_text("get_document", {}) == "ok"
+    assert client.call_tool_text("get_document", {}) == "depois da queda"
+    assert client.connections == 2
+    assert [s.calls for s in sessions] == [["get_document", "get_document"], ["get_document"]]
+
+def test_second_drop_is_raised(fake_transport):
+    client, script, sessions = fake_transport
+    script.extend([anyio.ClosedResourceError(), anyio.ClosedResourceError()])
+    with pytest.raises(anyio.ClosedResourceError):
+        client.call_tool_text("get_document", {})
+    assert client.connections == 2
+
+@pytest.mark.parametrize("error", [
+    McpError(ErrorData(code=408, message="Timed out while waiting for response")),
+    McpError(ErrorData(code=INVALID_PARAMS, message="Unknown tool")),
+    TimeoutError(),
+])
+def test_timeouts_and_server_errors_are_not_retried(fake_transport, error):
+    """Com a sessão viva, repetir só dobraria a espera: o erro sobe na primeira tentativa."""
+    client, script, sessions = fake_transport
+    script.extend([error, "ainda conectado"])
+    with pytest.raises(type(error)):
+        client.call_tool_text("search_articles", {})
+    assert client.call_tool_text("search_articles", {}) == "ainda conectado"
+    assert client.connections == 1 and sessions[0].calls == ["search_articles"] * 2
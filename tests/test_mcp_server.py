@@ -0,0 +1,201 @@
+import sys
+import os
+import json
+import threading
+import subprocess
+import anyio
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+import src.mcp_server as server
+from src.cache import LRUCache
+
+class FakeCollection:
+    """Coleção do Chroma em memória: cada consulta devolve um hit derivado do embedding."""
+
+    def __init__(self):
+        self.queries = []
+
+    def count(self):
+        return 3
+
+    def query(self, query_embeddings, n_results, where=None):
+        self.queries.append([list(map(float, emb)) for emb in query_embeddings])
+        ids = [[f"doc.pdf_chunk_{int(emb[0])}"] for emb in query_embeddings]
+        return {"ids": ids, "documents": [["texto"] for _ in ids], "distances": [[0.5] for _ in ids],
+                "metadatas": [[{"area": "Computacao", "source": "doc.pdf"}] for _ in ids]}
+
+@pytest.fixture
+def fake_server(monkeypatch, tmp_path):
+    """Estado global do servidor trocado por falsos (modelo conta os textos embutidos)."""
+    embedded = []
+
+    def embed(texts):
+        embedded.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    collection = FakeCollection()
+    monkeypatch.setattr(server, "collection", collection)
+    monkeypatch.setattr(server, "embedding_func", embed)
+    monkeypatch.setattr(server, "partitions", {})
+    monkeypatch.setattr(server, "embedding_cache", LRUCache(16))
+    monkeypatch.setattr(server, "result_cache", LRUCache(16))
+    monkeypatch.setattr(server, "_index_version", None)
+    monkeypatch.setattr(server, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(server, "BM25_PATH", str(tmp_path / "bm25"))
+    return collection, embedded
+
+def run_server_snippet(code: str, tmp_path, **env) -> dict:
+    """Importa src.mcp_server em um processo novo (o estado do módulo é global) e devolve o JSON impresso."""
+    environment = {**os.environ, "CHROMA_DB_PATH": str(tmp_path / "chroma_data"),
+                   "ANONYMIZED_TELEMETRY": "False", **env}
+    output = subprocess.run([sys.executable, "-c", "import json, sys\nimport src.mcp_server as server\n" + code],
+                            cwd=ROOT, env=environment, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_import_does_not_load_model_or_database(tmp_path):
+    """Importar o servidor é barato: banco e modelo só são carregados no aquecimento."""
+    state = run_server_snippet(
+        "print(json.dumps({'chromadb': 'chromadb' in sys.modules, 'model': server.embedding_func is not None,"
+        " 'ready': server.readiness()['ready'], 'status': server.readiness()['model']['status']}))",
+        tmp_path)
+    assert state == {"chromadb": False, "model": False, "ready": False, "status": "pending"}
+    assert not (tmp_path / "chroma_data").exists()
+
+def test_warm_up_reports_errors_instead_of_raising(tmp_path):
+    """Sem índice e com backend inválido, o servidor continua de pé e o /readyz explica o motivo."""
+    state = run_server_snippet(
+        "server.warm_up()\nprint(json.dumps({**server.readiness(), 'call': server.ensure_ready()}))",
+        tmp_path, EMBEDDING_BACKEND="inexistente")
+    assert state["ready"] is False
+    assert state["model"]["status"] == "error" and "inexistente" in state["errors"]["model"]
+    assert state["index"]["status"] == "error" and "index" in state["errors"]
+    assert state["call"].startswith("Error: Database not initialized")
+
+def test_sync_tools_load_on_first_use(tmp_path):
+    """Sem warm_up() (ex: src/test_server.py), a primeira busca abre o índice e o modelo sozinha."""
+    state = run_server_snippet(
+        "import chromadb\n"
+        "db = chromadb.PersistentClient(path=server.DB_PATH)\n"
+        "db.create_collection(server.COLLECTION_NAME).add(ids=['doc.pdf_chunk_0'], embeddings=[[1.0, 0.0]],\n"
+        "    documents=['texto'], metadatas=[{'area': 'Computacao', 'source': 'doc.pdf'}])\n"
+        "server.get_embedding_function = lambda: (lambda texts: [[1.0, 0.0] for _ in texts])\n"
+        "text = server.search_articles('attention mechanism')\n"
+        "print(json.dumps({'text': text, 'ready': server.is_ready()}))",
+        tmp_path)
+    assert state["ready"] is True and "ID: doc.pdf_chunk_0" in state["text"]
+
+def test_sync_tools_without_index_return_error(tmp_path):
+    state = run_server_snippet(
+        "print(json.dumps({'search': server.search_articles('x'), 'batch': server.search_articles_batch(['x']),"
+        " 'chunk': server.get_article_content('doc.pdf_chunk_0'), 'document': server.get_document('doc.pdf')}))",
+        tmp_path, EMBEDDING_BACKEND="inexistente")
+    assert all(text.startswith("Error: Database not initialized") for text in state.values())
+
+def test_backend_mismatch_with_index_is_reported(tmp_path, monkeypatch, capsys):
+    """O índice não mistura backends, mas o servidor pode subir com outro EMBEDDING_BACKEND."""
+    manifest = tmp_path / "manifest.json"
+    monkeypatch.setattr(server, "MANIFEST_PATH", str(manifest))
+    monkeypatch.setattr(server, "EMBEDDING_BACKEND", "torch")
+    manifest.write_text(json.dumps({"settings": {"chunk_size": 1000}, "files": {}}))
+    server.check_embedding_backend()
+    assert "backend" not in capsys.readouterr().err
+
+    manifest.write_text(json.dumps({"settings": {"embedding_backend": "onnx-int8"}, "files": {}}))
+    server.check_embedding_backend()
+    assert "EMBEDDING_BACKEND=onnx-int8" in capsys.readouterr().err
+
+def test_search_batch_is_one_query_grouped_in_input_order(fake_server):
+    """Consultas repetidas e novas vão em um único forward pass e um único collection.query."""
+    collection, embedded = fake_server
+    queries = ["methods", "abstract text", "methods", "conclusion"]
+    hits = json.loads(server.search_articles_batch(queries, n_results=1, output_format="json"))
+
+    assert embedded == [["methods", "abstract text", "conclusion"]]
+    assert len(collection.queries) == 1 and len(collection.queries[0]) == 3
+    assert [h["query"] for h in hits] == queries
+    assert [h["hits"][0]["id"] for h in hits] == [f"doc.pdf_chunk_{len(q)}" for q in queries]
+
+# --- TESTES DO POOL DE BUSCA (run_blocking) ---
+@pytest.fixture
+def small_pool(monkeypatch):
+    """Pool de busca com uma vaga; devolve uma função que ajusta o limite de pendentes."""
+    monkeypatch.setattr(server, "SEARCH_WORKERS", 1)
+    monkeypatch.setattr(server, "_search_limiter", None)
+    monkeypatch.setattr(server, "_pending", 0)
+    return lambda pending: monkeypatch.setattr(server, "MAX_PENDING", pending)
+
+def _blocking_job(log: list, name: str, release: threading.Event):
+    """Trabalho bloqueante que só termina com 'release' (registra a thread em que rodou)."""
+    def job():
+        log.append((name, threading.current_thread() is threading.main_thread()))
+        release.wait(5)
+        return name
+    return job
+
+async def _wait_for(condition):
+    with anyio.fail_after(5):
+        while not condition():
+            await anyio.sleep(0.005)
+
+def test_run_blocking_rejects_overflow_instead_of_queueing(small_pool):
+    """Com a vaga ocupada e MAX_PENDING atingido, a chamada extra é recusada na hora, e o loop segue livre."""
+    small_pool(1)
+    log, release, results = [], threading.Event(), []
+
+    async def scenario():
+        async with anyio.create_task_group() as tg:
+            async def first():
+                results.append(await server.run_blocking(_blocking_job(log, "first", release)))
+            tg.start_soon(first)
+            await _wait_for(lambda: log)
+
+            # Chegar aqui com 'first' ainda bloqueado prova que ele roda fora do event loop
+            with anyio.fail_after(0.5):
+                with pytest.raises(server.ServerBusy):
+                    await server.run_blocking(_blocking_job(log, "overflow", release))
+            assert server._search_limiter.total_tokens == 1 and server._pending == 1
+            release.set()
+
+    anyio.run(scenario)
+    assert log == [("first", False)] and results == ["first"]
+    assert server._pending == 0
+
+def test_run_blocking_queues_up_to_max_pending(small_pool):
+    """Uma vaga e MAX_PENDING=2: a segunda espera a primeira; a terceira é recusada."""
+    small_pool(2)
+    log, release, results = [], threading.Event(), []
+
+    async def scenario():
+        async with anyio.create_task_group() as tg:
+            async def call(name):
+                results.append(await server.run_blocking(_blocking_job(log, name, release)))
+            tg.start_soon(call, "first")
+            await _wait_for(lambda: log)
+            tg.start_soon(call, "queued")
+            await _wait_for(lambda: server._pending == 2)
+            await anyio.sleep(0.05)
+            assert [name for name, _ in log] == ["first"]  # a fila não ocupa uma segunda thread
+            with pytest.raises(server.ServerBusy):
+                await server.run_blocking(_blocking_job(log, "overflow", release))
+            release.set()
+
+    anyio.run(scenario)
+    assert results == ["first", "queued"] and [name for name, _ in log] == ["first", "queued"]
+    assert server._pending == 0
+
+def test_busy_server_answers_with_busy_error(fake_server, small_pool, monkeypatch):
+    """Pela ferramenta, a recusa vira 'Error: server busy' e conta como status 'busy' no /metrics."""
+    small_pool(0)
+    ready = threading.Event()
+    ready.set()
+    monkeypatch.setattr(server, "_ready", ready)
+    busy_before = server.tool_calls._values.get(("search_articles", "busy"), 0.0)
+
+    contents = anyio.run(server.handle_call_tool, "search_articles", {"query": "methods"})
+
+    assert contents[0].text.startswith("Error: server busy")
+    assert server.tool_calls._values[("search_articles", "busy")] == busy_before + 1
+    assert fake_server[0].queries == []
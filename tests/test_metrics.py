@@ -0,0 +1,63 @@
+import sys
+import os
+import time
+import anyio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import MetricsRegistry, track_phases, phase, add_phase
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Chamadas.", ("tool", "status"))
+    sessions = registry.gauge("sessions", "Sessões abertas.")
+    calls.inc("search", "ok")
+    calls.inc("search", "ok")
+    calls.inc('say "hi"\n', "error")
+    sessions.inc()
+    sessions.inc()
+    sessions.dec()
+    lines = registry.render().splitlines()
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{tool="search",status="ok"} 2' in lines
+    assert 'calls_total{tool="say \\"hi\\"\\n",status="error"} 1' in lines
+    assert "sessions 1" in lines
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latência.", ("tool",), buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3.0):
+        latency.observe("search", value=value)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{tool="search",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{tool="search",le="0.1"} 3' in lines
+    assert 'latency_seconds_bucket{tool="search",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{tool="search"} 4' in lines
+    assert any(line.startswith('latency_seconds_sum{tool="search"} 3.10') for line in lines)
+
+def test_callback_metrics_skip_unavailable_sources():
+    """Fonte que falha (ex: banco fechado) some da saída em vez de derrubar o /metrics."""
+    registry = MetricsRegistry()
+    registry.callback("items", "Itens.", lambda: {("chunks",): 649, ("documents",): 9}, ("collection",))
+    registry.callback("broken", "Quebrada.", lambda: 1 / 0)
+    registry.callback("hits_total", "Hits.", lambda: 7, kind="counter")
+    text = registry.render()
+    assert 'items{collection="chunks"} 649' in text and "broken" not in text
+    assert "# TYPE hits_total counter\nhits_total 7" in text
+
+def test_phases_follow_the_call_into_worker_threads():
+    """Fases marcadas na thread de trabalho (anyio.to_thread) somam na chamada que as disparou."""
+    def work():
+        with phase("embed"):
+            time.sleep(0.01)
+        add_phase("queue", 0.5)
+
+    async def call():
+        with track_phases() as phases:
+            await anyio.to_thread.run_sync(work)
+        return phases
+
+    phases = anyio.run(call)
+    assert phases["queue"] == 0.5 and phases["embed"] >= 0.01
+    with phase("embed"):  # fora de uma chamada, não faz nada
+        pass
@@ -0,0 +1,70 @@
+import sys
+import os
+import json
+import time
+import pstats
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.profiling import Profiler, profiling, span, record_span, set_meta
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_spans_nest_and_self_time_excludes_children():
+    """O tempo próprio do kickoff desconta o LLM e o MCP: sobra o overhead do crewai."""
+    profiler = Profiler()
+    with profiling(profiler):
+        set_meta(name="artigo")
+        with span("crew_kickoff"):
+            time.sleep(0.02)
+            with span("llm", model="gemini") as attrs:
+                attrs["cache"] = "miss"
+                time.sleep(0.05)
+            start = time.perf_counter()
+            time.sleep(0.01)
+            record_span("mcp.call", start, time.perf_counter())
+    report = profiler.report()
+    rows = {row["name"]: row for row in report["summary"]}
+    assert report["name"] == "artigo"
+    assert report["summary"][0]["name"] == "llm"
+    assert 0.015 < rows["crew_kickoff"]["self_s"] < rows["crew_kickoff"]["total_s"] - 0.05
+    kickoff, llm, mcp = report["spans"]
+    assert llm["parent"] == kickoff["id"] and mcp["parent"] == kickoff["id"]
+    assert llm["attrs"] == {"model": "gemini", "cache": "miss"}
+
+def test_spans_without_profiler_are_noops():
+    with span("input", cpu=True) as attrs:
+        attrs["x"] = 1
+    record_span("mcp.call", 0.0, 1.0)
+    set_meta(name="nada")
+
+def test_error_is_recorded_and_span_closed():
+    profiler = Profiler()
+    with profiling(profiler):
+        try:
+            with span("json_extract"):
+                raise ValueError("quebrado")
+        except ValueError:
+            pass
+    (entry,) = profiler.report()["spans"]
+    assert entry["attrs"] == {"error": "ValueError"} and entry["duration_s"] is not None
+
+def test_save_writes_report_and_cpu_dump(tmp_path):
+    """Só os spans com cpu=True entram no cProfile; o .prof abre com pstats."""
+    profiler = Profiler(cpu=True)
+    with profiling(profiler):
+        with span("condense", cpu=True):
+            with span("nested", cpu=True):  # aninhado não religa o profiler
+                busy(0.01)
+        with span("llm"):
+            time.sleep(0.01)
+    path = str(tmp_path / "artigo.profile.json")
+    report = profiler.save(path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["total_s"] == report["total_s"]
+    stats = pstats.Stats(report["cpu_profile"])
+    functions = {name for _, _, name in stats.stats}
+    assert "busy" in functions and "sleep" not in " ".join(functions)
@@ -0,0 +1,69 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.runs import RunStore, new_run_id, repair_output, valid_result
+
+VALID = '{"area": "Computacao", "extraction": {"conclusion": "ok"}, "review_markdown": "## Resenha"}'
+
+def test_store_roundtrip_and_reset(tmp_path):
+    """Etapas e metadados sobrevivem entre instâncias; reset descarta tudo."""
+    store = RunStore("artigo-1", root=str(tmp_path))
+    assert store.load_meta() == {} and store.load_text("classify") is None and store.load_result() is None
+    store.update_meta(source="a.pdf", name="artigo", status="running")
+    store.save_text("classify", "Area: Medicina (ID: depression_chunk_3)")
+    store.update_meta(status="failed")
+
+    reopened = RunStore("artigo-1", root=str(tmp_path))
+    meta = reopened.load_meta()
+    assert (meta["source"], meta["name"], meta["status"]) == ("a.pdf", "artigo", "failed")
+    assert reopened.load_text("classify").startswith("Area: Medicina")
+    assert not [f for f in os.listdir(store.path) if f.endswith(".tmp")]
+
+    reopened.reset()
+    assert reopened.load_meta() == {} and not os.path.exists(store.path)
+
+def test_new_run_id_is_unique(tmp_path):
+    first = new_run_id("artigo", root=str(tmp_path))
+    os.makedirs(tmp_path / first)
+    second = new_run_id("artigo", root=str(tmp_path))
+    assert first.startswith("artigo-") and second != first
+
+def test_repair_stops_at_first_valid_json(tmp_path):
+    """O reparo barato vem primeiro; a etapa cara só roda se ele falhar, e toda tentativa fica salva."""
+    store = RunStore("run", root=str(tmp_path))
+    calls = []
+
+    def fix(raw):
+        calls.append(("fix", raw))
+        return "ainda não é JSON"
+
+    def rerun(raw):
+        calls.append(("rerun", raw))
+        return f"Final Answer: {VALID}"
+
+    def never(raw):
+        raise AssertionError("não deveria rodar")
+
+    data = repair_output(store, "saída quebrada", [("fix_json", fix), ("rerun_final", rerun), ("extra", never)])
+    assert data["area"] == "Computacao"
+    assert [name for name, _ in calls] == ["fix", "rerun"] and calls[0][1] == "saída quebrada"
+    assert store.load_text("fix_json_1") == "ainda não é JSON"
+    assert store.load_meta()["repairs"] == 2
+
+def test_repair_survives_failing_steps(tmp_path):
+    store = RunStore("run", root=str(tmp_path))
+
+    def boom(raw):
+        raise RuntimeError("429 rate limit")
+
+    assert repair_output(store, "x", [("fix_json", boom)]) is None
+    assert repair_output(store, "x", [("fix_json", lambda raw: VALID)]) is not None
+    assert store.load_meta()["repairs"] == 2  # tentativas somam entre retomadas
+
+def test_valid_result_requires_extractor_keys():
+    assert valid_result(json.loads(VALID))
+    assert not valid_result({"area": "Computacao"})
+    assert not valid_result(None)
@@ -6,7 +6,7 @@ import pytest
 # Garante que o python enxergue a pasta src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.utils import extract_json_from_text, clean_input_for_tool
+from src.utils import extract_json_from_text, clean_input_for_tool, parse_query_list
 
 # --- TESTES DE EXTRAÇÃO DE JSON (O Coração do Analista) ---
 
@@ -54,4 +54,14 @@ def test_clean_input_dict():
 def test_clean_input_nested_json():
     """Deve limpar string que parece JSON aninhado."""
     entrada = '{"query": "busca real"}'
-    assert clean_input_for_tool(entrada) == "busca real"
\ No newline at end of file
+    assert clean_input_for_tool(entrada) == "busca real"
+
+# --- TESTES DA BUSCA EM LOTE ---
+
+def test_parse_query_list_variants():
+    """A ferramenta em lote aceita lista, JSON, dict ou texto separado por linhas."""
+    assert parse_query_list(["a", " b ", ""]) == ["a", "b"]
+    assert parse_query_list('["abstract", "methods"]') == ["abstract", "methods"]
+    assert parse_query_list({"queries": ["x", "y"]}) == ["x", "y"]
+    assert parse_query_list("abstract\nmethods; conclusion") == ["abstract", "methods", "conclusion"]
+    assert parse_query_list('{"queries": "single"}') == ["single"]
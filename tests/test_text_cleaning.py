@@ -0,0 +1,39 @@
+import sys
+import os
+import random
+import pytest
+
+# Adiciona src ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.text_cleaning import clean_text_robust, clean_text_reference, clean_snippet
+
+# --- TESTE 1: CASOS CONHECIDOS ---
+@pytest.mark.parametrize("texto", [
+    "",
+    "texto-\nquebrado",
+    "a-\nb-\nc",                      # a palavra que continua não inicia outra junção
+    " -\nfoo-\nbar",
+    "Resultado <EOS> final<pad>\x00.",
+    "<E\x00OS> token",
+    "a • b , c ; d  !",               # caractere removido deixa espaço duplo
+    "  \t• início e fim •\n ",
+    "ﬁgura 3 — ação_química: C6H12O6 → CO2 ( 95 % ) ?",
+])
+def test_parity_known_cases(texto):
+    """A versão otimizada deve produzir exatamente a saída original."""
+    assert clean_text_robust(texto) == clean_text_reference(texto)
+
+# --- TESTE 2: FUZZ ---
+def test_parity_random_texts():
+    """Textos aleatórios com hífens, quebras, símbolos e acentos."""
+    rng = random.Random(42)
+    alfabeto = "ab_1é-\n \t.,;•<>EOSpad\x00ﬁ→"
+    for _ in range(20000):
+        texto = "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 24)))
+        assert clean_text_robust(texto) == clean_text_reference(texto), repr(texto)
+
+# --- TESTE 3: LIMPEZA LEVE DO SERVIDOR ---
+def test_clean_snippet():
+    assert clean_snippet("  Attention <EOS> is\n\n all <pad> you need ") == "Attention is all you need"
+    assert clean_snippet("") == ""